@@ -0,0 +1,100 @@
+// Micro-benchmark of the uint8 HWC -> float CHW conversion used before every forward
+// pass: the original scalar loop from raw_data_to_image_t against hwc_to_planar.
+//
+//   cmake -DLIBDARKNETPY_BUILD_BENCHMARKS=ON ... && ./convert_bench [iterations]
+//
+// or standalone:
+//
+//   g++ -O3 -fopenmp -Isrc/libdarknetpy benchmarks/convert_bench.cpp -o convert_bench
+#include <algorithm>
+#include <chrono>
+#include <cmath>
+#include <cstdio>
+#include <cstdlib>
+#include <vector>
+
+#include "image_convert.hpp"
+
+// The conversion loop as it was in raw_data_to_image_t: a fresh calloc per image,
+// the width index innermost over a stride-c source and a division per element.
+static float *legacy_convert(const uint8_t *data, int h, int w, int c)
+{
+    int i, j, k;
+    float *out = (float *)calloc(h * w * c, sizeof(float));
+    for (k = 0; k < c; ++k)
+    {
+        for (j = 0; j < h; ++j)
+        {
+            for (i = 0; i < w; ++i)
+            {
+                int dst_index = i + w * j + w * h * k;
+                int src_index = k + c * i + c * w * j;
+                out[dst_index] = (float)data[src_index] / 255.;
+            }
+        }
+    }
+    return out;
+}
+
+template <typename F>
+static double best_ms(int iterations, F &&f)
+{
+    double best = 1e30;
+    for (int it = 0; it < iterations; ++it)
+    {
+        auto start = std::chrono::steady_clock::now();
+        f();
+        std::chrono::duration<double, std::milli> elapsed = std::chrono::steady_clock::now() - start;
+        best = std::min(best, elapsed.count());
+    }
+    return best;
+}
+
+int main(int argc, char **argv)
+{
+    int iterations = argc > 1 ? atoi(argv[1]) : 20;
+    struct
+    {
+        const char *name;
+        int w, h;
+    } sizes[] = {{"640x480", 640, 480}, {"1080p", 1920, 1080}, {"4K", 3840, 2160}};
+
+    printf("%-8s %12s %12s %12s %8s\n", "size", "legacy ms", "planar ms", "reused ms", "speedup");
+    for (auto &s : sizes)
+    {
+        const int c = 3;
+        std::vector<uint8_t> src((size_t)s.w * s.h * c);
+        for (size_t i = 0; i < src.size(); ++i)
+            src[i] = (uint8_t)(i * 2654435761u >> 24);
+
+        double legacy = best_ms(iterations, [&]() {
+            free(legacy_convert(src.data(), s.h, s.w, c));
+        });
+        // fresh allocation per image, as image_t construction does
+        double planar = best_ms(iterations, [&]() {
+            float *out = (float *)malloc((size_t)s.w * s.h * 3 * sizeof(float));
+            hwc_to_planar(out, src.data(), s.h, s.w, c, (ptrdiff_t)s.w * c, c, 1);
+            free(out);
+        });
+        // reused scratch buffer, as detect_array does
+        std::vector<float> scratch((size_t)s.w * s.h * 3);
+        double reused = best_ms(iterations, [&]() {
+            hwc_to_planar(scratch.data(), src.data(), s.h, s.w, c, (ptrdiff_t)s.w * c, c, 1);
+        });
+
+        // sanity check against the reference loop
+        float *ref = legacy_convert(src.data(), s.h, s.w, c);
+        for (size_t i = 0; i < scratch.size(); ++i)
+        {
+            if (std::fabs(ref[i] - scratch[i]) > 1e-6f)
+            {
+                fprintf(stderr, "mismatch at %zu: %f != %f\n", i, ref[i], scratch[i]);
+                return 1;
+            }
+        }
+        free(ref);
+
+        printf("%-8s %12.3f %12.3f %12.3f %7.2fx\n", s.name, legacy, planar, reused, legacy / reused);
+    }
+    return 0;
+}
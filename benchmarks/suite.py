@@ -0,0 +1,305 @@
+"""
+Offline benchmark suite for libdarknetpy.
+
+Generates a small synthetic YOLO model (a darknet .cfg plus random .weights),
+so nothing has to be downloaded, and measures model load time (from the
+.cfg/.weights pair and from a compiled model), preprocessing,
+single-image latency, batched and tiled throughput, the cost of darknet's
+NMS, of each ``libdarknetpy.nms`` method, of tracking and of serializing the
+boxes at several box counts.
+Results are written as JSON so runs of two versions can be diffed; all times
+are in milliseconds.
+
+Usage::
+
+    python benchmarks/suite.py --output before.json
+    python benchmarks/suite.py --size 416 --repeat 50 --output after.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import struct
+import tempfile
+import time
+from typing import Callable
+
+import libdarknetpy
+import numpy as np
+
+# (filters, size) of the convolutions, each but the last followed by a 2x2 maxpool
+BACKBONE = ((16, 3), (32, 3), (64, 3), (128, 3))
+ANCHORS = "10,14, 23,27, 37,58"
+
+
+def write_model(path: str, size: int, classes: int, seed: int = 0) -> tuple[str, str]:
+    """Write a synthetic YOLO .cfg and random .weights under ``path``."""
+    sections = [
+        f"[net]\nbatch=1\nsubdivisions=1\nwidth={size}\nheight={size}\nchannels=3\n"
+    ]
+    rng = np.random.default_rng(seed)
+    params = []
+    channels = 3
+    for i, (filters, k) in enumerate(BACKBONE):
+        sections.append(
+            "[convolutional]\nbatch_normalize=1\n"
+            f"filters={filters}\nsize={k}\nstride=1\npad=1\nactivation=leaky\n"
+        )
+        fan_in = channels * k * k
+        # darknet order for a batch-normalized convolution: biases, scales,
+        # rolling mean, rolling variance, weights
+        params += [
+            np.zeros(filters),
+            np.ones(filters),
+            np.zeros(filters),
+            np.ones(filters),
+            rng.normal(0, (2 / fan_in) ** 0.5, filters * fan_in),
+        ]
+        channels = filters
+        if i < len(BACKBONE) - 1:
+            sections.append("[maxpool]\nsize=2\nstride=2\n")
+    filters = 3 * (classes + 5)
+    sections.append(
+        f"[convolutional]\nfilters={filters}\nsize=1\nstride=1\npad=1\nactivation=linear\n"
+    )
+    params += [rng.normal(0, 1, filters), rng.normal(0, 0.1, filters * channels)]
+    sections.append(
+        f"[yolo]\nmask=0,1,2\nanchors={ANCHORS}\nclasses={classes}\nnum=3\n"
+        "jitter=.3\nignore_thresh=.7\ntruth_thresh=1\nrandom=0\n"
+    )
+
+    cfg = os.path.join(path, "synthetic.cfg")
+    weights = os.path.join(path, "synthetic.weights")
+    with open(cfg, "w") as f:
+        f.write("\n".join(sections))
+    with open(weights, "wb") as f:
+        # major, minor, revision, images seen
+        f.write(struct.pack("<iiiQ", 0, 2, 5, 0))
+        f.write(np.concatenate(params).astype(np.float32).tobytes())
+    return cfg, weights
+
+
+def encode_bmp(frame: np.ndarray) -> bytes:
+    """Encode an RGB ``(h, w, 3)`` uint8 frame as a 24-bit BMP."""
+    h, w, _ = frame.shape
+    pixels = np.zeros((h, (w * 3 + 3) & ~3), np.uint8)
+    pixels[:, : w * 3] = frame[::-1, :, ::-1].reshape(h, w * 3)
+    header = struct.pack("<2sIHHI", b"BM", 54 + pixels.size, 0, 0, 54)
+    info = struct.pack("<IiiHHIIiiII", 40, w, h, 1, 24, 0, pixels.size, 0, 0, 0, 0)
+    return header + info + pixels.tobytes()
+
+
+def encode(frame: np.ndarray) -> tuple[str, bytes]:
+    """Encode ``frame`` as JPEG if OpenCV's Python bindings are around, else BMP."""
+    try:
+        import cv2
+    except ImportError:
+        return "bmp", encode_bmp(frame)
+    return "jpeg", cv2.imencode(".jpg", frame[:, :, ::-1])[1].tobytes()
+
+
+def timings(fn: Callable[[], object], repeat: int, warmup: int = 1) -> dict:
+    """Call ``fn`` ``repeat`` times; summarize the wall times in ms."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1e3)
+    p50, p90, p99 = np.percentile(samples, [50, 90, 99])
+    return {
+        "n": repeat,
+        "mean": float(np.mean(samples)),
+        "min": float(np.min(samples)),
+        "p50": float(p50),
+        "p90": float(p90),
+        "p99": float(p99),
+    }
+
+
+def random_boxes(rng: np.random.Generator, n: int, extent: int) -> list:
+    """``n`` random ``bbox_t`` of a few classes inside an ``extent`` square."""
+    boxes = []
+    for x, y, w, h, cls in zip(
+        rng.integers(0, extent, n),
+        rng.integers(0, extent, n),
+        rng.integers(4, extent // 8, n),
+        rng.integers(4, extent // 8, n),
+        rng.integers(0, 4, n),
+    ):
+        b = libdarknetpy.bbox_t()
+        b.x, b.y, b.w, b.h = int(x), int(y), int(w), int(h)
+        b.obj_id, b.prob = int(cls), 0.5
+        boxes.append(b)
+    return boxes
+
+
+def run(args: argparse.Namespace, cfg: str, weights: str) -> dict:
+    rng = np.random.default_rng(args.seed)
+    results: dict = {}
+
+    results["load"] = timings(
+        lambda: libdarknetpy.Detector(cfg, weights, args.gpu), args.load_repeat, 0
+    )
+    compiled = os.path.join(os.path.dirname(weights), "synthetic.dnm")
+    libdarknetpy.compile_model(cfg, weights, compiled)
+    results["load_compiled"] = timings(
+        lambda: libdarknetpy.Detector.from_compiled(compiled, args.gpu),
+        args.load_repeat,
+        0,
+    )
+    det = libdarknetpy.Detector(cfg, weights, args.gpu)
+
+    pre = results["preprocess"] = {}
+    for w, h in ((640, 480), (1920, 1080)):
+        frame = rng.integers(0, 256, (h, w, 3), np.uint8)
+        fmt, data = encode(frame)
+        pre[f"image_t_{w}x{h}"] = timings(
+            lambda frame=frame: libdarknetpy.image_t(frame), args.repeat
+        )
+        pre[f"detect_raw_{fmt}_{w}x{h}"] = timings(
+            lambda data=data: det.detect_raw(data, args.thresh), args.repeat
+        )
+        pre[f"detect_array_{w}x{h}"] = timings(
+            lambda frame=frame: det.detect_array(frame, args.thresh), args.repeat
+        )
+
+    frame = rng.integers(0, 256, (args.size, args.size, 3), np.uint8)
+    results["latency"] = timings(
+        lambda: det.detect_array(frame, args.thresh), args.repeat
+    )
+
+    batched = libdarknetpy.Detector(cfg, weights, args.gpu, args.batch)
+    frames = [frame] * (args.batch * 4)
+    batch = timings(lambda: batched.detect_many(frames, args.thresh), args.repeat)
+    batch["images_per_s"] = len(frames) / (batch["mean"] / 1e3)
+    results["batch"] = {"batch_size": args.batch, **batch}
+
+    # darknet's NMS only runs inside detectBatch/detect_many; its cost is the
+    # difference with make_nms off, at thresholds giving more or fewer boxes
+    nms = results["nms"] = {}
+    for thresh in (0.9, 0.5, 0.1):
+        boxes = len(batched.detect_many(frames[:1], thresh, make_nms=False)[0])
+        on = timings(lambda t=thresh: batched.detect_many(frames, t), args.repeat)
+        off = timings(
+            lambda t=thresh: batched.detect_many(frames, t, make_nms=False),
+            args.repeat,
+        )
+        nms[f"thresh_{thresh}"] = {
+            "boxes": boxes,
+            "nms_ms": on["mean"] - off["mean"],
+            "with_nms": on,
+            "without_nms": off,
+        }
+
+    big = rng.integers(0, 256, (2160, 3840, 3), np.uint8)
+    results["tiled_3840x2160"] = {
+        f"full_pass_{full}": timings(
+            lambda full=full: batched.detect_tiled(
+                big, thresh=args.thresh, full_pass=full
+            ),
+            args.repeat,
+        )
+        for full in (False, True)
+    }
+
+    # the standalone NMS methods on random candidates, see Detector.set_nms
+    modes = results["nms_modes"] = {}
+    for n in (100, 1000, 5000):
+        boxes = random_boxes(rng, n, args.size)
+        for b, prob in zip(boxes, rng.random(n)):
+            b.prob = float(prob)
+        modes[f"boxes_{n}"] = {
+            f"{method}_{'class' if aware else 'agnostic'}": timings(
+                lambda m=method, a=aware, boxes=boxes: libdarknetpy.nms(
+                    boxes, method=m, class_aware=a, score_threshold=0.05
+                ),
+                args.repeat,
+            )
+            for method in ("greedy", "diou", "soft")
+            for aware in (True, False)
+        }
+
+    from libdarknetpy.tracking import Tracker
+
+    tracking = results["tracking"] = {}
+    for n in (10, 100, 1000):
+        boxes = random_boxes(rng, n, args.size)
+        columns = {
+            k: np.array([getattr(b, k) for b in boxes], np.uint32)
+            for k in ("x", "y", "w", "h", "obj_id")
+        }
+        tracker = Tracker()
+        tracking[f"boxes_{n}"] = {
+            "tracking_id": timings(
+                lambda boxes=boxes: det.tracking_id(boxes), args.repeat
+            ),
+            "Tracker.update": timings(
+                lambda t=tracker, c=columns: t.update(c), args.repeat
+            ),
+        }
+
+    # per-box Python JSON against the native serializers of libdarknetpy.serialize
+    fields = ("x", "y", "w", "h", "prob", "obj_id", "track_id")
+    serialization = results["serialization"] = {}
+    for n in (100, 1000, 10000):
+        boxes = random_boxes(rng, n, args.size)
+        serialization[f"boxes_{n}"] = {
+            "json.dumps": timings(
+                lambda boxes=boxes: json.dumps(
+                    {"boxes": [{k: getattr(b, k) for k in fields} for b in boxes]}
+                ),
+                args.repeat,
+            ),
+            **{
+                fmt: timings(
+                    lambda fmt=fmt, boxes=boxes: libdarknetpy.serialize(boxes, fmt),
+                    args.repeat,
+                )
+                for fmt in ("json", "msgpack", "binary")
+            },
+        }
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", type=int, default=320, help="network input size")
+    parser.add_argument("--classes", type=int, default=80)
+    parser.add_argument("--batch", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--load-repeat", type=int, default=5)
+    parser.add_argument("--thresh", type=float, default=0.2)
+    parser.add_argument("--gpu", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON here instead of stdout")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cfg, weights = write_model(tmp, args.size, args.classes, args.seed)
+        results = run(args, cfg, weights)
+
+    report = {
+        "libdarknetpy": libdarknetpy.__version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "cuda": libdarknetpy.built_with_cuda(),
+        "config": vars(args),
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
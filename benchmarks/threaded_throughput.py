@@ -0,0 +1,87 @@
+"""
+Threaded throughput benchmark for libdarknetpy.
+
+Runs ``Detector.detect`` from a growing number of Python threads and reports
+requests/sec for each thread count. Each thread owns its own ``Detector`` (see
+the thread-safety notes on ``Detector``), so the numbers only scale if the
+bindings release the GIL around the native work.
+
+Usage::
+
+    python benchmarks/threaded_throughput.py model.cfg model.weights image.jpg \\
+        --threads 1 2 4 8 --duration 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import threading
+import time
+
+import libdarknetpy
+
+
+def run(
+    detectors: list[libdarknetpy.Detector],
+    image: str,
+    duration: float,
+    thresh: float,
+) -> int:
+    """Run ``detect`` on every detector concurrently; return the total request count."""
+    counts = [0] * len(detectors)
+    start = threading.Barrier(len(detectors) + 1)
+    deadline = 0.0
+
+    def worker(idx: int) -> None:
+        det = detectors[idx]
+        start.wait()
+        n = 0
+        while time.perf_counter() < deadline:
+            det.detect(image, thresh)
+            n += 1
+        counts[idx] = n
+
+    threads = [
+        threading.Thread(target=worker, args=(i,)) for i in range(len(detectors))
+    ]
+    for t in threads:
+        t.start()
+    deadline = time.perf_counter() + duration
+    start.wait()
+    for t in threads:
+        t.join()
+    return sum(counts)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("cfg")
+    parser.add_argument("weights")
+    parser.add_argument("image")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--thresh", type=float, default=0.2)
+    parser.add_argument("--gpu", type=int, default=0)
+    args = parser.parse_args()
+
+    # Detectors are constructed serially up front; darknet is not safe to
+    # construct concurrently.
+    detectors = [
+        libdarknetpy.Detector(args.cfg, args.weights, args.gpu)
+        for _ in range(max(args.threads))
+    ]
+    # warm up every instance once so first-call allocation is not measured
+    for det in detectors:
+        det.detect(args.image, args.thresh)
+
+    baseline = None
+    print(f"{'threads':>8} {'requests':>10} {'req/s':>10} {'scaling':>8}")
+    for n in args.threads:
+        total = run(detectors[:n], args.image, args.duration, args.thresh)
+        rate = total / args.duration
+        baseline = baseline or rate
+        print(f"{n:>8} {total:>10} {rate:>10.2f} {rate / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -373,7 +373,7 @@ setup(
     ext_modules=[CMakeExtension("libdarknetpy._libdarknetpy")],
     cmdclass={"build_ext": CMakeBuild},
     zip_safe=False,
-    extras_require={"test": ["pytest>=6.0"]},
+    extras_require={"numpy": ["numpy"], "test": ["pytest>=6.0", "numpy", "msgpack"]},
     python_requires=">=3.7",
     distclass=LibdarknetpyDistribution,
     requires=["pybind11", "helpers"],
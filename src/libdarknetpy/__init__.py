@@ -4,5 +4,49 @@ libdarknetpy: A Pybind11-based Python wrapper for darknet.
 
 from __future__ import annotations
 
-# ruff: noqa: F403 PGH003
-from ._libdarknetpy import *  # type: ignore
+import importlib
+
+# The native extension pulls in darknet, OpenCV and OpenMP, and the helper modules
+# import asyncio and multiprocessing. Nothing is loaded until one of these names is
+# first accessed, so importing the package stays cheap.
+_LAZY = {
+    "AsyncDetector": ".aio",
+    "BatchScheduler": ".batching",
+    "Detector": "._libdarknetpy",
+    "DetectorPool": ".pool",
+    "FrameGate": "._libdarknetpy",
+    "ImagePool": "._libdarknetpy",
+    "ResultCache": ".cache",
+    "ResultPublisher": "._libdarknetpy",
+    "StreamDetector": "._libdarknetpy",
+    "bbox_t": "._libdarknetpy",
+    "built_with_cuda": "._libdarknetpy",
+    "built_with_cudnn": "._libdarknetpy",
+    "built_with_opencv": "._libdarknetpy",
+    "compile_model": "._libdarknetpy",
+    "decode_binary": "._libdarknetpy",
+    "get_device_count": "._libdarknetpy",
+    "get_device_name": "._libdarknetpy",
+    "image_t": "._libdarknetpy",
+    "metrics_snapshot": "._libdarknetpy",
+    "nms": "._libdarknetpy",
+    "send_json_custom": "._libdarknetpy",
+    "serialize": "._libdarknetpy",
+    "__version__": "._libdarknetpy",
+}
+
+__all__ = [name for name in _LAZY if name != "__version__"]
+
+
+def __getattr__(name: str):
+    module = _LAZY.get(name)
+    if module is None:
+        msg = f"module {__name__!r} has no attribute {name!r}"
+        raise AttributeError(msg)
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(_LAZY))
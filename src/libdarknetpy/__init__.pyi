@@ -6,24 +6,50 @@ from __future__ import annotations
 
 from libdarknetpy._libdarknetpy import (
     Detector,
+    FrameGate,
+    ImagePool,
+    ResultPublisher,
+    StreamDetector,
     bbox_t,
     built_with_cuda,
     built_with_cudnn,
     built_with_opencv,
+    compile_model,
+    decode_binary,
     get_device_count,
     get_device_name,
     image_t,
+    metrics_snapshot,
+    nms,
     send_json_custom,
+    serialize,
 )
+from libdarknetpy.aio import AsyncDetector
+from libdarknetpy.batching import BatchScheduler
+from libdarknetpy.cache import ResultCache
+from libdarknetpy.pool import DetectorPool
 
 __all__ = [
+    "AsyncDetector",
+    "BatchScheduler",
     "Detector",
+    "DetectorPool",
+    "FrameGate",
+    "ImagePool",
+    "ResultCache",
+    "ResultPublisher",
+    "StreamDetector",
     "bbox_t",
     "built_with_cuda",
     "built_with_cudnn",
     "built_with_opencv",
+    "compile_model",
+    "decode_binary",
     "get_device_count",
     "get_device_name",
     "image_t",
+    "metrics_snapshot",
+    "nms",
     "send_json_custom",
+    "serialize",
 ]
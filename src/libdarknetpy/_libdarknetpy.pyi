@@ -5,23 +5,90 @@ from __future__ import annotations
 
 import typing
 
+import numpy
+import typing_extensions
+
 __all__ = [
     "Detector",
+    "FrameGate",
+    "ImagePool",
+    "ResultPublisher",
+    "StreamDetector",
     "bbox_t",
     "built_with_cuda",
     "built_with_cudnn",
     "built_with_opencv",
+    "compile_model",
+    "decode_binary",
     "get_device_count",
     "get_device_name",
     "image_t",
+    "metrics_snapshot",
+    "nms",
     "send_json_custom",
+    "serialize",
+]
+
+_Output = typing_extensions.Literal[
+    "list", "array", "dict", "json", "msgpack", "binary"
+]
+_Format = typing_extensions.Literal["json", "msgpack", "binary"]
+_NmsMethod = typing_extensions.Literal["darknet", "none", "greedy", "diou", "soft"]
+_Records = typing.Union[list["bbox_t"], numpy.ndarray, dict[str, numpy.ndarray]]
+_Boxes = typing.Union[_Records, bytes]
+_BatchBoxes = typing.Union[
+    list[list["bbox_t"]], numpy.ndarray, dict[str, numpy.ndarray], bytes
 ]
 
 class Detector:
+    """
+    A darknet network loaded from a .cfg/.weights pair.
+
+    All inference calls release the GIL while they run natively, so several
+    threads can run detections in parallel. Thread-safety rules:
+
+    * ``load_image``, ``free_image`` and the ``get_net_*`` getters may be called
+      concurrently from any number of threads.
+    * ``detect``, ``detect_raw``, ``detectBatch`` and ``tracking_id`` use the
+      per-instance network state and must not run concurrently on the same
+      instance: use one ``Detector`` per thread (or guard a shared instance
+      with a lock). The same goes for ``detect_array``, ``detect_many``,
+      ``detect_tiled`` and ``forward``.
+    * Construction releases the GIL as well, but darknet sets process-wide
+      state while it parses the network, so create instances one at a time.
+
+    Every ``detect*`` method takes an ``output`` argument: ``"list"`` (the
+    default) returns ``bbox_t`` objects, ``"array"`` a NumPy structured array
+    with one record per box and ``"dict"`` a dict of NumPy column arrays
+    (``x``, ``y``, ``w``, ``h``, ``prob``, ``obj_id``, ``track_id``, ...). The
+    array formats need NumPy and are built without a Python object per box.
+    Batched calls return a single array/dict for all frames with an extra
+    ``frame`` column holding the index of the image each box belongs to.
+    ``"json"``, ``"msgpack"`` and ``"binary"`` return the boxes serialized to
+    ``bytes`` straight from the native results, see ``serialize``.
+    """
+
     nms: float
     wait_stream: bool
     @staticmethod
-    def free_image(m: image_t) -> None: ...
+    def free_image(m: image_t) -> None:
+        """
+        Release an image's pixels, same as image_t.close()
+        """
+    @staticmethod
+    def from_compiled(path: str, gpu: int = 0, batch_size: int = 1) -> Detector:
+        """
+        Load a model written by ``compile_model``.
+
+        The model's batch norm is already folded into its convolutions and its
+        .cfg and weights are read from the one file, which saves reading the batch
+        norm parameters. This is not a fast-load format: darknet still parses the
+        .cfg and copies the weights into buffers of its own in every process, and
+        nothing is memory-mapped, so the gain over the constructor is modest; see
+        ``benchmarks/suite.py`` for the load times. Loading the weights in place
+        from a mapped file needs a patch to the darknet port that points the layer
+        weights at the mapped region.
+        """
     @staticmethod
     def load_image(image_filename: str) -> image_t: ...
     def __init__(
@@ -31,14 +98,29 @@ class Detector:
         gpu: int = 0,
         batch_size: int = 1,
     ) -> None: ...
+    def describe_layers(self) -> list[tuple[str, tuple[int, ...]]]:
+        """
+        Return the ``(type, shape)`` of every layer, in order.
+
+        ``type`` is the .cfg section name, e.g. ``"convolutional"``, and ``shape``
+        the shape ``forward`` returns for one image.
+        """
     @typing.overload
     def detect(
-        self, image_filename: str, thresh: float = 0.2, use_mean: bool = False
-    ) -> list[bbox_t]: ...
+        self,
+        image_filename: str,
+        thresh: float = 0.2,
+        use_mean: bool = False,
+        output: _Output = "list",
+    ) -> _Boxes: ...
     @typing.overload
     def detect(
-        self, img: image_t, thresh: float = 0.2, use_mean: bool = False
-    ) -> list[bbox_t]: ...
+        self,
+        img: image_t,
+        thresh: float = 0.2,
+        use_mean: bool = False,
+        output: _Output = "list",
+    ) -> _Boxes: ...
     def detectBatch(
         self,
         img: image_t,
@@ -47,13 +129,188 @@ class Detector:
         height: int,
         thresh: float,
         make_nms: bool = True,
-    ) -> list[list[bbox_t]]: ...
+        output: _Output = "list",
+    ) -> _BatchBoxes: ...
+    def detect_array(
+        self,
+        data: typing_extensions.Buffer,
+        thresh: float = 0.2,
+        use_mean: bool = False,
+        bgr: bool = False,
+        letterbox: bool = False,
+        output: _Output = "list",
+    ) -> _Boxes:
+        """
+        Detect objects in an in-memory image without copying it into Python objects.
+
+        ``data`` is any buffer-protocol object: ``bytes``/``memoryview``/1-D uint8
+        arrays are decoded as an encoded image (JPEG, PNG, ...), ``(h, w)`` or
+        ``(h, w, c)`` uint8 arrays are decoded frames (gray, RGB or RGBA; pass
+        ``bgr=True`` for OpenCV frames) and ``(c, h, w)`` float32 arrays are
+        planar pixels scaled to [0, 1].
+
+        Encoded and uint8 input is resized to the network resolution before it is
+        converted to float (large JPEGs are decoded at reduced scale), stretched
+        like darknet does or, with ``letterbox=True``, scaled to fit and padded.
+        Boxes are always reported in the coordinates of the original image.
+        """
+    def detect_many(
+        self,
+        images: typing.Sequence[typing_extensions.Buffer],
+        thresh: float = 0.2,
+        make_nms: bool = True,
+        bgr: bool = False,
+        letterbox: bool = False,
+        output: _Output = "list",
+    ) -> _BatchBoxes:
+        """
+        Detect objects in a sequence of images with batched forward passes.
+
+        ``images`` holds any inputs ``detect_array`` accepts (planar float32
+        input must already have the network size). They are packed
+        ``batch_size`` at a time into one network input, so construct the
+        detector with the batch size you want to run; longer sequences are
+        split into several forward passes automatically. Returns one box list
+        per image, in the coordinates of that image.
+
+        The images are decoded and placed before their forward pass, so one
+        that can't be (not an image, corrupt data) fails the whole call: the
+        error of the first such image is raised and no results are returned
+        for the others. Detect the images of a failed call one at a time to
+        tell the bad ones apart.
+        """
+    @typing.overload
     def detect_raw(
-        self, vdata: list[int], thresh: float = 0.2, use_mean: bool = False
-    ) -> list[bbox_t]: ...
+        self,
+        vdata: typing_extensions.Buffer,
+        thresh: float = 0.2,
+        use_mean: bool = False,
+        letterbox: bool = False,
+        output: _Output = "list",
+    ) -> _Boxes: ...
+    @typing.overload
+    def detect_raw(
+        self,
+        vdata: list[int],
+        thresh: float = 0.2,
+        use_mean: bool = False,
+        letterbox: bool = False,
+        output: _Output = "list",
+    ) -> _Boxes: ...
+    def detect_tiled(
+        self,
+        image: typing_extensions.Buffer,
+        tile: int = 0,
+        overlap: float = 0.2,
+        thresh: float = 0.2,
+        full_pass: bool = False,
+        bgr: bool = False,
+        letterbox: bool = False,
+        output: _Output = "list",
+    ) -> _Boxes:
+        """
+        Detect small objects in a large image through overlapping tiles.
+
+        ``image`` is an encoded image, decoded at full resolution, or an (h, w, c)
+        uint8 array. It is cut into ``tile`` x ``tile`` windows (by default the
+        network size) overlapping by the fraction ``overlap``; the windows are
+        views into the image, resized into the network input like whole images,
+        and run ``batch_size`` at a time. Their boxes are mapped to image
+        coordinates and merged across tiles: a box lying inside a better box of
+        another tile by more than ``Detector.nms`` of its area (intersection
+        over the smaller box), like the part of an object cut by a tile border,
+        is dropped, then the method of ``set_nms`` (greedy for darknet's)
+        suppresses the remaining overlaps. With ``set_nms("none")`` boxes are
+        not merged. ``full_pass=True`` also runs the whole image, downscaled,
+        to catch objects larger than a tile.
+        """
+    def forward(
+        self,
+        images: typing_extensions.Buffer | typing.Sequence[typing_extensions.Buffer],
+        layers: typing.Sequence[int] | None = None,
+        copy: bool = False,
+        bgr: bool = False,
+        letterbox: bool = False,
+    ) -> dict[int, numpy.ndarray]:
+        """
+        Run the network and return raw layer outputs as NumPy arrays.
+
+        ``images`` is one input ``detect_array`` accepts, or a sequence of up to
+        ``batch_size`` of them. Returns a dict from layer index to the layer's
+        output: ``(channels, height, width)`` float32 for layers with a spatial
+        layout, ``(outputs,)`` otherwise, with a leading image axis when
+        ``images`` is a sequence. ``layers`` lists the layers wanted (negative
+        indices count from the end); by default the detection (yolo, region)
+        layers, whose outputs are the activated predictions darknet decodes
+        boxes from. See ``describe_layers`` for the indices.
+
+        The arrays are read-only views of the network's own buffers: no copy is
+        made, but they are overwritten by the next call using this detector.
+        Pass ``copy=True`` for arrays that stay valid. Only available in CPU
+        builds; no NMS or box decoding is run.
+        """
     def get_net_color_depth(self) -> int: ...
     def get_net_height(self) -> int: ...
     def get_net_width(self) -> int: ...
+    def profile_stats(self) -> dict[str, typing.Any]:
+        """
+        Aggregated timings of all profiled calls since the last ``reset_profile``.
+
+        ``calls`` counts the calls per method. ``total`` and each entry of
+        ``stages`` summarize the times in seconds (``count``, ``sum``, ``min``,
+        ``max``) with a histogram: ``buckets`` holds cumulative counts per upper
+        bound, the last one infinite, like a Prometheus histogram. ``layers``
+        holds the same summaries per layer, without buckets.
+        """
+    def quantize(
+        self, mode: typing_extensions.Literal["int8", "fp16"] = "int8"
+    ) -> dict[str, int]:
+        """
+        Store the convolution weights in reduced precision for CPU inference.
+
+        ``"int8"`` keeps per-output-channel INT8 weights and scales, ``"fp16"``
+        half-precision weights; batch norm is folded into the convolutions
+        first. Weights are expanded to float one output channel at a time and
+        accumulated in FP32, so they take 4x (INT8) or 2x (FP16) less memory
+        while results drift only by the rounding of the weights; use
+        ``libdarknetpy.quantization.calibrate`` to measure the drift on your
+        images. Layers the reduced-precision pass doesn't cover keep float
+        weights. Returns how many convolutional layers were converted or
+        skipped, and their weight storage before and after in bytes.
+
+        Can't be undone. The detector must not be running a detection
+        meanwhile.
+        """
+    def reset_profile(self) -> None:
+        """
+        Forget the recorded timings
+        """
+    def set_nms(
+        self,
+        method: _NmsMethod = "darknet",
+        threshold: float | None = None,
+        class_aware: bool = True,
+        top_k: int = 0,
+        max_detections: int = 0,
+        sigma: float = 0.5,
+    ) -> None:
+        """
+        Choose how overlapping boxes are suppressed by all ``detect*`` methods.
+
+        ``method`` is ``"darknet"`` (the default: darknet's own per-class NMS),
+        ``"greedy"`` (hard NMS), ``"diou"`` (hard NMS on IoU minus the normalized
+        distance of the box centers, which keeps close but distinct objects),
+        ``"soft"`` (Gaussian soft-NMS: the scores of overlapping boxes decay by
+        ``exp(-iou**2 / sigma)`` and boxes falling below the detection threshold
+        are dropped) or ``"none"``. ``threshold`` sets ``Detector.nms``, the IoU
+        above which boxes are suppressed.
+
+        Except for darknet's, the methods suppress across classes unless
+        ``class_aware``, consider only the ``top_k`` best boxes of an image (0 for
+        all) and return boxes ordered by decreasing score. ``max_detections``
+        keeps at most that many boxes per image with every method (0 for all).
+        ``make_nms=False`` still turns suppression off for batched calls.
+        """
     def tracking_id(
         self,
         cur_bbox_vec: list[bbox_t],
@@ -62,7 +319,342 @@ class Detector:
         max_dist: int = 40,
     ) -> list[bbox_t]: ...
     @property
+    def batch_size(self) -> int: ...
+    @property
     def cur_gpu_id(self) -> int: ...
+    @property
+    def last_profile(self) -> dict[str, typing.Any] | None:
+        """
+        Timings of the last profiled call, or None.
+
+        A dict with the ``method`` called, its ``total`` time, the time of each
+        of its ``stages`` and a list of ``layers`` (``index``, ``type``, ``time``),
+        all in seconds.
+        """
+    @property
+    def nms_options(self) -> dict[str, typing.Any]:
+        """
+        The settings of ``set_nms`` as a dict
+        """
+    @property
+    def precision(self) -> str:
+        """
+        Storage of the convolution weights: ``"float32"``, or the ``quantize`` mode
+        """
+    @property
+    def profile_layers(self) -> bool:
+        """
+        Also time each layer of the forward pass while ``profiling`` is on.
+
+        darknet's forward pass can't be instrumented, so profiled calls run it
+        a second time layer by layer; this roughly doubles their cost, but is
+        not counted in their timings. Layers are timed for inputs at the network
+        resolution, i.e. not for ``detect`` on image files or differently sized
+        planar float input.
+        """
+    @profile_layers.setter
+    def profile_layers(self, arg1: bool) -> None: ...
+    @property
+    def profiling(self) -> bool:
+        """
+        Record the timings of every detection call, off by default.
+
+        Each call is split into stages: ``decode`` (encoded images), ``preprocess``
+        (resizing and float conversion; for ``detect_many`` decoding as well, as
+        images are prepared in parallel), ``network`` (darknet's forward pass, box
+        decoding and NMS, which it runs as one call), ``nms`` (the NMS chosen with
+        ``set_nms``, unless it is darknet's) and ``pack`` (building the Python
+        result). See ``last_profile`` and ``profile_stats``. Disabled
+        profiling costs next to nothing, so it can stay in production code.
+        """
+    @profiling.setter
+    def profiling(self, arg1: bool) -> None: ...
+
+class FrameGate:
+    """
+    Skip inference on frames that barely differ from the last inferred one.
+
+    Meant for fixed cameras, whose frames are mostly the same scene. Each frame
+    is reduced to a luma thumbnail ``grid`` cells wide from a sparse sample of its
+    pixels; its motion score is the fraction of cells whose mean changed by more
+    than ``pixel_delta`` levels since the last frame that was inferred. Frames
+    scoring below ``threshold`` are gated, i.e. may reuse the previous
+    detections, but at most ``force_every - 1`` in a row (``0`` for no limit).
+
+    Pass a gate to ``StreamDetector``, or call ``check`` before detecting a frame
+    yourself. The counters tell how often frames were gated, to tune
+    ``threshold``. A gate follows one stream; it is thread-safe.
+    """
+
+    force_every: int
+    pixel_delta: int
+    threshold: float
+    def __init__(
+        self,
+        threshold: float = 0.01,
+        force_every: int = 30,
+        pixel_delta: int = 12,
+        grid: int = 64,
+    ) -> None: ...
+    def check(self, frame: typing_extensions.Buffer, force: bool = False) -> bool:
+        """
+        Return whether ``frame`` needs a new inference.
+
+        When it does (always with ``force=True``), ``frame`` becomes the
+        reference the next frames are compared against.
+        """
+    def reset(self) -> None:
+        """
+        Forget the reference frame and zero the counters
+        """
+    def score(self, frame: typing_extensions.Buffer) -> float:
+        """
+        Motion score of ``frame`` against the reference, without updating anything
+        """
+    @property
+    def forced(self) -> int:
+        """
+        Inferred frames that would have been gated but for ``force_every``
+        """
+    @property
+    def gated(self) -> int:
+        """
+        Frames that could reuse the previous detections
+        """
+    @property
+    def grid(self) -> int: ...
+    @property
+    def inferred(self) -> int:
+        """
+        Frames that needed an inference
+        """
+    @property
+    def last_score(self) -> float:
+        """
+        Motion score of the last checked frame
+        """
+
+class ImagePool:
+    """
+    A pool of fixed-size image buffers, typically the detector's input size.
+
+    ``acquire()`` and ``load()`` return ``image_t`` objects backed by recycled
+    buffers; closing or dropping such an image hands its buffer back to the
+    pool. Up to ``capacity`` idle buffers are kept for reuse, so memory stays
+    flat however many requests are served. The pool is thread-safe.
+    """
+
+    @typing.overload
+    def __init__(
+        self, width: int, height: int, channels: int = 3, capacity: int = 4
+    ) -> None: ...
+    @typing.overload
+    def __init__(self, detector: Detector, capacity: int = 4) -> None: ...
+    def acquire(self) -> image_t:
+        """
+        Take an image from the pool; its pixels are uninitialized
+        """
+    def clear(self) -> None:
+        """
+        Free all idle buffers
+        """
+    def load(
+        self,
+        data: typing_extensions.Buffer,
+        bgr: bool = False,
+        letterbox: bool = False,
+    ) -> image_t:
+        """
+        Take an image from the pool and fill it from ``data``.
+
+        ``data`` is any input ``Detector.detect_array`` accepts; it is resized
+        (or letterboxed) to the pool's size. ``Detector.detect`` reports the boxes
+        found in such an image in the coordinates of ``data``.
+        """
+    @property
+    def buffer_bytes(self) -> int: ...
+    @property
+    def bytes_resident(self) -> int: ...
+    @property
+    def capacity(self) -> int: ...
+    @property
+    def channels(self) -> int: ...
+    @property
+    def height(self) -> int: ...
+    @property
+    def hits(self) -> int: ...
+    @property
+    def idle(self) -> int: ...
+    @property
+    def in_use(self) -> int: ...
+    @property
+    def misses(self) -> int: ...
+    @property
+    def width(self) -> int: ...
+
+class ResultPublisher:
+    """
+    Stream detection results to TCP subscribers without blocking the caller.
+
+    Listens on ``host:port`` (``port=0`` picks a free port, see ``port``) until
+    closed; any number of clients may connect and disconnect meanwhile. Each
+    published result goes to every connected client as one message in
+    ``format``, see ``serialize``; with the default, one line of JSON::
+
+        {"frame":12,"boxes":[{"x":10,"y":20,"w":30,"h":40,"prob":0.9123,"obj_id":0,"track_id":0}]}
+
+    ``publish`` only queues the boxes. Serialization and sending happen on a
+    native background thread with non-blocking sockets, so a slow client never
+    stalls inference: every queue holds at most ``capacity`` messages and drops
+    its oldest one when full, counted in ``dropped``. Results published while no
+    client is connected are discarded. The publisher is thread-safe.
+
+    Unlike ``send_json_custom``, which opens the connection and blocks for every
+    message, the sockets stay open and ``publish`` returns at once.
+    """
+
+    def __init__(
+        self,
+        port: int = 8070,
+        host: str = "127.0.0.1",
+        capacity: int = 64,
+        format: _Format = "json",
+    ) -> None: ...
+    def __enter__(self) -> ResultPublisher: ...
+    def __exit__(self, *args: object) -> None: ...
+    def close(self) -> None:
+        """
+        Disconnect the subscribers and stop listening; queued results are dropped
+        """
+    def publish(self, boxes: _Records, frame: int | None = None) -> None:
+        """
+        Queue the boxes of one image for the subscribers.
+
+        ``boxes`` is a detection result in any output format of a single
+        image: a list of ``bbox_t``, a structured array or a dict of columns.
+        ``frame`` numbers the message, by default with the count of results
+        published before.
+        """
+    def publish_raw(self, message: str | bytes) -> None:
+        """
+        Queue a ``str`` or ``bytes`` message that is sent as is, without a newline added
+        """
+    @property
+    def capacity(self) -> int: ...
+    @property
+    def closed(self) -> bool:
+        """
+        Whether ``close`` was called
+        """
+    @property
+    def dropped(self) -> int:
+        """
+        Messages discarded because a queue was full
+        """
+    @property
+    def format(self) -> _Format: ...
+    @property
+    def port(self) -> int:
+        """
+        Port the publisher listens on
+        """
+    @property
+    def published(self) -> int:
+        """
+        Results and messages published so far
+        """
+    @property
+    def sent(self) -> int:
+        """
+        Messages written to a subscriber, counted once per subscriber
+        """
+    @property
+    def subscribers(self) -> int:
+        """
+        Clients connected now
+        """
+
+class StreamDetector:
+    """
+    Run a detector over a video file, URL (e.g. RTSP) or camera index.
+
+    Frames are decoded with OpenCV on a native background thread into a ring of
+    ``capacity`` frames while the previous frame is being detected. Iterating
+    yields ``(index, boxes)`` tuples, or ``(index, boxes, frame)`` with
+    ``return_frames=True`` (``frame`` is the decoded BGR uint8 array), where
+    ``index`` is the frame's position in the stream.
+
+    With ``latest=True`` (the default) inference always runs on the freshest
+    frame: older frames are dropped when detection falls behind and counted in
+    ``dropped``. Pass ``latest=False`` to process every frame of a file; decoding
+    then waits for room in the ring instead.
+
+    With a ``FrameGate``, frames it gates are not detected: they get a copy of the
+    boxes of the last inferred frame and are counted in ``gated``. A ``tracker``
+    (e.g. ``libdarknetpy.tracking.Tracker``, with ``output="array"`` or
+    ``"dict"``) is updated with the boxes of every frame, gated ones included, so
+    its tracks live on through static scenes. With a ``ResultPublisher``, the
+    boxes of every frame are published, numbered with the frame index.
+
+    A URL source that sends nothing for 5 seconds ends the stream (10 seconds
+    to connect), so a stalled camera can't block ``close``; this needs OpenCV
+    4.5.2 or later. The detector must not be used elsewhere while the stream
+    is iterated.
+    """
+
+    def __init__(
+        self,
+        detector: Detector,
+        source: str | int,
+        capacity: int = 4,
+        latest: bool = True,
+        thresh: float = 0.2,
+        use_mean: bool = False,
+        letterbox: bool = False,
+        return_frames: bool = False,
+        output: _Output = "list",
+        gate: FrameGate | None = None,
+        tracker: typing.Any | None = None,
+        publisher: ResultPublisher | None = None,
+    ) -> None: ...
+    def __enter__(self) -> StreamDetector: ...
+    def __exit__(self, *args: object) -> None: ...
+    def __iter__(self) -> StreamDetector: ...
+    def __next__(self) -> tuple[typing.Any, ...]: ...
+    def close(self) -> None:
+        """
+        Stop decoding; iteration ends
+        """
+    @property
+    def buffered(self) -> int:
+        """
+        Frames waiting in the ring
+        """
+    @property
+    def decoded(self) -> int:
+        """
+        Frames decoded so far
+        """
+    @property
+    def dropped(self) -> int:
+        """
+        Frames skipped because a newer one was available
+        """
+    @property
+    def fps(self) -> float:
+        """
+        Frame rate reported by the source, 0 if unknown
+        """
+    @property
+    def gated(self) -> int:
+        """
+        Frames that reused the detections of an earlier frame
+        """
+    @property
+    def processed(self) -> int:
+        """
+        Frames detected so far
+        """
 
 class bbox_t:
     frames_counter: int
@@ -76,12 +668,34 @@ class bbox_t:
     y: int
     y_3d: float
     z_3d: float
+    def __getstate__(self) -> tuple: ...
+    def __init__(self) -> None: ...
+    def __setstate__(self, arg0: tuple) -> None: ...
 
 class image_t:
+    """
+    A planar float image as darknet consumes it.
+
+    The image owns its pixels: they are released when the object is collected,
+    when ``close()`` is called or when a ``with`` block using it ends. Images
+    from an ``ImagePool`` hand their buffer back to the pool instead.
+    """
+
     c: int
     h: int
     w: int
+    @typing.overload
+    def __init__(self, data: typing_extensions.Buffer, bgr: bool = False) -> None: ...
+    @typing.overload
     def __init__(self, vdata: list[int] | None = None) -> None: ...
+    def __enter__(self) -> image_t: ...
+    def __exit__(self, *args: object) -> None: ...
+    def close(self) -> None:
+        """
+        Release the pixels; the image is empty afterwards
+        """
+    @property
+    def closed(self) -> bool: ...
 
 def built_with_cuda() -> bool:
     """
@@ -98,6 +712,33 @@ def built_with_opencv() -> bool:
     Check if the library was built with OpenCV support
     """
 
+def compile_model(
+    configurationFilename: str, weightsFilename: str, outputFilename: str
+) -> None:
+    """
+    Save a .cfg/.weights pair as one compiled model file for ``Detector.from_compiled``.
+
+    Batch norm is folded into the convolutions, and the weights of weighted
+    shortcuts normalized, once here instead of every time the model is
+    loaded. The output is also a valid .weights file for the rewritten .cfg
+    stored at its end.
+    """
+
+def decode_binary(
+    data: typing_extensions.Buffer, return_frame: bool = False
+) -> numpy.ndarray | tuple[int | None, numpy.ndarray]:
+    """
+    Read a message of the ``"binary"`` format as a structured array.
+
+    ``data`` is ``bytes`` or any contiguous buffer, e.g. a ``bytearray``
+    filled by ``socket.recv_into``. The array has the dtype of
+    ``output="array"`` results, with the ``frame`` column for batched
+    results, and is a read-only view of ``data``, which can't be resized
+    while the array exists. With ``return_frame=True``, returns
+    ``(frame, records)`` where ``frame`` is the header's frame number or
+    ``None``.
+    """
+
 def get_device_count() -> int:
     """
     Get the number of available GPUs
@@ -108,9 +749,65 @@ def get_device_name(gpu: int, deviceName: str) -> int:
     Get the name of a GPU by index
     """
 
+def metrics_snapshot() -> dict[str, typing.Any]:
+    """
+    Return the process-wide detection metrics as a dict.
+
+    Counters: ``inferences`` (detection calls), ``images``, ``boxes``,
+    ``failures`` (calls that raised) and ``decoded_bytes``. Gauges:
+    ``image_buffers`` and ``image_buffer_bytes``, the ``image_t`` buffers
+    currently allocated, including the idle ones ``ImagePool`` keeps.
+    ``inference_seconds`` and each entry of ``stage_seconds`` are latency
+    histograms with ``count``, ``sum`` and cumulative ``buckets``. See
+    ``libdarknetpy.metrics`` for the Prometheus text format.
+    """
+
+def nms(
+    boxes: list[bbox_t],
+    threshold: float = 0.45,
+    method: _NmsMethod = "greedy",
+    class_aware: bool = True,
+    top_k: int = 0,
+    max_detections: int = 0,
+    sigma: float = 0.5,
+    score_threshold: float = 0.0,
+    output: _Output = "list",
+) -> _Boxes:
+    """
+    Suppress overlapping boxes in a list of ``bbox_t``, e.g. merged results.
+
+    Takes the options of ``Detector.set_nms`` (``"darknet"`` excepted);
+    soft-NMS drops boxes whose score decays below ``score_threshold``.
+    Returns the boxes kept, ordered by decreasing score.
+    """
+
 def send_json_custom(send_buf: str, port: int, timeout: int) -> None:
     """
-    Send a JSON string over a socket
+    Send a JSON string over a socket, blocking until it is sent; see ``ResultPublisher`` for a result feed
+    """
+
+def serialize(
+    boxes: _Records, format: _Format = "json", frame: int | None = None
+) -> bytes:
+    """
+    Serialize the boxes of one image to ``bytes``.
+
+    ``boxes`` is a list of ``bbox_t``, a structured array or a dict of
+    columns. Detection calls produce the same bytes straight from their
+    results with ``output="json"``, ``"msgpack"`` or ``"binary"``, which
+    skips building the boxes in Python at all. Every format is a stream of
+    self-delimiting messages, one per image, numbered with ``frame``
+    (``null`` when not given; the image index for batched results):
+
+    * ``"json"``: one line ``{"frame":0,"boxes":[{"x":..,"y":..,"w":..,"h":..,
+      "prob":..,"obj_id":..,"track_id":..},...]}``, scores with 4 decimals;
+    * ``"msgpack"``: the same map in MessagePack, scores as float32;
+    * ``"binary"``: a 24-byte header followed by the records of the
+      ``output="array"`` dtype, little-endian. ``decode_binary`` reads it.
+      The header holds ``b"DKNB"``, the format version (uint16), the record
+      size (uint16), the record count (uint32), 4 reserved bytes and the
+      frame (int64, -1 for none). A batched result is a single message whose
+      records have the ``frame`` column.
     """
 
 __version__: str = "0.0.1"
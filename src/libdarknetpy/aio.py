@@ -0,0 +1,193 @@
+"""
+asyncio front end for ``Detector``.
+
+``AsyncDetector`` owns one or more ``Detector`` instances, each driven by its
+own worker thread, and lets coroutines await detections without blocking the
+event loop. Requests go through a bounded queue: once ``max_queue`` requests
+are pending, further callers wait for a slot instead of piling up work, which
+gives a server natural backpressure.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import queue
+import threading
+from typing import TYPE_CHECKING, Any, Sequence
+
+if TYPE_CHECKING:
+    from ._libdarknetpy import Detector
+
+__all__ = ["AsyncDetector"]
+
+_STOP = object()
+
+
+class AsyncDetector:
+    """
+    Run ``Detector`` calls on dedicated worker threads and await the results.
+
+    Each detector in ``detectors`` gets a worker thread of its own, so requests
+    are served by ``len(detectors)`` networks in parallel (the bindings release
+    the GIL while they run). At most ``max_queue`` requests may be pending at a
+    time, counting the ones being processed; ``detect*`` waits for a free slot
+    once the queue is full.
+
+    Every ``detect*`` coroutine accepts a ``timeout`` in seconds covering both
+    the wait for a slot and the detection itself; ``asyncio.TimeoutError`` is
+    raised when it expires. A request that is cancelled or times out before a
+    worker picks it up is never run. Arguments are handed to the worker as is,
+    so don't modify an array while a request using it is pending.
+
+    The instance must be used from a single event loop. Use ``load`` to create
+    the detectors from model files, and ``aclose`` (or ``async with``) to stop
+    the workers.
+    """
+
+    def __init__(self, detectors: Sequence[Detector], max_queue: int = 64) -> None:
+        if not detectors:
+            msg = "AsyncDetector needs at least one detector"
+            raise ValueError(msg)
+        if max_queue < 1:
+            msg = "max_queue must be at least 1"
+            raise ValueError(msg)
+        self.detectors = list(detectors)
+        self.max_queue = max_queue
+        self._jobs: queue.SimpleQueue = queue.SimpleQueue()
+        self._slots: asyncio.Semaphore | None = None
+        self._pending = 0
+        self._closed = False
+        self._threads = [
+            threading.Thread(
+                target=self._work, args=(det,), name=f"AsyncDetector-{i}", daemon=True
+            )
+            for i, det in enumerate(self.detectors)
+        ]
+        for t in self._threads:
+            t.start()
+
+    @classmethod
+    def load(
+        cls,
+        configurationFilename: str,
+        weightsFilename: str,
+        gpu: int = 0,
+        batch_size: int = 1,
+        workers: int = 1,
+        max_queue: int = 64,
+    ) -> AsyncDetector:
+        """Create ``workers`` detectors for the given model, one at a time."""
+        from ._libdarknetpy import Detector
+
+        detectors = [
+            Detector(configurationFilename, weightsFilename, gpu, batch_size)
+            for _ in range(workers)
+        ]
+        return cls(detectors, max_queue)
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of requests waiting for a worker."""
+        return self._jobs.qsize()
+
+    @property
+    def pending(self) -> int:
+        """Number of accepted requests that have not finished, queued or running."""
+        return self._pending
+
+    async def detect(self, *args: Any, timeout: float | None = None, **kwargs: Any):
+        """Await ``Detector.detect`` with the given arguments."""
+        return await self._submit("detect", args, kwargs, timeout)
+
+    async def detect_array(
+        self, *args: Any, timeout: float | None = None, **kwargs: Any
+    ):
+        """Await ``Detector.detect_array`` with the given arguments."""
+        return await self._submit("detect_array", args, kwargs, timeout)
+
+    async def detect_raw(self, *args: Any, timeout: float | None = None, **kwargs: Any):
+        """Await ``Detector.detect_raw`` with the given arguments."""
+        return await self._submit("detect_raw", args, kwargs, timeout)
+
+    async def detect_many(
+        self, *args: Any, timeout: float | None = None, **kwargs: Any
+    ):
+        """Await ``Detector.detect_many`` with the given arguments."""
+        return await self._submit("detect_many", args, kwargs, timeout)
+
+    async def aclose(self) -> None:
+        """Finish the pending requests, then stop the worker threads."""
+        if self._closed:
+            return
+        self._closed = True
+        for _ in self._threads:
+            self._jobs.put(_STOP)
+        loop = asyncio.get_running_loop()
+        for t in self._threads:
+            await loop.run_in_executor(None, t.join)
+
+    async def __aenter__(self) -> AsyncDetector:
+        return self
+
+    async def __aexit__(self, *args: object) -> None:
+        await self.aclose()
+
+    async def _submit(
+        self, method: str, args: tuple, kwargs: dict, timeout: float | None
+    ):
+        if timeout is None:
+            return await self._run(method, args, kwargs)
+        return await asyncio.wait_for(self._run(method, args, kwargs), timeout)
+
+    async def _run(self, method: str, args: tuple, kwargs: dict):
+        if self._closed:
+            msg = "AsyncDetector is closed"
+            raise RuntimeError(msg)
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_queue)
+        await self._slots.acquire()
+        # aclose may have run while this request waited for its slot; nothing
+        # awaits between this check and the put, so the job can't land behind
+        # the stop markers
+        if self._closed:
+            self._slots.release()
+            msg = "AsyncDetector is closed"
+            raise RuntimeError(msg)
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self._pending += 1
+        self._jobs.put((fut, loop, method, args, kwargs))
+        # cancelling this coroutine cancels `fut`, which the worker checks
+        # before it starts the request
+        return await fut
+
+    def _finish(self, fut: asyncio.Future, result: Any, exc: BaseException | None):
+        # runs on the event loop; the slot is only freed once the worker is
+        # done with the request, even if the caller stopped waiting for it
+        self._pending -= 1
+        assert self._slots is not None
+        self._slots.release()
+        if fut.done():
+            return
+        if exc is not None:
+            fut.set_exception(exc)
+        else:
+            fut.set_result(result)
+
+    def _work(self, det: Detector) -> None:
+        while True:
+            job = self._jobs.get()
+            if job is _STOP:
+                return
+            fut, loop, method, args, kwargs = job
+            result, exc = None, None
+            if not fut.cancelled():
+                try:
+                    result = getattr(det, method)(*args, **kwargs)
+                except Exception as e:
+                    exc = e
+            try:
+                loop.call_soon_threadsafe(self._finish, fut, result, exc)
+            except RuntimeError:
+                # the event loop is closed, nobody is waiting anymore
+                pass
@@ -0,0 +1,241 @@
+"""
+Dynamic micro-batching in front of ``Detector.detect_many``.
+
+Single-image requests from many callers are collected into batches: a batch is
+dispatched as soon as it holds ``max_batch`` images or ``max_latency`` seconds
+after its first request arrived, whichever comes first. Each batch is one
+``detect_many`` call, i.e. one forward pass per ``Detector.batch_size`` images,
+and every caller gets back the boxes of its own image.
+"""
+
+from __future__ import annotations
+
+import bisect
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+if TYPE_CHECKING:
+    from ._libdarknetpy import Detector
+
+__all__ = ["BatchScheduler"]
+
+# upper bounds, in seconds, of the queue-wait histogram buckets
+WAIT_BUCKETS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.25, 1.0)
+
+# output formats serialized per caller from the split "array" result
+_SERIALIZED = ("json", "msgpack", "binary")
+
+_STOP = object()
+
+
+class _Request(NamedTuple):
+    image: Any
+    future: Future
+    submitted: float
+
+
+class BatchScheduler:
+    """
+    Collect single-image requests into batched forward passes.
+
+    ``max_batch`` defaults to the detector's ``batch_size``, which is what a
+    single forward pass can hold; smaller batches still cost a full pass, so
+    construct the detector with the batch size you want to run. The detection
+    parameters are fixed per scheduler since a batch is one ``detect_many``
+    call. With ``output="array"`` or ``"dict"`` each caller gets the records
+    of its own image (the ``frame`` column is then always the batch index).
+    With ``"json"``, ``"msgpack"`` or ``"binary"`` each caller gets its boxes
+    serialized as a single-image message, see ``libdarknetpy.serialize``.
+
+    ``detect_many`` fails as a whole when one of its images can't be decoded,
+    so a failed batch is run again one request at a time: only the callers of
+    the bad images get the error.
+
+    ``submit`` returns a ``concurrent.futures.Future``; asyncio code can await
+    it through ``asyncio.wrap_future``. The batches are run on a background
+    thread, which owns the detector until ``close`` is called.
+    """
+
+    def __init__(
+        self,
+        detector: Detector,
+        max_batch: int | None = None,
+        max_latency: float = 0.005,
+        thresh: float = 0.2,
+        make_nms: bool = True,
+        bgr: bool = False,
+        letterbox: bool = False,
+        output: str = "list",
+    ) -> None:
+        self.detector = detector
+        self.max_batch = max_batch or detector.batch_size
+        if self.max_batch < 1:
+            msg = "max_batch must be at least 1"
+            raise ValueError(msg)
+        self.max_latency = max_latency
+        self.options = {
+            "thresh": thresh,
+            "make_nms": make_nms,
+            "bgr": bgr,
+            "letterbox": letterbox,
+            "output": "array" if output in _SERIALIZED else output,
+        }
+        self._format = output if output in _SERIALIZED else None
+        self._requests: queue.SimpleQueue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._batch_sizes: dict[int, int] = {}
+        self._wait_buckets = [0] * (len(WAIT_BUCKETS) + 1)
+        self._wait_sum = 0.0
+        self._wait_max = 0.0
+        self._thread = threading.Thread(
+            target=self._work, name="BatchScheduler", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, image: Any) -> Future:
+        """Queue ``image`` (any ``detect_array`` input) for the next batch."""
+        fut: Future = Future()
+        # under the lock, so no request can be queued behind the stop marker
+        with self._lock:
+            if self._closed:
+                msg = "BatchScheduler is closed"
+                raise RuntimeError(msg)
+            self._requests.put(_Request(image, fut, time.perf_counter()))
+        return fut
+
+    def detect(self, image: Any, timeout: float | None = None):
+        """Submit ``image`` and wait for its boxes."""
+        return self.submit(image).result(timeout)
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of requests waiting to be batched."""
+        return self._requests.qsize()
+
+    def stats(self) -> dict:
+        """
+        Return a snapshot of the scheduler counters.
+
+        ``batch_sizes`` maps each batch size to the number of batches of that
+        size. ``queue_wait`` describes the time requests spent queued before
+        their batch was dispatched: ``buckets`` holds cumulative counts per
+        upper bound in seconds (the last bound is infinite), like a Prometheus
+        histogram.
+        """
+        with self._lock:
+            count = sum(self._wait_buckets)
+            cumulative, total = [], 0
+            for n in self._wait_buckets:
+                total += n
+                cumulative.append(total)
+            return {
+                "batches": sum(self._batch_sizes.values()),
+                "requests": count,
+                "batch_sizes": dict(sorted(self._batch_sizes.items())),
+                "queue_wait": {
+                    "count": count,
+                    "sum": self._wait_sum,
+                    "max": self._wait_max,
+                    "buckets": list(zip((*WAIT_BUCKETS, float("inf")), cumulative)),
+                },
+            }
+
+    def close(self) -> None:
+        """Run the queued requests, then stop the background thread."""
+        with self._lock:
+            if not self._closed:
+                self._closed = True
+                self._requests.put(_STOP)
+        self._thread.join()
+
+    def __enter__(self) -> BatchScheduler:
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
+
+    def _work(self) -> None:
+        while True:
+            first = self._requests.get()
+            if first is _STOP:
+                return
+            batch = [first]
+            deadline = first.submitted + self.max_latency
+            stop = False
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._requests.get(
+                        timeout=max(0.0, deadline - time.perf_counter())
+                    )
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            self._dispatch(batch)
+            if stop:
+                return
+
+    def _dispatch(self, batch: list[_Request]) -> None:
+        batch = [r for r in batch if r.future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        now = time.perf_counter()
+        with self._lock:
+            n = len(batch)
+            self._batch_sizes[n] = self._batch_sizes.get(n, 0) + 1
+            for r in batch:
+                wait = now - r.submitted
+                self._wait_buckets[bisect.bisect_left(WAIT_BUCKETS, wait)] += 1
+                self._wait_sum += wait
+                self._wait_max = max(self._wait_max, wait)
+
+        try:
+            results = self._detect([r.image for r in batch])
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0].future.set_exception(e)
+                return
+            # one bad image fails the whole detect_many call; rerun the
+            # requests alone so the good ones still get their boxes
+            for r in batch:
+                try:
+                    (boxes,) = self._detect([r.image])
+                except Exception as e:
+                    r.future.set_exception(e)
+                else:
+                    r.future.set_result(boxes)
+            return
+        for r, boxes in zip(batch, results):
+            r.future.set_result(boxes)
+
+    def _detect(self, images: list) -> list:
+        """Run one ``detect_many`` call, returning the per-image results."""
+        results = self.detector.detect_many(images, **self.options)
+        results = _split(results, len(images), self.options["output"])
+        if self._format:
+            from ._libdarknetpy import serialize
+
+            results = [serialize(r, self._format) for r in results]
+        return results
+
+
+def _split(results: Any, n: int, output: str) -> list:
+    """Split a batched ``detect_many`` result into per-image results."""
+    if output == "list":
+        return list(results)
+    import numpy as np
+
+    frames = results["frame"]
+    bounds = np.searchsorted(frames, np.arange(n + 1))
+    if output == "dict":
+        return [
+            {k: v[lo:hi] for k, v in results.items()}
+            for lo, hi in zip(bounds[:-1], bounds[1:])
+        ]
+    return [results[lo:hi] for lo, hi in zip(bounds[:-1], bounds[1:])]
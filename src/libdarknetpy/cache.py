@@ -0,0 +1,257 @@
+"""
+Result cache for repeated images.
+
+Retries, re-sent thumbnails and static scenes submit the exact same encoded
+image again and again. ``ResultCache`` sits in front of ``Detector.detect_raw``
+and returns the boxes of an image it has already seen without decoding it or
+running the network. Entries are keyed on a BLAKE2b hash of the encoded bytes
+together with the model identity and every parameter that affects the result:
+the threshold, ``use_mean``, ``letterbox``, the output format, the
+detector's NMS settings and the ``precision`` of its weights.
+
+The in-memory tier is an LRU bounded by an approximate size in bytes, with an
+optional time to live. An optional on-disk tier keeps results across runs,
+e.g. for batch jobs reprocessing the same files. Concurrent requests for a key
+that is being computed wait for that one inference instead of running their
+own.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import pickle
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from ._libdarknetpy import Detector
+
+__all__ = ["ResultCache"]
+
+# rough per-entry bookkeeping cost, and size of one bbox_t object, in bytes
+_ENTRY_BYTES = 256
+_BBOX_BYTES = 96
+
+_MISSING = object()
+
+
+def _size(value: Any) -> int:
+    """Approximate memory held by a ``detect_raw`` result."""
+    if isinstance(value, dict):
+        return sum(sys.getsizeof(v) for v in value.values())
+    if isinstance(value, list):
+        return sys.getsizeof(value) + _BBOX_BYTES * len(value)
+    return sys.getsizeof(value)
+
+
+def _freeze(value: Any) -> None:
+    """Make the arrays of a result read-only, as hits share them."""
+    for v in value.values() if isinstance(value, dict) else (value,):
+        if hasattr(v, "flags"):
+            v.flags.writeable = False
+
+
+class ResultCache:
+    """
+    Cache ``Detector.detect_raw`` results by image content.
+
+    ``max_bytes`` bounds the approximate memory held by the cached results;
+    the least recently used ones are evicted first. Entries older than ``ttl``
+    seconds are not returned anymore (``None`` keeps them until evicted).
+
+    ``model_id`` identifies the network, e.g. the name and version of the
+    weights; it defaults to the identity of ``detector``, which is only
+    meaningful within this process. ``directory`` enables the on-disk tier:
+    every result is also pickled there, and memory misses are looked up there
+    before running the network. The disk tier is not size-bounded and needs an
+    explicit ``model_id``, since its entries outlive the detector.
+
+    Hits return the very object that was cached: NumPy results are made
+    read-only, and ``bbox_t`` lists must not be modified either. Misses for
+    different images call ``detector`` from the calling threads, so the
+    usual rule applies: share a cache between threads only if they may share
+    its detector.
+    """
+
+    def __init__(
+        self,
+        detector: Detector,
+        max_bytes: int = 64 << 20,
+        ttl: float | None = None,
+        directory: str | os.PathLike | None = None,
+        model_id: str | None = None,
+    ) -> None:
+        if max_bytes < 0:
+            msg = "max_bytes must not be negative"
+            raise ValueError(msg)
+        if ttl is not None and ttl <= 0:
+            msg = "ttl must be positive"
+            raise ValueError(msg)
+        if directory is not None and model_id is None:
+            msg = "a cache directory needs a model_id"
+            raise ValueError(msg)
+        self.detector = detector
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.directory = None if directory is None else os.fspath(directory)
+        self.model_id = model_id or f"{type(detector).__name__}@{id(detector):x}"
+        self._lock = threading.Lock()
+        # key -> (result, size, expiry on the monotonic clock), oldest first
+        self._entries: OrderedDict[tuple, tuple[Any, int, float]] = OrderedDict()
+        self._inflight: dict[tuple, Future] = {}
+        self._bytes = 0
+        self._counts = dict.fromkeys(
+            ("hits", "misses", "disk_hits", "collapsed", "evictions", "expired"), 0
+        )
+        self._counts["disk_errors"] = 0
+
+    def detect_raw(
+        self,
+        data: Any,
+        thresh: float = 0.2,
+        use_mean: bool = False,
+        letterbox: bool = False,
+        output: str = "list",
+    ):
+        """``Detector.detect_raw``, answered from the cache when possible."""
+        if isinstance(data, list):
+            data = bytes(data)
+        key = self._key(data, thresh, use_mean, letterbox, output)
+        with self._lock:
+            value = self._lookup(key)
+            if value is not _MISSING:
+                self._counts["hits"] += 1
+                return value
+            fut = self._inflight.get(key)
+            if fut is None:
+                self._counts["misses"] += 1
+                fut = self._inflight[key] = Future()
+                leader = True
+            else:
+                self._counts["collapsed"] += 1
+                leader = False
+        if not leader:
+            return fut.result()
+
+        try:
+            value = self._load(key) if self.directory else _MISSING
+            if value is _MISSING:
+                value = self.detector.detect_raw(
+                    data,
+                    thresh=thresh,
+                    use_mean=use_mean,
+                    letterbox=letterbox,
+                    output=output,
+                )
+                if self.directory:
+                    self._store(key, value)
+            _freeze(value)
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[key]
+            fut.set_exception(e)
+            raise
+        with self._lock:
+            del self._inflight[key]
+            self._insert(key, value)
+        fut.set_result(value)
+        return value
+
+    def stats(self) -> dict:
+        """
+        Return a snapshot of the cache counters.
+
+        ``misses`` counts the requests not found in memory, ``disk_hits`` those
+        of them found on disk, and ``collapsed`` the requests that waited for
+        an identical one in progress instead of missing themselves.
+        ``evictions`` and ``expired`` count the entries dropped for space and
+        for age, ``entries`` and ``bytes`` describe the memory tier now.
+        """
+        with self._lock:
+            return {
+                **self._counts,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def clear(self) -> None:
+        """Drop every entry of the memory tier; the disk tier is kept."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _key(self, data: Any, *params: Any) -> tuple:
+        digest = hashlib.blake2b(data, digest_size=16).digest()
+        nms = getattr(self.detector, "nms", None)
+        nms_options = getattr(self.detector, "nms_options", None) or {}
+        precision = getattr(self.detector, "precision", None)
+        return (digest, *params, nms, *sorted(nms_options.items()), precision)
+
+    def _lookup(self, key: tuple) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return _MISSING
+        value, size, expires = entry
+        if expires < time.monotonic():
+            del self._entries[key]
+            self._bytes -= size
+            self._counts["expired"] += 1
+            return _MISSING
+        self._entries.move_to_end(key)
+        return value
+
+    def _insert(self, key: tuple, value: Any) -> None:
+        size = _size(value) + _ENTRY_BYTES
+        if size > self.max_bytes:
+            return
+        while self._bytes + size > self.max_bytes:
+            _, (_, old, _) = self._entries.popitem(last=False)
+            self._bytes -= old
+            self._counts["evictions"] += 1
+        expires = float("inf") if self.ttl is None else time.monotonic() + self.ttl
+        self._entries[key] = (value, size, expires)
+        self._bytes += size
+
+    def _path(self, key: tuple) -> str:
+        name = hashlib.blake2b(
+            repr((self.model_id, *key)).encode(), digest_size=20
+        ).hexdigest()
+        return os.path.join(self.directory, name[:2], name + ".pkl")
+
+    def _load(self, key: tuple) -> Any:
+        path = self._path(key)
+        try:
+            if self.ttl is not None and time.time() - os.path.getmtime(path) > self.ttl:
+                return _MISSING
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            return _MISSING
+        except (OSError, pickle.UnpicklingError, EOFError):
+            with self._lock:
+                self._counts["disk_errors"] += 1
+            return _MISSING
+        with self._lock:
+            self._counts["disk_hits"] += 1
+        return value
+
+    def _store(self, key: tuple, value: Any) -> None:
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp, "wb") as f:
+                pickle.dump(value, f, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        except OSError:
+            with self._lock:
+                self._counts["disk_errors"] += 1
@@ -0,0 +1,11 @@
+#pragma once
+#include <pybind11/pybind11.h>
+
+// darknet's C++ API only declares its cv::Mat overloads when OPENCV is defined, and
+// every translation unit has to see the same declarations.
+#ifndef OPENCV
+#define OPENCV 1
+#endif
+#include "yolo_v2_class.hpp"
+
+namespace py = pybind11;
@@ -0,0 +1,229 @@
+#include <cctype>
+#include <cstdint>
+#include <cstdio>
+#include <cstdlib>
+#include <cstring>
+#include <memory>
+#include <sstream>
+#include <stdexcept>
+#include <string>
+
+#ifdef _WIN32
+#include <windows.h>
+#else
+#include <unistd.h>
+#endif
+
+// darknet.h and yolo_v2_class.hpp don't mix, so this file only uses the C API
+#include "darknet.h"
+#include "compiled_model.hpp"
+
+static const char COMPILED_MAGIC[8] = {'D', 'N', 'P', 'Y', 'M', 'O', 'D', 'L'};
+// magic, cfg offset, cfg size
+static const long FOOTER_SIZE = 8 + 2 * sizeof(uint64_t);
+
+struct file_closer
+{
+    void operator()(FILE *fp) const { fclose(fp); }
+};
+typedef std::unique_ptr<FILE, file_closer> file_ptr;
+
+struct network_deleter
+{
+    void operator()(network *net) const { free_network_ptr(net); }
+};
+
+static file_ptr open_file(const std::string &path, const char *mode)
+{
+    file_ptr fp(fopen(path.c_str(), mode));
+    if (!fp)
+        throw std::runtime_error("Can't open " + path);
+    return fp;
+}
+
+static void write_bytes(FILE *fp, const void *data, size_t size, size_t n)
+{
+    if (n && fwrite(data, size, n, fp) != n)
+        throw std::runtime_error("Can't write compiled model");
+}
+
+// Writes the parameters of one layer in the order darknet's save_weights does.
+static void write_layer(FILE *fp, const layer &l)
+{
+    switch (l.type)
+    {
+    case CONVOLUTIONAL:
+    case DECONVOLUTIONAL:
+        if (l.share_layer)
+            return;
+        if (l.binary)
+            throw std::invalid_argument("Can't compile binary (XNOR) convolutional layers");
+        write_bytes(fp, l.biases, sizeof(float), l.n);
+        if (l.batch_normalize)
+        {
+            write_bytes(fp, l.scales, sizeof(float), l.n);
+            write_bytes(fp, l.rolling_mean, sizeof(float), l.n);
+            write_bytes(fp, l.rolling_variance, sizeof(float), l.n);
+        }
+        write_bytes(fp, l.weights, sizeof(float), l.nweights);
+        break;
+    case CONNECTED:
+        write_bytes(fp, l.biases, sizeof(float), l.outputs);
+        write_bytes(fp, l.weights, sizeof(float), (size_t)l.outputs * l.inputs);
+        if (l.batch_normalize)
+        {
+            write_bytes(fp, l.scales, sizeof(float), l.outputs);
+            write_bytes(fp, l.rolling_mean, sizeof(float), l.outputs);
+            write_bytes(fp, l.rolling_variance, sizeof(float), l.outputs);
+        }
+        break;
+    case BATCHNORM:
+        write_bytes(fp, l.scales, sizeof(float), l.c);
+        write_bytes(fp, l.rolling_mean, sizeof(float), l.c);
+        write_bytes(fp, l.rolling_variance, sizeof(float), l.c);
+        break;
+    case SHORTCUT:
+    case IMPLICIT:
+        write_bytes(fp, l.weights, sizeof(float), l.nweights);
+        break;
+    case LOCAL:
+    case RNN:
+    case GRU:
+    case LSTM:
+    case CONV_LSTM:
+    case CRNN:
+        throw std::invalid_argument("Can't compile networks with recurrent or local layers");
+    default:
+        break;
+    }
+}
+
+static std::string read_text(const std::string &path)
+{
+    file_ptr fp = open_file(path, "rb");
+    std::string text;
+    char buf[4096];
+    size_t n;
+    while ((n = fread(buf, 1, sizeof(buf), fp.get())) > 0)
+        text.append(buf, n);
+    return text;
+}
+
+// Whether `key` (an option line without spaces) is a setting fuse_conv_batchnorm has
+// already applied to the weights of `l`: the batch norm of convolutions, and the
+// normalization of weighted shortcuts. Either would be applied again on load.
+static bool is_fused_option(const std::string &key, const layer &l)
+{
+    if (l.type == CONVOLUTIONAL && !l.batch_normalize)
+        return key.compare(0, 16, "batch_normalize=") == 0;
+    if (l.type == SHORTCUT && l.weights_normalization == NO_NORMALIZATION)
+        return key.compare(0, 22, "weights_normalization=") == 0;
+    return false;
+}
+
+// Drops the options of every section that fuse_conv_batchnorm folded into the weights.
+// Sections map to layers in order, after the leading [net] section.
+static std::string strip_fused_options(const std::string &cfg, const network &net)
+{
+    std::istringstream in(cfg);
+    std::ostringstream out;
+    std::string line;
+    int section = -1;
+    while (std::getline(in, line))
+    {
+        std::string key;
+        for (char ch : line)
+            if (!isspace((unsigned char)ch))
+                key += ch;
+        if (!key.empty() && key[0] == '[')
+            ++section;
+        int idx = section - 1;
+        if (idx >= 0 && idx < net.n && is_fused_option(key, net.layers[idx]))
+            continue;
+        out << line << '\n';
+    }
+    if (section != net.n)
+        throw std::invalid_argument("The .cfg sections don't match the loaded network");
+    return out.str();
+}
+
+void compile_model(const std::string &cfg_filename, const std::string &weight_filename, const std::string &out)
+{
+    std::string cfg = read_text(cfg_filename);
+    std::unique_ptr<network, network_deleter> net(
+        load_network_custom(const_cast<char *>(cfg_filename.c_str()), const_cast<char *>(weight_filename.c_str()), 0, 1));
+    if (!net)
+        throw std::runtime_error("Can't load " + cfg_filename);
+    fuse_conv_batchnorm(*net);
+    cfg = strip_fused_options(cfg, *net);
+
+    file_ptr fp = open_file(out, "wb");
+    // weights header: major, minor, revision, images seen
+    const int32_t version[3] = {0, 2, 5};
+    const uint64_t seen = net->seen ? *net->seen : 0;
+    write_bytes(fp.get(), version, sizeof(int32_t), 3);
+    write_bytes(fp.get(), &seen, sizeof(seen), 1);
+    for (int i = 0; i < net->n; ++i)
+        write_layer(fp.get(), net->layers[i]);
+
+    const uint64_t cfg_offset = (uint64_t)ftell(fp.get()), cfg_size = cfg.size();
+    write_bytes(fp.get(), cfg.data(), 1, cfg.size());
+    write_bytes(fp.get(), COMPILED_MAGIC, 1, sizeof(COMPILED_MAGIC));
+    write_bytes(fp.get(), &cfg_offset, sizeof(cfg_offset), 1);
+    write_bytes(fp.get(), &cfg_size, sizeof(cfg_size), 1);
+    if (fflush(fp.get()) != 0)
+        throw std::runtime_error("Can't write " + out);
+}
+
+std::string read_compiled_cfg(const std::string &path)
+{
+    file_ptr fp = open_file(path, "rb");
+    char magic[sizeof(COMPILED_MAGIC)];
+    uint64_t cfg_offset = 0, cfg_size = 0;
+    if (fseek(fp.get(), -FOOTER_SIZE, SEEK_END) != 0 ||
+        fread(magic, 1, sizeof(magic), fp.get()) != sizeof(magic) ||
+        memcmp(magic, COMPILED_MAGIC, sizeof(magic)) != 0 ||
+        fread(&cfg_offset, sizeof(cfg_offset), 1, fp.get()) != 1 ||
+        fread(&cfg_size, sizeof(cfg_size), 1, fp.get()) != 1)
+        throw std::invalid_argument(path + " is not a compiled model");
+    std::string cfg(cfg_size, '\0');
+    if (fseek(fp.get(), (long)cfg_offset, SEEK_SET) != 0 ||
+        fread(&cfg[0], 1, cfg_size, fp.get()) != cfg_size)
+        throw std::invalid_argument(path + " is truncated");
+    return cfg;
+}
+
+temp_file::temp_file(const std::string &text)
+{
+#ifdef _WIN32
+    char dir[MAX_PATH], name[MAX_PATH];
+    if (!GetTempPathA(MAX_PATH, dir) || !GetTempFileNameA(dir, "dnp", 0, name))
+        throw std::runtime_error("Can't create a temporary file");
+    path = name;
+    file_ptr fp = open_file(path, "wb");
+#else
+    const char *dir = getenv("TMPDIR");
+    path = std::string(dir && *dir ? dir : "/tmp") + "/libdarknetpy-XXXXXX";
+    int fd = mkstemp(&path[0]);
+    if (fd < 0)
+        throw std::runtime_error("Can't create a temporary file");
+    file_ptr fp(fdopen(fd, "wb"));
+    if (!fp)
+    {
+        close(fd);
+        std::remove(path.c_str());
+        throw std::runtime_error("Can't create a temporary file");
+    }
+#endif
+    if (fwrite(text.data(), 1, text.size(), fp.get()) != text.size() || fflush(fp.get()) != 0)
+    {
+        fp.reset();
+        std::remove(path.c_str());
+        throw std::runtime_error("Can't write " + path);
+    }
+}
+
+temp_file::~temp_file()
+{
+    std::remove(path.c_str());
+}
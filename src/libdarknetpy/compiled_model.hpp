@@ -0,0 +1,32 @@
+#pragma once
+#include <string>
+
+// Compiled models: a .cfg/.weights pair saved as a single file, with batch norm
+// already folded into the convolutions.
+//
+// The file is a regular darknet .weights file, so darknet's own loader reads it,
+// followed by the .cfg text (rewritten to drop the folded batch_normalize flags)
+// and a fixed-size footer locating it. Loading one saves reading the batch norm
+// parameters, and darknet's fusion pass finds nothing left to fold. It is not a
+// fast-load format: darknet still parses the .cfg and copies the weights into buffers
+// it allocates per process, and nothing is memory-mapped. Loading the weights in place
+// needs a patch to the darknet port that points the layer weights at a mapped region.
+
+// Loads the network on the CPU, fuses it and writes the compiled model to `out`.
+void compile_model(const std::string &cfg_filename, const std::string &weight_filename, const std::string &out);
+
+// Returns the .cfg text stored in a compiled model, or throws std::invalid_argument if
+// `path` is not one.
+std::string read_compiled_cfg(const std::string &path);
+
+// A temporary file holding `text`, removed again when the object is destroyed.
+class temp_file
+{
+public:
+    std::string path;
+
+    explicit temp_file(const std::string &text);
+    ~temp_file();
+    temp_file(const temp_file &) = delete;
+    temp_file &operator=(const temp_file &) = delete;
+};
@@ -0,0 +1,56 @@
+#include <stdexcept>
+#include <string>
+
+// darknet.h and yolo_v2_class.hpp don't mix, so this file only uses the C API
+#include "darknet.h"
+#include "forward.hpp"
+#include "profiling.hpp"
+
+int network_layer_count(void *net)
+{
+    return static_cast<network *>(net)->n;
+}
+
+layer_buffer network_layer(void *net_ptr, int index)
+{
+    network &net = *static_cast<network *>(net_ptr);
+    if (index < -net.n || index >= net.n)
+        throw std::out_of_range("Layer index " + std::to_string(index) + " out of range for a network of " +
+                                std::to_string(net.n) + " layers");
+    const layer &l = net.layers[index < 0 ? index + net.n : index];
+    layer_buffer ret{l.type, l.output, net.batch, {}};
+    if (l.out_c > 0 && l.out_h > 0 && l.out_w > 0 && (ptrdiff_t)l.out_c * l.out_h * l.out_w == l.outputs)
+        ret.shape = {l.out_c, l.out_h, l.out_w};
+    else
+        ret.shape = {l.outputs};
+    return ret;
+}
+
+bool is_detection_layer(int type)
+{
+    return type == YOLO || type == GAUSSIAN_YOLO || type == REGION || type == DETECTION;
+}
+
+void forward_network_cpu(void *net_ptr, float *input, const layer_timer &on_layer)
+{
+    network &net = *static_cast<network *>(net_ptr);
+    // the same steps as darknet's network_predict/forward_network on the CPU
+    network_state state = {};
+    state.net = net;
+    state.input = input;
+    state.workspace = net.workspace;
+    for (int i = 0; i < net.n; ++i)
+    {
+        state.index = i;
+        layer l = net.layers[i];
+        if (on_layer)
+        {
+            profile_clock::time_point start = profile_clock::now();
+            l.forward(l, state);
+            on_layer(i, l.type, seconds_since(start));
+        }
+        else
+            l.forward(l, state);
+        state.input = l.output;
+    }
+}
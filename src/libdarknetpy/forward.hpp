@@ -0,0 +1,30 @@
+#pragma once
+#include <cstddef>
+#include <functional>
+#include <vector>
+
+// Direct access to the layers of a darknet network, for callers that post-process
+// raw network outputs themselves. Implemented against darknet's C API in forward.cpp;
+// `net` is a darknet network*. CPU builds only: with CUDA the outputs stay on the GPU.
+
+// A layer's output buffer. `shape` is the output of one image, (channels, height,
+// width) when the layer has a spatial layout and (outputs,) otherwise; the buffer
+// holds `batch` such outputs back to back.
+struct layer_buffer
+{
+    int type; // darknet's LAYER_TYPE
+    float *data;
+    int batch;
+    std::vector<ptrdiff_t> shape;
+};
+
+int network_layer_count(void *net);
+layer_buffer network_layer(void *net, int index);
+// Whether a layer of this type produces detections (yolo, region, detection, ...).
+bool is_detection_layer(int type);
+// Receives the index, darknet LAYER_TYPE and run time in seconds of each layer.
+typedef std::function<void(int index, int type, double seconds)> layer_timer;
+// Runs darknet's CPU forward pass over `input`, the network's batch of images at the
+// network resolution, leaving every layer's output in its buffer. With `on_layer`,
+// each layer is timed and reported to it as soon as it has run.
+void forward_network_cpu(void *net, float *input, const layer_timer &on_layer = nullptr);
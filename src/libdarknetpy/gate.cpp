@@ -0,0 +1,127 @@
+#include <algorithm>
+#include <cmath>
+#include <cstdlib>
+#include <stdexcept>
+
+#include "gate.hpp"
+
+// pixels sampled per cell and direction; more only makes the thumbnail slower
+static const int CELL_SAMPLES = 8;
+
+FrameGate::FrameGate(float threshold, int force_every, int pixel_delta, int grid)
+    : threshold(threshold), force_every(force_every), pixel_delta(pixel_delta), grid(grid)
+{
+    if (grid < 1)
+        throw std::invalid_argument("grid must be at least 1");
+    if (force_every < 0)
+        throw std::invalid_argument("force_every must not be negative");
+}
+
+void FrameGate::thumbnail(const uint8_t *data, int h, int w, int c, ptrdiff_t row_stride, ptrdiff_t px_stride,
+                          ptrdiff_t ch_stride, std::vector<uint8_t> &out, int &tw, int &th) const
+{
+    if (h < 1 || w < 1 || c < 1)
+        throw std::invalid_argument("Empty frame");
+    tw = std::min(grid, w);
+    th = std::max(1, std::min(h, (int)std::lround((double)grid * h / w)));
+    out.resize((size_t)tw * th);
+    const int channels = std::min(c, 3);
+    for (int ty = 0; ty < th; ++ty)
+    {
+        const int y0 = (int)((int64_t)ty * h / th), y1 = (int)((int64_t)(ty + 1) * h / th);
+        const int ystep = std::max(1, (y1 - y0) / CELL_SAMPLES);
+        for (int tx = 0; tx < tw; ++tx)
+        {
+            const int x0 = (int)((int64_t)tx * w / tw), x1 = (int)((int64_t)(tx + 1) * w / tw);
+            const int xstep = std::max(1, (x1 - x0) / CELL_SAMPLES);
+            unsigned sum = 0, n = 0;
+            for (int y = y0; y < y1; y += ystep)
+            {
+                const uint8_t *row = data + y * row_stride;
+                for (int x = x0; x < x1; x += xstep, ++n)
+                    for (int k = 0; k < channels; ++k)
+                        sum += row[x * px_stride + k * ch_stride];
+            }
+            out[(size_t)ty * tw + tx] = (uint8_t)(sum / (n * channels));
+        }
+    }
+}
+
+float FrameGate::compare(const std::vector<uint8_t> &thumb, int tw, int th) const
+{
+    if (tw != ref_w || th != ref_h || reference.empty())
+        return 1.f;
+    size_t changed = 0;
+    const size_t n = thumb.size();
+    for (size_t i = 0; i < n; ++i)
+        changed += std::abs((int)thumb[i] - (int)reference[i]) > pixel_delta;
+    return (float)changed / n;
+}
+
+float FrameGate::score(const uint8_t *data, int h, int w, int c, ptrdiff_t row_stride, ptrdiff_t px_stride,
+                       ptrdiff_t ch_stride)
+{
+    std::vector<uint8_t> thumb;
+    int tw, th;
+    thumbnail(data, h, w, c, row_stride, px_stride, ch_stride, thumb, tw, th);
+    std::lock_guard<std::mutex> lock(mutex);
+    return compare(thumb, tw, th);
+}
+
+bool FrameGate::check(const uint8_t *data, int h, int w, int c, ptrdiff_t row_stride, ptrdiff_t px_stride,
+                      ptrdiff_t ch_stride, bool force)
+{
+    std::lock_guard<std::mutex> lock(mutex);
+    int tw, th;
+    thumbnail(data, h, w, c, row_stride, px_stride, ch_stride, scratch, tw, th);
+    score_ = compare(scratch, tw, th);
+    if (!force && score_ < threshold)
+    {
+        if (force_every <= 0 || gated_run + 1 < (uint64_t)force_every)
+        {
+            ++n_gated;
+            ++gated_run;
+            return false;
+        }
+        ++n_forced;
+    }
+    reference.swap(scratch);
+    ref_w = tw;
+    ref_h = th;
+    ++n_inferred;
+    gated_run = 0;
+    return true;
+}
+
+void FrameGate::reset()
+{
+    std::lock_guard<std::mutex> lock(mutex);
+    reference.clear();
+    ref_w = ref_h = 0;
+    n_inferred = n_gated = n_forced = gated_run = 0;
+    score_ = 1.f;
+}
+
+uint64_t FrameGate::inferred() const
+{
+    std::lock_guard<std::mutex> lock(mutex);
+    return n_inferred;
+}
+
+uint64_t FrameGate::gated() const
+{
+    std::lock_guard<std::mutex> lock(mutex);
+    return n_gated;
+}
+
+uint64_t FrameGate::forced() const
+{
+    std::lock_guard<std::mutex> lock(mutex);
+    return n_forced;
+}
+
+float FrameGate::last_score() const
+{
+    std::lock_guard<std::mutex> lock(mutex);
+    return score_;
+}
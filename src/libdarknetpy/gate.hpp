@@ -0,0 +1,51 @@
+#pragma once
+#include <cstddef>
+#include <cstdint>
+#include <mutex>
+#include <vector>
+
+// Decides whether a frame of a fixed camera needs a new inference or whether the
+// detections of the last inferred frame still hold.
+//
+// Each frame is reduced to a small luma thumbnail, `grid` cells wide, by averaging a
+// sparse sample of the pixels of every cell. Its motion score is the fraction of cells
+// whose mean moved by more than `pixel_delta` levels from the thumbnail of the last
+// inferred frame; comparing against that frame rather than the previous one means
+// slow drift adds up until it triggers an inference. Frames scoring below `threshold`
+// are gated, but never more than `force_every - 1` in a row (0 for no limit).
+class FrameGate
+{
+public:
+    float threshold;
+    int force_every, pixel_delta;
+    const int grid;
+
+    FrameGate(float threshold, int force_every, int pixel_delta, int grid);
+
+    // Motion score of interleaved uint8 pixels against the last inferred frame, in
+    // [0, 1]; 1 when there is none yet or its size differs.
+    float score(const uint8_t *data, int h, int w, int c, ptrdiff_t row_stride, ptrdiff_t px_stride,
+                ptrdiff_t ch_stride);
+    // Returns true when the frame must be inferred (always when `force` is set), and
+    // then makes it the reference for the next frames.
+    bool check(const uint8_t *data, int h, int w, int c, ptrdiff_t row_stride, ptrdiff_t px_stride,
+               ptrdiff_t ch_stride, bool force = false);
+    // Forgets the reference frame and zeroes the counters.
+    void reset();
+
+    uint64_t inferred() const;
+    uint64_t gated() const;
+    uint64_t forced() const;
+    float last_score() const;
+
+private:
+    void thumbnail(const uint8_t *data, int h, int w, int c, ptrdiff_t row_stride, ptrdiff_t px_stride,
+                   ptrdiff_t ch_stride, std::vector<uint8_t> &out, int &tw, int &th) const;
+    float compare(const std::vector<uint8_t> &thumb, int tw, int th) const;
+
+    mutable std::mutex mutex;
+    std::vector<uint8_t> reference, scratch;
+    int ref_w = 0, ref_h = 0;
+    uint64_t n_inferred = 0, n_gated = 0, n_forced = 0, gated_run = 0;
+    float score_ = 1.f;
+};
@@ -0,0 +1,174 @@
+#pragma once
+#include <algorithm>
+#include <cmath>
+#include <cstddef>
+#include <cstdint>
+#include <vector>
+
+// Pixel conversion kernels shared by the bindings and benchmarks/convert_bench.cpp.
+//
+// Darknet wants planar float RGB scaled to [0, 1]; decoders and frame sources give
+// interleaved uint8. The conversion walks the source row by row in memory order,
+// writing the three planes with unit stride, so the inner loop vectorizes (the
+// channel count is a template parameter for the common contiguous layouts) and the
+// normalization is fused into the same pass as a multiply. Large images are split
+// across OpenMP threads by row.
+
+// images smaller than this many pixels are converted on the calling thread only
+#define HWC_CONVERT_PARALLEL_THRESHOLD (1 << 18)
+
+template <int C>
+inline void hwc_row_to_planar(float *__restrict r, float *__restrict g, float *__restrict b,
+                              const uint8_t *__restrict src, int w)
+{
+    const float scale = 1.f / 255.f;
+#pragma omp simd
+    for (int i = 0; i < w; ++i)
+    {
+        if (C == 1)
+        {
+            float v = src[i] * scale;
+            r[i] = v;
+            g[i] = v;
+            b[i] = v;
+        }
+        else
+        {
+            r[i] = src[C * i + 0] * scale;
+            g[i] = src[C * i + 1] * scale;
+            b[i] = src[C * i + 2] * scale;
+        }
+    }
+}
+
+inline void hwc_row_to_planar_strided(float *r, float *g, float *b, const uint8_t *src, int w, int c,
+                                      ptrdiff_t px_stride, ptrdiff_t ch_stride)
+{
+    const float scale = 1.f / 255.f;
+    const ptrdiff_t g_off = c == 1 ? 0 : ch_stride;
+    const ptrdiff_t b_off = c == 1 ? 0 : 2 * ch_stride;
+    for (int i = 0; i < w; ++i)
+    {
+        const uint8_t *px = src + px_stride * i;
+        r[i] = px[0] * scale;
+        g[i] = px[g_off] * scale;
+        b[i] = px[b_off] * scale;
+    }
+}
+
+// Converts an h x w image of `c` interleaved uint8 channels (1, 3 or 4; grayscale is
+// replicated, alpha ignored) into `dst`, which must hold 3 * h * w floats. Source
+// pixels are addressed through byte strides so non-contiguous views work; `bgr`
+// swaps the first and third channel.
+inline void hwc_to_planar(float *dst, const uint8_t *src, int h, int w, int c,
+                          ptrdiff_t row_stride, ptrdiff_t px_stride, ptrdiff_t ch_stride, bool bgr = false)
+{
+    const size_t plane = (size_t)h * w;
+    float *r = dst, *g = dst + plane, *b = dst + 2 * plane;
+    if (bgr)
+    {
+        float *t = r;
+        r = b;
+        b = t;
+    }
+    const bool packed = ch_stride == 1 && px_stride == c;
+#pragma omp parallel for schedule(static) if (plane >= HWC_CONVERT_PARALLEL_THRESHOLD)
+    for (int j = 0; j < h; ++j)
+    {
+        const uint8_t *row = src + row_stride * j;
+        const size_t off = (size_t)w * j;
+        if (packed && c == 3)
+            hwc_row_to_planar<3>(r + off, g + off, b + off, row, w);
+        else if (packed && c == 4)
+            hwc_row_to_planar<4>(r + off, g + off, b + off, row, w);
+        else if (packed && c == 1)
+            hwc_row_to_planar<1>(r + off, g + off, b + off, row, w);
+        else
+            hwc_row_to_planar_strided(r + off, g + off, b + off, row, w, c, px_stride, ch_stride);
+    }
+}
+
+// Placement of a source image inside the network input: the source is scaled to
+// `w` x `h` pixels with its top-left corner at (`dx`, `dy`). Without letterboxing it
+// is stretched over the whole input, which is what darknet's own resize does.
+struct letterbox_t
+{
+    int w, h, dx, dy;
+};
+
+// Where a src_w x src_h source image ended up in the network input, needed to map
+// boxes back to the source.
+struct placement_t
+{
+    letterbox_t box;
+    int src_w, src_h;
+};
+
+inline letterbox_t fit_to_network(int src_w, int src_h, int net_w, int net_h, bool letterbox)
+{
+    if (!letterbox || src_w <= 0 || src_h <= 0)
+        return {net_w, net_h, 0, 0};
+    float scale = std::min((float)net_w / src_w, (float)net_h / src_h);
+    int w = std::max(1, std::min(net_w, (int)std::lround(src_w * scale)));
+    int h = std::max(1, std::min(net_h, (int)std::lround(src_h * scale)));
+    return {w, h, (net_w - w) / 2, (net_h - h) / 2};
+}
+
+// Bilinearly resizes interleaved uint8 pixels (same layout rules as hwc_to_planar)
+// into `box` of a planar net_w x net_h float image, normalizing in the same pass so
+// the full-resolution image never exists as floats. Letterbox padding is filled
+// with 0.5, like darknet's letterbox_image.
+inline void resize_hwc_to_planar(float *dst, int net_w, int net_h, const letterbox_t &box,
+                                 const uint8_t *src, int h, int w, int c,
+                                 ptrdiff_t row_stride, ptrdiff_t px_stride, ptrdiff_t ch_stride, bool bgr = false)
+{
+    const size_t plane = (size_t)net_w * net_h;
+    if (box.w == w && box.h == h && box.w == net_w && box.h == net_h)
+    {
+        hwc_to_planar(dst, src, h, w, c, row_stride, px_stride, ch_stride, bgr);
+        return;
+    }
+    if (box.w != net_w || box.h != net_h)
+        std::fill(dst, dst + 3 * plane, 0.5f);
+
+    float *planes[3] = {dst, dst + plane, dst + 2 * plane};
+    if (bgr)
+        std::swap(planes[0], planes[2]);
+    const ptrdiff_t ch_off[3] = {0, c == 1 ? 0 : ch_stride, c == 1 ? 0 : 2 * ch_stride};
+
+    // source column offsets and weights are shared by every row
+    std::vector<ptrdiff_t> x0(box.w), x1(box.w);
+    std::vector<float> fx(box.w);
+    const float sx = (float)w / box.w, sy = (float)h / box.h;
+    for (int x = 0; x < box.w; ++x)
+    {
+        float pos = std::max(0.f, (x + 0.5f) * sx - 0.5f);
+        int ix = std::min((int)pos, w - 1);
+        x0[x] = ix * px_stride;
+        x1[x] = std::min(ix + 1, w - 1) * px_stride;
+        fx[x] = ix == w - 1 ? 0.f : pos - ix;
+    }
+
+    const float scale = 1.f / 255.f;
+#pragma omp parallel for schedule(static) if ((size_t)box.w * box.h >= HWC_CONVERT_PARALLEL_THRESHOLD)
+    for (int y = 0; y < box.h; ++y)
+    {
+        float pos = std::max(0.f, (y + 0.5f) * sy - 0.5f);
+        int iy = std::min((int)pos, h - 1);
+        float fy = iy == h - 1 ? 0.f : pos - iy;
+        const uint8_t *row0 = src + row_stride * iy;
+        const uint8_t *row1 = src + row_stride * std::min(iy + 1, h - 1);
+        const size_t off = (size_t)(y + box.dy) * net_w + box.dx;
+        for (int k = 0; k < 3; ++k)
+        {
+            const uint8_t *r0 = row0 + ch_off[k], *r1 = row1 + ch_off[k];
+            float *out = planes[k] + off;
+            for (int x = 0; x < box.w; ++x)
+            {
+                float top = r0[x0[x]] + (r0[x1[x]] - r0[x0[x]]) * fx[x];
+                float bottom = r1[x0[x]] + (r1[x1[x]] - r1[x0[x]]) * fx[x];
+                out[x] = (top + (bottom - top) * fy) * scale;
+            }
+        }
+    }
+}
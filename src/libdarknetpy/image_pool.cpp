@@ -0,0 +1,151 @@
+#include <cstdlib>
+#include <stdexcept>
+#include <utility>
+
+#include "image_pool.hpp"
+
+PyImage::PyImage(const image_t &im) : image_t(im)
+{
+    if (data)
+    {
+        bytes = (size_t)w * h * c * sizeof(float);
+        metrics.add_buffers(1, (int64_t)bytes);
+    }
+}
+
+PyImage::PyImage(PyImage &&other) noexcept
+    : image_t(other), placed(other.placed), placement(other.placement), bytes(other.bytes), pool(std::move(other.pool))
+{
+    other.data = nullptr;
+}
+
+PyImage &PyImage::operator=(PyImage &&other) noexcept
+{
+    if (this != &other)
+    {
+        close();
+        static_cast<image_t &>(*this) = other;
+        placed = other.placed;
+        placement = other.placement;
+        bytes = other.bytes;
+        pool = std::move(other.pool);
+        other.data = nullptr;
+    }
+    return *this;
+}
+
+void PyImage::close()
+{
+    if (data)
+    {
+        metrics.add_buffers(-1, -(int64_t)bytes);
+        if (pool)
+            pool->release(data);
+        else
+            free(data);
+    }
+    data = nullptr;
+    pool.reset();
+    placed = false;
+}
+
+ImagePool::ImagePool(int w, int h, int c, size_t capacity) : w(w), h(h), c(c), capacity(capacity)
+{
+    if (w <= 0 || h <= 0 || c <= 0)
+        throw std::invalid_argument("Image pool dimensions must be positive");
+}
+
+ImagePool::~ImagePool()
+{
+    clear();
+}
+
+PyImage ImagePool::acquire()
+{
+    float *data = nullptr;
+    {
+        std::lock_guard<std::mutex> lock(mutex);
+        if (!free_list.empty())
+        {
+            data = free_list.back();
+            free_list.pop_back();
+            metrics.add_buffers(-1, -(int64_t)buffer_bytes());
+            ++n_hits;
+        }
+        else
+        {
+            ++n_misses;
+        }
+        ++n_in_use;
+    }
+    if (!data)
+    {
+        data = (float *)malloc(buffer_bytes());
+        if (!data)
+        {
+            std::lock_guard<std::mutex> lock(mutex);
+            --n_in_use;
+            throw std::runtime_error("Can't allocate image data");
+        }
+    }
+    PyImage im(image_t{h, w, c, data});
+    im.pool = shared_from_this();
+    return im;
+}
+
+void ImagePool::release(float *data)
+{
+    {
+        std::lock_guard<std::mutex> lock(mutex);
+        --n_in_use;
+        if (free_list.size() < capacity)
+        {
+            free_list.push_back(data);
+            metrics.add_buffers(1, (int64_t)buffer_bytes());
+            return;
+        }
+    }
+    free(data);
+}
+
+void ImagePool::clear()
+{
+    std::vector<float *> idle;
+    {
+        std::lock_guard<std::mutex> lock(mutex);
+        idle.swap(free_list);
+    }
+    metrics.add_buffers(-(int64_t)idle.size(), -(int64_t)(idle.size() * buffer_bytes()));
+    for (float *data : idle)
+        free(data);
+}
+
+size_t ImagePool::hits() const
+{
+    std::lock_guard<std::mutex> lock(mutex);
+    return n_hits;
+}
+
+size_t ImagePool::misses() const
+{
+    std::lock_guard<std::mutex> lock(mutex);
+    return n_misses;
+}
+
+size_t ImagePool::in_use() const
+{
+    std::lock_guard<std::mutex> lock(mutex);
+    return n_in_use;
+}
+
+size_t ImagePool::idle() const
+{
+    std::lock_guard<std::mutex> lock(mutex);
+    return free_list.size();
+}
+
+size_t ImagePool::bytes_resident() const
+{
+    std::lock_guard<std::mutex> lock(mutex);
+    return (free_list.size() + n_in_use) * buffer_bytes();
+}
@@ -0,0 +1,73 @@
+#pragma once
+#include <cstddef>
+#include <memory>
+#include <mutex>
+#include <vector>
+
+#include "common.hpp"
+#include "image_convert.hpp"
+#include "metrics.hpp"
+
+class ImagePool;
+
+// An image_t that owns its pixels. They are freed, or handed back to the ImagePool
+// they came from, when the image is closed or destroyed, so Python code no longer has
+// to pair every image with Detector.free_image.
+class PyImage : public image_t
+{
+public:
+    // set when the pixels are a source image resized into the network input, so the
+    // boxes detected in it can be mapped back to the source
+    bool placed = false;
+    placement_t placement{};
+
+    PyImage() : image_t{0, 0, 0, nullptr} {}
+    explicit PyImage(const image_t &im);
+    PyImage(PyImage &&other) noexcept;
+    PyImage &operator=(PyImage &&other) noexcept;
+    PyImage(const PyImage &) = delete;
+    PyImage &operator=(const PyImage &) = delete;
+    ~PyImage() { close(); }
+
+    // Releases the pixels; the image is empty afterwards. Safe to call repeatedly.
+    void close();
+
+private:
+    friend class ImagePool;
+    // size of the buffer as counted in the metrics; w, h and c are writable
+    size_t bytes = 0;
+    std::shared_ptr<ImagePool> pool;
+};
+
+// Hands out images of one fixed size (typically the network input) and recycles
+// their buffers instead of returning them to the allocator, so a long-running
+// service keeps a flat set of resident buffers. At most `capacity` idle buffers are
+// kept; buffers returned beyond that are freed.
+class ImagePool : public std::enable_shared_from_this<ImagePool>
+{
+public:
+    const int w, h, c;
+    const size_t capacity;
+
+    ImagePool(int w, int h, int c, size_t capacity);
+    ~ImagePool();
+
+    PyImage acquire();
+    // Frees all idle buffers.
+    void clear();
+
+    size_t hits() const;
+    size_t misses() const;
+    size_t in_use() const;
+    size_t idle() const;
+    size_t buffer_bytes() const { return (size_t)w * h * c * sizeof(float); }
+    size_t bytes_resident() const;
+
+private:
+    friend class PyImage;
+    void release(float *data);
+
+    mutable std::mutex mutex;
+    std::vector<float *> free_list;
+    size_t n_hits = 0, n_misses = 0, n_in_use = 0;
+};
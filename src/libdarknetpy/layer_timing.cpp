@@ -0,0 +1,73 @@
+// darknet.h and yolo_v2_class.hpp don't mix, so this file only uses the C API
+#include "darknet.h"
+#include "forward.hpp"
+#include "profiling.hpp"
+
+void time_layers(void *net_ptr, float *input, int batch, std::vector<layer_time> &times)
+{
+    network &net = *static_cast<network *>(net_ptr);
+    if (net.batch != batch)
+        return;
+    if (times.size() < (size_t)net.n)
+        times.resize(net.n);
+    forward_network_cpu(net_ptr, input, [&times](int index, int type, double seconds)
+                        {
+                            times[index].type = type;
+                            times[index].seconds += seconds;
+                        });
+}
+
+const char *layer_type_name(int type)
+{
+    switch (type)
+    {
+    case CONVOLUTIONAL:
+        return "convolutional";
+    case DECONVOLUTIONAL:
+        return "deconvolutional";
+    case CONNECTED:
+        return "connected";
+    case MAXPOOL:
+        return "maxpool";
+    case LOCAL_AVGPOOL:
+        return "local_avgpool";
+    case SOFTMAX:
+        return "softmax";
+    case DETECTION:
+        return "detection";
+    case DROPOUT:
+        return "dropout";
+    case CROP:
+        return "crop";
+    case ROUTE:
+        return "route";
+    case AVGPOOL:
+        return "avgpool";
+    case SHORTCUT:
+        return "shortcut";
+    case SCALE_CHANNELS:
+        return "scale_channels";
+    case SAM:
+        return "sam";
+    case ACTIVE:
+        return "activation";
+    case BATCHNORM:
+        return "batchnorm";
+    case REGION:
+        return "region";
+    case YOLO:
+        return "yolo";
+    case GAUSSIAN_YOLO:
+        return "Gaussian_yolo";
+    case REORG:
+        return "reorg3d";
+    case REORG_OLD:
+        return "reorg";
+    case UPSAMPLE:
+        return "upsample";
+    case IMPLICIT:
+        return "implicit";
+    default:
+        return "layer";
+    }
+}
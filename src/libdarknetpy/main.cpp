@@ -5,23 +5,45 @@
 #include <pybind11/stl_bind.h>
 #include <pybind11/pytypes.h>
 #include <array>
+#include <limits>
+#include <numeric>
 #include <pybind11/stl.h>
 #include <pybind11/complex.h>
 #include <pybind11/functional.h>
 #include <pybind11/chrono.h>
-#define OPENCV 1
-#include "yolo_v2_class.hpp"
+#include <pybind11/numpy.h>
+#include "common.hpp"
 #include "stb_image.h"
+#include "image_convert.hpp"
+#include "results.hpp"
+#include "image_pool.hpp"
+#include "stream.hpp"
+#include "compiled_model.hpp"
+#include "profiling.hpp"
+#include "nms.hpp"
+#include "gate.hpp"
+#include "quantize.hpp"
+#include "forward.hpp"
+#include "publisher.hpp"
+#include "serialize.hpp"
 
 #define STRINGIFY(x) #x
 #define MACRO_STRINGIFY(x) STRINGIFY(x)
 
-namespace py = pybind11;
-std::vector<bbox_t> (Detector::*detect_1)(std::string, float, bool) = &Detector::detect;
-std::vector<bbox_t> (Detector::*detect_2)(image_t, float, bool) = &Detector::detect;
-#ifdef OPENCV
-std::vector<bbox_t> (Detector::*detect_3)(cv::Mat, float, bool) = &Detector::detect;
-#endif
+// Converts interleaved uint8 pixels into a newly allocated image_t, see hwc_to_planar.
+void hwc_to_image_t(image_t &ret_im, const uint8_t *src, int h, int w, int c,
+                    ptrdiff_t row_stride, ptrdiff_t px_stride, ptrdiff_t ch_stride, bool bgr = false)
+{
+    if (c != 1 && c != 3 && c != 4)
+        throw std::invalid_argument("Unsupported number of channels: " + std::to_string(c));
+    ret_im.data = (float *)malloc((size_t)h * w * 3 * sizeof(float));
+    if (!ret_im.data)
+        throw std::runtime_error("Can't allocate image data");
+    ret_im.h = h;
+    ret_im.w = w;
+    ret_im.c = 3;
+    hwc_to_planar(ret_im.data, src, h, w, c, row_stride, px_stride, ch_stride, bgr);
+}
 
 void raw_data_to_image_t(image_t &ret_im, const uint8_t *indata, size_t size)
 {
@@ -34,33 +56,740 @@ void raw_data_to_image_t(image_t &ret_im, const uint8_t *indata, size_t size)
         return;
     }
     int h, w, c = 0;
-    auto *data = stbi_load_from_memory(indata, size, &h, &w, &c, 3);
+    metrics.add(metrics.decoded_bytes, size);
+    auto *data = stbi_load_from_memory(indata, (int)size, &w, &h, &c, 3);
+    if (!data)
+        throw std::invalid_argument(std::string("Can't decode image: ") + stbi_failure_reason());
+    try
+    {
+        hwc_to_image_t(ret_im, data, h, w, 3, (ptrdiff_t)w * 3, 3, 1);
+    }
+    catch (...)
+    {
+        stbi_image_free(data);
+        throw;
+    }
+    stbi_image_free(data);
+}
 
-    int i, j, k;
-    ret_im.data = (float *)calloc(h * w * c, sizeof(float));
-    if (!ret_im.data)
-        throw std::runtime_error("Can't allocate image data");
-    ret_im.h = h;
-    ret_im.w = w;
-    ret_im.c = c;
-    for (k = 0; k < c; ++k)
+void raw_data_to_image_t_vec(image_t &ret_im, const std::vector<uint8_t> &vdata)
+{
+    raw_data_to_image_t(ret_im, vdata.data(), vdata.size());
+}
+
+// A Python buffer interpreted as image input. A 1-D byte buffer (bytes, bytearray,
+// memoryview, 1-D uint8 array) holds an encoded image (JPEG, PNG, ...); an (h, w, c)
+// uint8 array holds decoded interleaved pixels, e.g. an OpenCV or PIL frame; and a
+// (c, h, w) float32 array holds planar pixels already scaled to [0, 1].
+struct buffer_image
+{
+    enum kind_t
+    {
+        ENCODED,
+        HWC_U8,
+        CHW_F32
+    } kind;
+    const void *ptr;
+    size_t size;
+    int h, w, c;
+    ptrdiff_t strides[3];
+};
+
+buffer_image parse_buffer(const py::buffer_info &info)
+{
+    buffer_image ret{};
+    ret.ptr = info.ptr;
+    ret.size = (size_t)info.size;
+    if (info.item_type_is_equivalent_to<uint8_t>() && info.ndim == 1)
     {
-        for (j = 0; j < h; ++j)
+        if (info.strides[0] != 1)
+            throw std::invalid_argument("Encoded image buffer must be contiguous");
+        ret.kind = buffer_image::ENCODED;
+        return ret;
+    }
+    if (info.item_type_is_equivalent_to<uint8_t>() && (info.ndim == 2 || info.ndim == 3))
+    {
+        ret.kind = buffer_image::HWC_U8;
+        ret.h = (int)info.shape[0];
+        ret.w = (int)info.shape[1];
+        ret.c = info.ndim == 3 ? (int)info.shape[2] : 1;
+        ret.strides[0] = info.strides[0];
+        ret.strides[1] = info.strides[1];
+        ret.strides[2] = info.ndim == 3 ? info.strides[2] : 0;
+        return ret;
+    }
+    if (info.item_type_is_equivalent_to<float>() && info.ndim == 3)
+    {
+        ret.kind = buffer_image::CHW_F32;
+        ret.c = (int)info.shape[0];
+        ret.h = (int)info.shape[1];
+        ret.w = (int)info.shape[2];
+        for (int i = 0; i < 3; ++i)
+            ret.strides[i] = info.strides[i] / (ptrdiff_t)sizeof(float);
+        return ret;
+    }
+    throw std::invalid_argument("Expected an encoded image buffer, an (h, w, c) uint8 array or a (c, h, w) float32 array, got "
+                                + std::to_string(info.ndim) + "-D buffer of format '" + info.format + "'");
+}
+
+// Builds the image_t a buffer describes. Contiguous float32 input is used in place;
+// everything else is converted into a new allocation, signalled through `owned`,
+// that the caller must release with Detector::free_image.
+image_t buffer_to_image_t(const buffer_image &src, bool bgr, bool &owned)
+{
+    image_t im{};
+    owned = true;
+    switch (src.kind)
+    {
+    case buffer_image::ENCODED:
+        raw_data_to_image_t(im, (const uint8_t *)src.ptr, src.size);
+        break;
+    case buffer_image::HWC_U8:
+        hwc_to_image_t(im, (const uint8_t *)src.ptr, src.h, src.w, src.c, src.strides[0], src.strides[1], src.strides[2], bgr);
+        break;
+    case buffer_image::CHW_F32:
+    {
+        const float *data = (const float *)src.ptr;
+        im.h = src.h;
+        im.w = src.w;
+        im.c = src.c;
+        if (src.strides[0] == (ptrdiff_t)src.h * src.w && src.strides[1] == src.w && src.strides[2] == 1)
         {
-            for (i = 0; i < w; ++i)
+            im.data = const_cast<float *>(data);
+            owned = false;
+            break;
+        }
+        im.data = (float *)malloc((size_t)src.c * src.h * src.w * sizeof(float));
+        if (!im.data)
+            throw std::runtime_error("Can't allocate image data");
+        for (int k = 0; k < src.c; ++k)
+            for (int j = 0; j < src.h; ++j)
+                for (int i = 0; i < src.w; ++i)
+                    im.data[i + src.w * (j + src.h * k)] = data[k * src.strides[0] + j * src.strides[1] + i * src.strides[2]];
+        break;
+    }
+    }
+    return im;
+}
+
+// Interleaved uint8 pixels on their way into the network. Boxes are reported in
+// `orig_w` x `orig_h`, which is larger than `w` x `h` when the decoder downscaled.
+struct pixel_view
+{
+    const uint8_t *data;
+    int h, w, c;
+    ptrdiff_t row_stride, px_stride, ch_stride;
+    bool bgr;
+    int orig_w, orig_h;
+};
+
+// Owns the pixels of a decoded image.
+struct decoded_image
+{
+    pixel_view view{};
+#ifdef OPENCV
+    cv::Mat mat;
+#endif
+    std::unique_ptr<uint8_t, void (*)(void *)> stb{nullptr, stbi_image_free};
+};
+
+// Decodes an encoded image for a net_w x net_h network. With OpenCV, JPEGs that are
+// several times larger than the network are decoded at 1/2, 1/4 or 1/8 scale by
+// libjpeg's DCT scaling, so a 4K frame never exists at full resolution. A net_w of 0
+// decodes at full resolution.
+void decode_image(decoded_image &out, const uint8_t *data, size_t size, int net_w, int net_h)
+{
+    if (!size)
+        throw std::invalid_argument("Empty image buffer");
+    stage_timer timer(STAGE_DECODE);
+    metrics.add(metrics.decoded_bytes, size);
+    int orig_w = 0, orig_h = 0, comp = 0;
+    bool known = stbi_info_from_memory(data, (int)size, &orig_w, &orig_h, &comp);
+#ifdef OPENCV
+    int flags = cv::IMREAD_COLOR, k = 1;
+    const bool reduce = known && net_w > 0;
+    if (reduce && orig_w >= 8 * net_w && orig_h >= 8 * net_h)
+        flags = cv::IMREAD_REDUCED_COLOR_8, k = 8;
+    else if (reduce && orig_w >= 4 * net_w && orig_h >= 4 * net_h)
+        flags = cv::IMREAD_REDUCED_COLOR_4, k = 4;
+    else if (reduce && orig_w >= 2 * net_w && orig_h >= 2 * net_h)
+        flags = cv::IMREAD_REDUCED_COLOR_2, k = 2;
+    out.mat = cv::imdecode(cv::Mat(1, (int)size, CV_8UC1, const_cast<uint8_t *>(data)), flags);
+    if (out.mat.empty())
+        throw std::invalid_argument("Can't decode image");
+    if (!known)
+        orig_w = out.mat.cols, orig_h = out.mat.rows;
+    else if (out.mat.cols != (orig_w + k - 1) / k)
+        std::swap(orig_w, orig_h); // OpenCV applied an EXIF rotation
+    out.view = {out.mat.data, out.mat.rows, out.mat.cols, 3, (ptrdiff_t)out.mat.step, 3, 1, true, orig_w, orig_h};
+#else
+    int w, h, c;
+    out.stb.reset(stbi_load_from_memory(data, (int)size, &w, &h, &c, 3));
+    if (!out.stb)
+        throw std::invalid_argument(std::string("Can't decode image: ") + stbi_failure_reason());
+    out.view = {out.stb.get(), h, w, 3, (ptrdiff_t)w * 3, 3, 1, false, w, h};
+#endif
+}
+
+// Detector that remembers the batch size its network was built with, which darknet
+// does not expose but detectBatch must be called with, and its NMS settings.
+class PyDetector : public Detector
+{
+public:
+    const int batch_size;
+    Profiler profiler;
+    nms_options nms_opts;
+    quant_mode precision = quant_mode::float32;
+
+    PyDetector(std::string cfg_filename, std::string weight_filename, int gpu_id, int batch_size)
+        : Detector(cfg_filename, weight_filename, gpu_id, batch_size), batch_size(batch_size) {}
+
+    bool darknet_nms() const { return nms_opts.method == nms_method::darknet; }
+
+    // Applies the configured NMS, if it isn't darknet's, and the max_detections cut to
+    // the boxes of one image.
+    void suppress(std::vector<bbox_t> &boxes, float thresh)
+    {
+        if (darknet_nms() && nms_opts.max_detections <= 0)
+            return;
+        stage_timer timer(STAGE_NMS);
+        apply_nms(boxes, nms_opts, nms, thresh);
+    }
+};
+
+// Turns darknet's own NMS off while in scope if another NMS method is configured.
+class darknet_nms_off
+{
+public:
+    explicit darknet_nms_off(PyDetector &d) : d(d), saved(d.nms)
+    {
+        if (!d.darknet_nms())
+            d.nms = 0;
+    }
+    ~darknet_nms_off() { d.nms = saved; }
+    darknet_nms_off(const darknet_nms_off &) = delete;
+    darknet_nms_off &operator=(const darknet_nms_off &) = delete;
+
+private:
+    PyDetector &d;
+    float saved;
+};
+
+// With layer profiling on, runs the forward pass over `input` (`batch` images at the
+// network resolution) again layer by layer to time each layer, since darknet's own
+// pass can't be instrumented. The extra pass is left out of the call's total.
+void profile_layers(Detector &d, const image_t &input, int batch)
+{
+    call_profile *call = current_profile;
+    if (!call || !call->layers || input.w != d.get_net_width() || input.h != d.get_net_height() || input.c != 3)
+        return;
+    profile_clock::time_point start = profile_clock::now();
+    time_layers(d.get_network(), input.data, batch, call->layer_times);
+    call->overhead += seconds_since(start);
+}
+
+// Single-image detection; darknet's forward pass, box decoding and NMS are timed
+// together as the "network" stage, another NMS method as the "nms" stage.
+std::vector<bbox_t> run_network(PyDetector &d, const image_t &input, float thresh, bool use_mean)
+{
+    std::vector<bbox_t> boxes;
+    {
+        stage_timer timer(STAGE_NETWORK);
+        darknet_nms_off nms_off(d);
+        boxes = d.detect(input, thresh, use_mean);
+    }
+    profile_layers(d, input, 1);
+    d.suppress(boxes, thresh);
+    return boxes;
+}
+
+// Maps boxes from network input coordinates back to the source image, clipping them
+// to its bounds.
+void map_boxes_to_source(std::vector<bbox_t> &boxes, const placement_t &at)
+{
+    const float kx = (float)at.src_w / at.box.w, ky = (float)at.src_h / at.box.h;
+    auto clip = [](float v, int hi)
+    { return std::min(std::max(v, 0.f), (float)hi); };
+    for (auto &b : boxes)
+    {
+        float x0 = clip(((float)b.x - at.box.dx) * kx, at.src_w);
+        float y0 = clip(((float)b.y - at.box.dy) * ky, at.src_h);
+        float x1 = clip(((float)b.x + b.w - at.box.dx) * kx, at.src_w);
+        float y1 = clip(((float)b.y + b.h - at.box.dy) * ky, at.src_h);
+        b.x = (unsigned int)x0;
+        b.y = (unsigned int)y0;
+        b.w = (unsigned int)(x1 - x0);
+        b.h = (unsigned int)(y1 - y0);
+    }
+}
+
+// Resizes (or letterboxes) uint8 pixels straight into a planar net_w x net_h float
+// input, so only the small network-sized image is ever converted to float.
+placement_t place_pixels(float *dst, int net_w, int net_h, const pixel_view &px, bool letterbox)
+{
+    if (px.c != 1 && px.c != 3 && px.c != 4)
+        throw std::invalid_argument("Unsupported number of channels: " + std::to_string(px.c));
+    if (px.w <= 0 || px.h <= 0)
+        throw std::invalid_argument("Image is empty");
+    stage_timer timer(STAGE_PREPROCESS);
+    placement_t at{fit_to_network(px.orig_w, px.orig_h, net_w, net_h, letterbox), px.orig_w, px.orig_h};
+    resize_hwc_to_planar(dst, net_w, net_h, at.box, px.data, px.h, px.w, px.c,
+                         px.row_stride, px.px_stride, px.ch_stride, px.bgr);
+    return at;
+}
+
+// Writes any buffer input into `dst` at network resolution. Planar float input has to
+// match the network size already, since it is copied as is.
+placement_t place_buffer(float *dst, int net_w, int net_h, const buffer_image &src, bool bgr, bool letterbox)
+{
+    if (src.kind == buffer_image::CHW_F32)
+    {
+        if (src.c != 3 || src.w != net_w || src.h != net_h)
+            throw std::invalid_argument("Planar float32 input must be (3, " + std::to_string(net_h) + ", " + std::to_string(net_w) + ")");
+        stage_timer timer(STAGE_PREPROCESS);
+        const float *data = (const float *)src.ptr;
+        for (int k = 0; k < 3; ++k)
+            for (int j = 0; j < src.h; ++j)
+                for (int i = 0; i < src.w; ++i)
+                    dst[i + src.w * (j + src.h * k)] = data[k * src.strides[0] + j * src.strides[1] + i * src.strides[2]];
+        return {{net_w, net_h, 0, 0}, net_w, net_h};
+    }
+    decoded_image dec;
+    if (src.kind == buffer_image::ENCODED)
+        decode_image(dec, (const uint8_t *)src.ptr, src.size, net_w, net_h);
+    else
+        dec.view = {(const uint8_t *)src.ptr, src.h, src.w, src.c, src.strides[0], src.strides[1], src.strides[2], bgr, src.w, src.h};
+    return place_pixels(dst, net_w, net_h, dec.view, letterbox);
+}
+
+// Network input buffer of the calling thread. darknet only reads its input during a
+// forward pass, so the buffer is reused across calls instead of allocated per image.
+float *network_scratch(size_t size)
+{
+    thread_local std::vector<float> scratch;
+    if (scratch.size() < size)
+        scratch.resize(size);
+    return scratch.data();
+}
+
+std::vector<bbox_t> detect_pixels(PyDetector &d, const pixel_view &px, float thresh, bool use_mean, bool letterbox)
+{
+    int net_w = d.get_net_width(), net_h = d.get_net_height();
+    float *input = network_scratch((size_t)net_w * net_h * 3);
+    placement_t at = place_pixels(input, net_w, net_h, px, letterbox);
+    std::vector<bbox_t> boxes = run_network(d, image_t{net_h, net_w, 3, input}, thresh, use_mean);
+    map_boxes_to_source(boxes, at);
+    return boxes;
+}
+
+std::vector<bbox_t> detect_buffer(PyDetector &d, const buffer_image &src, float thresh, bool use_mean, bool bgr, bool letterbox)
+{
+    if (src.kind == buffer_image::CHW_F32)
+    {
+        // already planar floats: handed to darknet as is, it resizes them itself
+        bool owned;
+        image_t im;
+        {
+            stage_timer timer(STAGE_PREPROCESS);
+            im = buffer_to_image_t(src, bgr, owned);
+        }
+        std::vector<bbox_t> boxes;
+        try
+        {
+            boxes = run_network(d, im, thresh, use_mean);
+        }
+        catch (...)
+        {
+            if (owned)
+                Detector::free_image(im);
+            throw;
+        }
+        if (owned)
+            Detector::free_image(im);
+        return boxes;
+    }
+    int net_w = d.get_net_width(), net_h = d.get_net_height();
+    float *input = network_scratch((size_t)net_w * net_h * 3);
+    placement_t at = place_buffer(input, net_w, net_h, src, bgr, letterbox);
+    std::vector<bbox_t> boxes = run_network(d, image_t{net_h, net_w, 3, input}, thresh, use_mean);
+    map_boxes_to_source(boxes, at);
+    return boxes;
+}
+
+// Runs `count` images through the network, `batch_size` at a time: each chunk is
+// written in parallel by `place(i, dst)` into one contiguous network input, goes
+// through a single forward pass, and its boxes are mapped back to each source image.
+// With `make_nms` darknet's NMS runs in the pass; `suppress` then applies another
+// configured NMS method to each image.
+template <typename F>
+std::vector<std::vector<bbox_t>> detect_batched(PyDetector &d, size_t count, float thresh, bool make_nms, bool suppress, F &&place)
+{
+    const int net_w = d.get_net_width(), net_h = d.get_net_height(), batch = d.batch_size;
+    const size_t slot = (size_t)net_w * net_h * 3;
+    float *input = network_scratch(slot * batch);
+    std::vector<std::vector<bbox_t>> results;
+    results.reserve(count);
+    std::vector<placement_t> placements(batch);
+    for (size_t start = 0; start < count; start += batch)
+    {
+        const int n = (int)std::min(count - start, (size_t)batch);
+        std::vector<std::exception_ptr> errors(n);
+        {
+            // in a profile decoding is part of this stage, as images are decoded in
+            // parallel; the metrics observe each image's decode and resize instead
+            stage_timer timer(STAGE_PREPROCESS, false);
+#pragma omp parallel for schedule(dynamic)
+            for (int i = 0; i < n; ++i)
+            {
+                try
+                {
+                    placements[i] = place(start + i, input + slot * i);
+                }
+                catch (...)
+                {
+                    errors[i] = std::current_exception();
+                }
+            }
+            for (auto &e : errors)
+                if (e)
+                    std::rethrow_exception(e);
+            // the network always runs a full batch; unused slots are blanked
+            std::fill(input + slot * n, input + slot * batch, 0.f);
+        }
+        const image_t batch_input{net_h, net_w, 3, input};
+        std::vector<std::vector<bbox_t>> boxes;
+        {
+            stage_timer timer(STAGE_NETWORK);
+            boxes = d.detectBatch(batch_input, batch, net_w, net_h, thresh, make_nms && d.darknet_nms());
+        }
+        profile_layers(d, batch_input, batch);
+        for (int i = 0; i < n; ++i)
+        {
+            if (suppress)
+                d.suppress(boxes[i], thresh);
+            map_boxes_to_source(boxes[i], placements[i]);
+            results.push_back(std::move(boxes[i]));
+        }
+    }
+    return results;
+}
+
+std::vector<std::vector<bbox_t>> detect_images(PyDetector &d, const std::vector<buffer_image> &srcs, float thresh, bool make_nms, bool bgr, bool letterbox)
+{
+    const int net_w = d.get_net_width(), net_h = d.get_net_height();
+    return detect_batched(d, srcs.size(), thresh, make_nms, make_nms, [&](size_t i, float *dst)
+                          { return place_buffer(dst, net_w, net_h, srcs[i], bgr, letterbox); });
+}
+
+// Start offsets of `tile`-sized windows covering `size` pixels, `step` apart; the
+// last window is aligned with the end.
+std::vector<int> tile_starts(int size, int tile, int step)
+{
+    std::vector<int> starts{0};
+    if (size <= tile)
+        return starts;
+    for (int s = step; s + tile < size; s += step)
+        starts.push_back(s);
+    starts.push_back(size - tile);
+    return starts;
+}
+
+// Drops the boxes lying mostly inside a better box of another tile. An object cut by a
+// tile border is found whole in one tile and in part in the next: the two boxes have
+// a low IoU, but the part's intersection over the smaller box (IoS) is high. `tiles`
+// holds the tile of each box; boxes of one tile were already suppressed by darknet.
+void merge_tile_borders(std::vector<bbox_t> &boxes, const std::vector<int> &tiles, float ios_thresh, bool class_aware)
+{
+    std::vector<size_t> order(boxes.size());
+    std::iota(order.begin(), order.end(), 0);
+    std::stable_sort(order.begin(), order.end(), [&](size_t a, size_t b)
+                     { return boxes[a].prob > boxes[b].prob; });
+    std::vector<size_t> kept;
+    for (size_t i : order)
+    {
+        const bbox_t &b = boxes[i];
+        bool inside = false;
+        for (size_t k : kept)
+        {
+            const bbox_t &a = boxes[k];
+            if (tiles[k] == tiles[i] || (class_aware && a.obj_id != b.obj_id))
+                continue;
+            const float iw = std::min((float)a.x + a.w, (float)b.x + b.w) - std::max((float)a.x, (float)b.x);
+            const float ih = std::min((float)a.y + a.h, (float)b.y + b.h) - std::max((float)a.y, (float)b.y);
+            const float smaller = std::min((float)a.w * a.h, (float)b.w * b.h);
+            if (iw > 0 && ih > 0 && iw * ih > ios_thresh * smaller)
             {
-                int dst_index = i + w * j + w * h * k;
-                int src_index = k + c * i + c * w * j;
-                ret_im.data[dst_index] = (float)data[src_index] / 255.;
+                inside = true;
+                break;
             }
         }
+        if (!inside)
+            kept.push_back(i);
     }
-    free(data);
+    std::vector<bbox_t> ret;
+    ret.reserve(kept.size());
+    for (size_t k : kept)
+        ret.push_back(boxes[k]);
+    boxes.swap(ret);
 }
 
-void raw_data_to_image_t_vec(image_t &ret_im, const std::vector<uint8_t> &vdata)
+// Detects objects in a large image through overlapping tiles: the tiles are views
+// into the source, resized into the batch input like whole images, and their boxes
+// are shifted to image coordinates and merged across tile borders. With
+// `full_pass` the whole image, downscaled, goes through the network as one more tile
+// to catch objects larger than a tile.
+std::vector<bbox_t> detect_tiles(PyDetector &d, const buffer_image &src, int tile, float overlap, float thresh, bool full_pass, bool bgr, bool letterbox)
 {
-    raw_data_to_image_t(ret_im, vdata.data(), vdata.size());
+    decoded_image dec;
+    if (src.kind == buffer_image::ENCODED)
+        decode_image(dec, (const uint8_t *)src.ptr, src.size, 0, 0);
+    else
+        dec.view = {(const uint8_t *)src.ptr, src.h, src.w, src.c, src.strides[0], src.strides[1], src.strides[2], bgr, src.w, src.h};
+    const pixel_view &px = dec.view;
+
+    const int tile_w = std::min(tile > 0 ? tile : d.get_net_width(), px.w);
+    const int tile_h = std::min(tile > 0 ? tile : d.get_net_height(), px.h);
+    std::vector<pixel_view> views;
+    std::vector<std::pair<int, int>> offsets;
+    for (int y : tile_starts(px.h, tile_h, std::max(1, (int)(tile_h * (1 - overlap)))))
+        for (int x : tile_starts(px.w, tile_w, std::max(1, (int)(tile_w * (1 - overlap)))))
+        {
+            views.push_back({px.data + y * px.row_stride + x * px.px_stride, tile_h, tile_w, px.c,
+                             px.row_stride, px.px_stride, px.ch_stride, px.bgr, tile_w, tile_h});
+            offsets.emplace_back(x, y);
+        }
+    if (full_pass && views.size() > 1)
+    {
+        views.push_back(px);
+        offsets.emplace_back(0, 0);
+    }
+
+    const int net_w = d.get_net_width(), net_h = d.get_net_height();
+    std::vector<std::vector<bbox_t>> per_tile = detect_batched(d, views.size(), thresh, true, false, [&](size_t i, float *dst)
+                                                               { return place_pixels(dst, net_w, net_h, views[i], letterbox); });
+    std::vector<bbox_t> boxes;
+    std::vector<int> tiles;
+    for (size_t i = 0; i < per_tile.size(); ++i)
+        for (bbox_t b : per_tile[i])
+        {
+            b.x += offsets[i].first;
+            b.y += offsets[i].second;
+            boxes.push_back(b);
+            tiles.push_back((int)i);
+        }
+    // darknet's NMS only ran within each tile; the merge uses the greedy method in
+    // its place, with the same threshold
+    nms_options merge = d.nms_opts;
+    if (merge.method == nms_method::darknet)
+        merge.method = nms_method::greedy;
+    stage_timer timer(STAGE_NMS);
+    if (merge.method != nms_method::none)
+        merge_tile_borders(boxes, tiles, d.nms, merge.class_aware);
+    apply_nms(boxes, merge, d.nms, thresh);
+    return boxes;
+}
+
+// Runs `srcs` (at most batch_size images) through the network on the CPU and returns
+// the buffers of the layers at `indices`, or of the detection layers if empty.
+std::vector<std::pair<int, layer_buffer>> forward_images(PyDetector &d, const std::vector<buffer_image> &srcs, std::vector<int> indices, bool bgr, bool letterbox)
+{
+    if (built_with_cuda())
+        throw std::runtime_error("forward is only available in CPU builds");
+    if (srcs.empty() || (int)srcs.size() > d.batch_size)
+        throw std::invalid_argument("forward takes 1 to batch_size (" + std::to_string(d.batch_size) + ") images");
+    void *net = d.get_network();
+    const int n_layers = network_layer_count(net);
+    if (indices.empty())
+    {
+        for (int i = 0; i < n_layers; ++i)
+            if (is_detection_layer(network_layer(net, i).type))
+                indices.push_back(i);
+    }
+    std::vector<std::pair<int, layer_buffer>> ret;
+    for (int i : indices)
+        ret.emplace_back(i < 0 ? i + n_layers : i, network_layer(net, i));
+
+    const int net_w = d.get_net_width(), net_h = d.get_net_height(), batch = d.batch_size;
+    const size_t slot = (size_t)net_w * net_h * 3;
+    float *input = network_scratch(slot * batch);
+    for (size_t i = 0; i < srcs.size(); ++i)
+        place_buffer(input + slot * i, net_w, net_h, srcs[i], bgr, letterbox);
+    std::fill(input + slot * srcs.size(), input + slot * batch, 0.f);
+    stage_timer timer(STAGE_NETWORK);
+    forward_network_cpu(net, input);
+    return ret;
+}
+
+// Requests buffer views for a sequence of images. The views are kept in `infos`,
+// which has to be destroyed with the GIL held.
+std::vector<buffer_image> parse_buffers(const py::sequence &images, std::vector<py::buffer_info> &infos)
+{
+    std::vector<buffer_image> srcs;
+    infos.reserve(images.size());
+    srcs.reserve(images.size());
+    for (auto item : images)
+    {
+        if (!py::isinstance<py::buffer>(item))
+            throw py::type_error("Expected a sequence of buffers, got an element of type " + std::string(py::str(item.get_type().attr("__name__"))));
+        infos.push_back(item.cast<py::buffer>().request());
+        srcs.push_back(parse_buffer(infos.back()));
+    }
+    return srcs;
+}
+
+// Detections over a video stream. The FrameStream decodes the next frames while the
+// current one is being detected; the detector is only used from the iterating thread.
+struct PyStreamDetector
+{
+    PyDetector &detector;
+    std::unique_ptr<FrameStream> stream;
+    float thresh;
+    bool use_mean, letterbox, return_frames;
+    std::string output;
+    uint64_t processed = 0, gated = 0;
+    // optional change-detection gate and tracker, and a copy of the detections of
+    // the last inferred frame for the gated ones
+    std::shared_ptr<FrameGate> gate;
+    py::object tracker, last_boxes;
+    // optional publisher every frame's boxes are sent to
+    std::shared_ptr<ResultPublisher> publisher;
+};
+
+// A copy of detection results, for a frame that reuses those of an earlier one.
+py::object copy_boxes(const py::object &boxes)
+{
+    if (py::isinstance<py::list>(boxes))
+    {
+        py::list ret;
+        for (auto b : boxes)
+            ret.append(b.cast<bbox_t>());
+        return std::move(ret);
+    }
+    // serialized results are immutable
+    if (py::isinstance<py::bytes>(boxes))
+        return boxes;
+    if (py::isinstance<py::dict>(boxes))
+    {
+        py::dict ret;
+        for (auto kv : boxes.cast<py::dict>())
+            ret[kv.first] = kv.second.attr("copy")();
+        return std::move(ret);
+    }
+    return boxes.attr("copy")();
+}
+
+// The (h, w[, c]) uint8 frame in a buffer, for FrameGate.
+buffer_image gate_frame(const py::buffer_info &info)
+{
+    buffer_image src = parse_buffer(info);
+    if (src.kind != buffer_image::HWC_U8)
+        throw std::invalid_argument("FrameGate needs an (h, w) or (h, w, c) uint8 array");
+    return src;
+}
+
+// Wraps a frame as a (rows, cols, channels) uint8 array that keeps the Mat alive.
+py::array mat_to_array(cv::Mat mat)
+{
+    cv::Mat *owner = new cv::Mat(std::move(mat));
+    py::capsule free_mat(owner, [](void *p)
+                         { delete static_cast<cv::Mat *>(p); });
+    const ptrdiff_t c = owner->channels();
+    return py::array_t<uint8_t>({(ptrdiff_t)owner->rows, (ptrdiff_t)owner->cols, c},
+                                {(ptrdiff_t)owner->step, c, (ptrdiff_t)1}, owner->data, free_mat);
+}
+
+// Timings as Python objects, all in seconds. Histogram buckets are cumulative (upper
+// bound, count) pairs ending with an infinite bound, like in Prometheus.
+py::list cumulative_buckets(const std::vector<uint64_t> &counts)
+{
+    py::list buckets;
+    uint64_t total = 0;
+    for (size_t i = 0; i < counts.size(); ++i)
+    {
+        total += counts[i];
+        double bound = i < LATENCY_BUCKETS.size() ? LATENCY_BUCKETS[i] : std::numeric_limits<double>::infinity();
+        buckets.append(py::make_tuple(bound, total));
+    }
+    return buckets;
+}
+
+py::dict summary_to_dict(const timing_summary &s)
+{
+    py::dict ret;
+    ret["count"] = s.count;
+    ret["sum"] = s.sum;
+    ret["min"] = s.min;
+    ret["max"] = s.max;
+    if (!s.buckets.empty())
+        ret["buckets"] = cumulative_buckets(s.buckets);
+    return ret;
+}
+
+py::object profile_to_dict(const call_profile *call)
+{
+    if (!call)
+        return py::none();
+    py::dict ret, stages;
+    py::list layers;
+    ret["method"] = call->method;
+    ret["total"] = call->total;
+    for (const auto &s : call->stages)
+        stages[s.first] = s.second;
+    ret["stages"] = stages;
+    for (size_t i = 0; i < call->layer_times.size(); ++i)
+        layers.append(py::dict(py::arg("index") = i, py::arg("type") = layer_type_name(call->layer_times[i].type),
+                               py::arg("time") = call->layer_times[i].seconds));
+    ret["layers"] = layers;
+    return ret;
+}
+
+py::dict stats_to_dict(const Profiler::stats_t &stats)
+{
+    py::dict ret, stages;
+    py::list layers;
+    ret["calls"] = stats.calls;
+    ret["total"] = summary_to_dict(stats.total);
+    for (const auto &s : stats.stages)
+        stages[py::str(s.first)] = summary_to_dict(s.second);
+    ret["stages"] = stages;
+    for (size_t i = 0; i < stats.layers.size(); ++i)
+    {
+        py::dict layer = summary_to_dict(stats.layers[i].second);
+        layer["index"] = i;
+        layer["type"] = layer_type_name(stats.layers[i].first);
+        layers.append(layer);
+    }
+    ret["layers"] = layers;
+    return ret;
+}
+
+py::dict histogram_to_dict(const latency_histogram &h)
+{
+    // observations may land between the reads, so the count is taken from the
+    // buckets to keep it equal to the infinite bucket
+    std::vector<uint64_t> counts = h.buckets();
+    py::dict ret;
+    ret["count"] = std::accumulate(counts.begin(), counts.end(), (uint64_t)0);
+    ret["sum"] = h.sum();
+    ret["buckets"] = cumulative_buckets(counts);
+    return ret;
+}
+
+py::dict metrics_to_dict()
+{
+    py::dict ret, stages;
+    ret["inferences"] = metrics.inferences.load();
+    ret["images"] = metrics.images.load();
+    ret["boxes"] = metrics.boxes.load();
+    ret["failures"] = metrics.failures.load();
+    ret["decoded_bytes"] = metrics.decoded_bytes.load();
+    ret["image_buffers"] = metrics.image_buffers.load();
+    ret["image_buffer_bytes"] = metrics.image_buffer_bytes.load();
+    ret["inference_seconds"] = histogram_to_dict(metrics.inference_seconds);
+    for (int i = 0; i < N_STAGES; ++i)
+        stages[STAGE_NAMES[i]] = histogram_to_dict(metrics.stage_seconds[i]);
+    ret["stage_seconds"] = stages;
+    return ret;
 }
 
 PYBIND11_MODULE(_libdarknetpy, m)
@@ -71,9 +800,116 @@ PYBIND11_MODULE(_libdarknetpy, m)
     m.def("built_with_cuda", &built_with_cuda, "Check if the library was built with CUDA support");
     m.def("built_with_cudnn", &built_with_cudnn, "Check if the library was built with cuDNN support");
     m.def("built_with_opencv", &built_with_opencv, "Check if the library was built with OpenCV support");
-    m.def("send_json_custom", &send_json_custom, py::arg("send_buf"), py::arg("port"), py::arg("timeout"), "Send a JSON string over a socket");
+    m.def("send_json_custom", &send_json_custom, py::arg("send_buf"), py::arg("port"), py::arg("timeout"),
+          "Send a JSON string over a socket, blocking until it is sent; see ``ResultPublisher`` for a result feed");
+    m.def("compile_model", &compile_model, py::arg("configurationFilename"), py::arg("weightsFilename"), py::arg("outputFilename"),
+          py::call_guard<py::gil_scoped_release>(), R"pbdoc(
+              Save a .cfg/.weights pair as one compiled model file for ``Detector.from_compiled``.
+
+              Batch norm is folded into the convolutions, and the weights of weighted
+              shortcuts normalized, once here instead of every time the model is
+              loaded. The output is also a valid .weights file for the rewritten .cfg
+              stored at its end.
+          )pbdoc");
+    m.def("metrics_snapshot", &metrics_to_dict, R"pbdoc(
+              Return the process-wide detection metrics as a dict.
+
+              Counters: ``inferences`` (detection calls), ``images``, ``boxes``,
+              ``failures`` (calls that raised) and ``decoded_bytes``. Gauges:
+              ``image_buffers`` and ``image_buffer_bytes``, the ``image_t`` buffers
+              currently allocated, including the idle ones ``ImagePool`` keeps.
+              ``inference_seconds`` and each entry of ``stage_seconds`` are latency
+              histograms with ``count``, ``sum`` and cumulative ``buckets``. See
+              ``libdarknetpy.metrics`` for the Prometheus text format.
+          )pbdoc");
+
+    m.def(
+        "nms", [](std::vector<bbox_t> boxes, float threshold, const std::string &method, bool class_aware, int top_k, int max_detections, float sigma, float score_threshold, const std::string &output)
+        {
+            nms_options opts;
+            opts.method = parse_nms_method(method);
+            if (opts.method == nms_method::darknet)
+                throw std::invalid_argument("darknet's NMS only runs inside detections");
+            opts.class_aware = class_aware;
+            opts.top_k = top_k;
+            opts.max_detections = max_detections;
+            opts.sigma = sigma;
+            check_nms_options(opts);
+            box_format fmt = parse_box_format(output);
+            {
+                py::gil_scoped_release release;
+                apply_nms(boxes, opts, threshold, score_threshold);
+            }
+            return pack_boxes(std::move(boxes), fmt);
+        },
+        py::arg("boxes"), py::arg("threshold") = 0.45, py::arg("method") = "greedy", py::arg("class_aware") = true,
+        py::arg("top_k") = 0, py::arg("max_detections") = 0, py::arg("sigma") = 0.5, py::arg("score_threshold") = 0.0,
+        py::arg("output") = "list",
+        R"pbdoc(
+            Suppress overlapping boxes in a list of ``bbox_t``, e.g. merged results.
+
+            Takes the options of ``Detector.set_nms`` (``"darknet"`` excepted);
+            soft-NMS drops boxes whose score decays below ``score_threshold``.
+            Returns the boxes kept, ordered by decreasing score.
+        )pbdoc");
+
+    m.def(
+        "serialize", [](const py::handle &boxes, const std::string &format, const py::object &frame)
+        {
+            box_format fmt = parse_box_format(format);
+            if (!is_serialized(fmt))
+                throw std::invalid_argument("format must be 'json', 'msgpack' or 'binary', got '" + format + "'");
+            std::vector<bbox_t> records = unpack_boxes(boxes);
+            std::string out;
+            append_message(out, fmt, records.data(), records.size(), frame.is_none() ? -1 : frame.cast<int64_t>());
+            return py::bytes(out);
+        },
+        py::arg("boxes"), py::arg("format") = "json", py::arg("frame") = py::none(),
+        R"pbdoc(
+            Serialize the boxes of one image to ``bytes``.
+
+            ``boxes`` is a list of ``bbox_t``, a structured array or a dict of
+            columns. Detection calls produce the same bytes straight from their
+            results with ``output="json"``, ``"msgpack"`` or ``"binary"``, which
+            skips building the boxes in Python at all. Every format is a stream of
+            self-delimiting messages, one per image, numbered with ``frame``
+            (``null`` when not given; the image index for batched results):
+
+            * ``"json"``: one line ``{"frame":0,"boxes":[{"x":..,"y":..,"w":..,"h":..,
+              "prob":..,"obj_id":..,"track_id":..},...]}``, scores with 4 decimals;
+            * ``"msgpack"``: the same map in MessagePack, scores as float32;
+            * ``"binary"``: a 24-byte header followed by the records of the
+              ``output="array"`` dtype, little-endian. ``decode_binary`` reads it.
+              The header holds ``b"DKNB"``, the format version (uint16), the record
+              size (uint16), the record count (uint32), 4 reserved bytes and the
+              frame (int64, -1 for none). A batched result is a single message whose
+              records have the ``frame`` column.
+        )pbdoc");
+    m.def(
+        "decode_binary", [](const py::buffer &data, bool return_frame) -> py::object
+        {
+            int64_t frame;
+            py::object records = decode_binary(data, frame);
+            if (!return_frame)
+                return std::move(records);
+            return py::make_tuple(frame < 0 ? py::object(py::none()) : py::int_(frame), records);
+        },
+        py::arg("data"), py::arg("return_frame") = false,
+        R"pbdoc(
+            Read a message of the ``"binary"`` format as a structured array.
+
+            ``data`` is ``bytes`` or any contiguous buffer, e.g. a ``bytearray``
+            filled by ``socket.recv_into``. The array has the dtype of
+            ``output="array"`` results, with the ``frame`` column for batched
+            results, and is a read-only view of ``data``, which can't be resized
+            while the array exists. With ``return_frame=True``, returns
+            ``(frame, records)`` where ``frame`` is the header's frame number or
+            ``None``.
+        )pbdoc");
 
     py::class_<bbox_t>(m, "bbox_t")
+        .def(py::init([]()
+                      { return bbox_t{}; }))
         .def_readwrite("x", &bbox_t::x)
         .def_readwrite("y", &bbox_t::y)
         .def_readwrite("w", &bbox_t::w)
@@ -84,46 +920,800 @@ PYBIND11_MODULE(_libdarknetpy, m)
         .def_readwrite("frames_counter", &bbox_t::frames_counter)
         .def_readwrite("x_3d", &bbox_t::x_3d)
         .def_readwrite("y_3d", &bbox_t::y_3d)
-        .def_readwrite("z_3d", &bbox_t::z_3d);
+        .def_readwrite("z_3d", &bbox_t::z_3d)
+        .def(py::pickle(
+            [](const bbox_t &b)
+            { return py::make_tuple(b.x, b.y, b.w, b.h, b.prob, b.obj_id, b.track_id, b.frames_counter, b.x_3d, b.y_3d, b.z_3d); },
+            [](const py::tuple &t)
+            {
+                if (t.size() != 11)
+                    throw std::invalid_argument("invalid bbox_t state");
+                return bbox_t{t[0].cast<unsigned int>(), t[1].cast<unsigned int>(), t[2].cast<unsigned int>(),
+                              t[3].cast<unsigned int>(), t[4].cast<float>(), t[5].cast<unsigned int>(),
+                              t[6].cast<unsigned int>(), t[7].cast<unsigned int>(), t[8].cast<float>(),
+                              t[9].cast<float>(), t[10].cast<float>()};
+            }));
 
-    py::class_<image_t>(m, "image_t")
-        .def("__init__", &raw_data_to_image_t_vec, py::arg("vdata") = std::vector<uint8_t>())
+    py::class_<PyImage>(m, "image_t", R"pbdoc(
+        A planar float image as darknet consumes it.
+
+        The image owns its pixels: they are released when the object is collected,
+        when ``close()`` is called or when a ``with`` block using it ends. Images
+        from an ``ImagePool`` hand their buffer back to the pool instead.
+    )pbdoc")
+        .def(py::init([](const py::buffer &buf, bool bgr)
+                      {
+                          py::buffer_info info = buf.request();
+                          buffer_image src = parse_buffer(info);
+                          py::gil_scoped_release release;
+                          bool owned;
+                          image_t im = buffer_to_image_t(src, bgr, owned);
+                          // image_t always owns its pixels, so in-place float input is copied
+                          if (!owned)
+                          {
+                              size_t n = (size_t)im.w * im.h * im.c;
+                              float *data = (float *)malloc(n * sizeof(float));
+                              if (!data)
+                                  throw std::runtime_error("Can't allocate image data");
+                              std::copy(im.data, im.data + n, data);
+                              im.data = data;
+                          }
+                          return PyImage(im); }),
+             py::arg("data"), py::arg("bgr") = false)
+        .def(py::init([](const std::vector<uint8_t> &vdata)
+                      {
+                          image_t im;
+                          raw_data_to_image_t_vec(im, vdata);
+                          return PyImage(im); }),
+             py::arg("vdata") = std::vector<uint8_t>(), py::call_guard<py::gil_scoped_release>())
         .def_readwrite("w", &image_t::w)
         .def_readwrite("h", &image_t::h)
-        .def_readwrite("c", &image_t::c);
+        .def_readwrite("c", &image_t::c)
+        .def_property_readonly("closed", [](const PyImage &im)
+                               { return im.data == nullptr; })
+        .def("close", &PyImage::close, "Release the pixels; the image is empty afterwards")
+        .def("__enter__", [](PyImage &im) -> PyImage &
+             { return im; }, py::return_value_policy::reference)
+        .def("__exit__", [](PyImage &im, const py::args &)
+             { im.close(); });
+
+    // call_guard releases the GIL after the arguments are converted and re-acquires it
+    // before the result is converted back, so only the native section runs unlocked.
+    py::class_<PyDetector>(m, "Detector", R"pbdoc(
+        A darknet network loaded from a .cfg/.weights pair.
 
-    py::class_<Detector>(m, "Detector")
+        All inference calls release the GIL while they run natively, so several
+        threads can run detections in parallel. Thread-safety rules:
+
+        * ``load_image``, ``free_image`` and the ``get_net_*`` getters may be called
+          concurrently from any number of threads.
+        * ``detect``, ``detect_raw``, ``detectBatch`` and ``tracking_id`` use the
+          per-instance network state and must not run concurrently on the same
+          instance: use one ``Detector`` per thread (or guard a shared instance
+          with a lock). The same goes for ``detect_array``, ``detect_many``,
+          ``detect_tiled`` and ``forward``.
+        * Construction releases the GIL as well, but darknet sets process-wide
+          state while it parses the network, so create instances one at a time.
+
+        Every ``detect*`` method takes an ``output`` argument: ``"list"`` (the
+        default) returns ``bbox_t`` objects, ``"array"`` a NumPy structured array
+        with one record per box and ``"dict"`` a dict of NumPy column arrays
+        (``x``, ``y``, ``w``, ``h``, ``prob``, ``obj_id``, ``track_id``, ...). The
+        array formats need NumPy and are built without a Python object per box.
+        Batched calls return a single array/dict for all frames with an extra
+        ``frame`` column holding the index of the image each box belongs to.
+        ``"json"``, ``"msgpack"`` and ``"binary"`` return the boxes serialized to
+        ``bytes`` straight from the native results, see ``serialize``.
+    )pbdoc")
         .def_readonly("cur_gpu_id", &Detector::cur_gpu_id)
         .def_readwrite("nms", &Detector::nms)
         .def_readwrite("wait_stream", &Detector::wait_stream)
+        .def_readonly("batch_size", &PyDetector::batch_size)
         .def(py::init<std::string, std::string, int, int>(),
-             py::arg("configurationFilename"), py::arg("weightsFilename"), py::arg("gpu") = 0, py::arg("batch_size") = 1)
-        .def("detect", detect_1, py::arg("image_filename"), py::arg("thresh") = 0.2, py::arg("use_mean") = false)
-        .def("detect", detect_2, py::arg("img"), py::arg("thresh") = 0.2, py::arg("use_mean") = false)
-        .def("detectBatch", &Detector::detectBatch, py::arg("img"), py::arg("batch_size"), py::arg("width"), py::arg("height"), py::arg("thresh"), py::arg("make_nms") = true)
-        .def_static("load_image", &Detector::load_image, py::arg("image_filename"))
-        .def_static("free_image", &Detector::free_image, py::arg("m"))
+             py::arg("configurationFilename"), py::arg("weightsFilename"), py::arg("gpu") = 0, py::arg("batch_size") = 1,
+             py::call_guard<py::gil_scoped_release>())
+        .def(
+            "detect", [](PyDetector &d, const std::string &image_filename, float thresh, bool use_mean, const std::string &output)
+            {
+                return run_detection(d.profiler, "detect", output, [&]()
+                                     {
+                    std::vector<bbox_t> boxes;
+                    {
+                        stage_timer timer(STAGE_NETWORK);
+                        darknet_nms_off nms_off(d);
+                        boxes = d.detect(image_filename, thresh, use_mean);
+                    }
+                    d.suppress(boxes, thresh);
+                    return boxes; });
+            },
+            py::arg("image_filename"), py::arg("thresh") = 0.2, py::arg("use_mean") = false, py::arg("output") = "list")
+        .def(
+            "detect", [](PyDetector &d, PyImage &img, float thresh, bool use_mean, const std::string &output)
+            {
+                if (!img.data)
+                    throw std::invalid_argument("Image is empty");
+                return run_detection(d.profiler, "detect", output, [&]()
+                                     {
+                    std::vector<bbox_t> boxes = run_network(d, img, thresh, use_mean);
+                    if (img.placed)
+                        map_boxes_to_source(boxes, img.placement);
+                    return boxes; });
+            },
+            py::arg("img"), py::arg("thresh") = 0.2, py::arg("use_mean") = false, py::arg("output") = "list")
+        .def(
+            "detectBatch", [](PyDetector &d, PyImage &img, int batch_size, int width, int height, float thresh, bool make_nms, const std::string &output)
+            {
+                if (!img.data)
+                    throw std::invalid_argument("Image is empty");
+                return run_detection(d.profiler, "detectBatch", output, [&]()
+                                     {
+                    std::vector<std::vector<bbox_t>> boxes;
+                    {
+                        stage_timer timer(STAGE_NETWORK);
+                        boxes = d.detectBatch(img, batch_size, width, height, thresh, make_nms && d.darknet_nms());
+                    }
+                    profile_layers(d, img, batch_size);
+                    if (make_nms)
+                        for (auto &b : boxes)
+                            d.suppress(b, thresh);
+                    return boxes; });
+            },
+            py::arg("img"), py::arg("batch_size"), py::arg("width"), py::arg("height"), py::arg("thresh"), py::arg("make_nms") = true, py::arg("output") = "list")
+        .def_static(
+            "from_compiled", [](const std::string &path, int gpu, int batch_size)
+            {
+                // darknet only parses .cfg files, so the stored one is handed to it via a temporary file
+                temp_file cfg(read_compiled_cfg(path));
+                return std::unique_ptr<PyDetector>(new PyDetector(cfg.path, path, gpu, batch_size));
+            },
+            py::arg("path"), py::arg("gpu") = 0, py::arg("batch_size") = 1, py::call_guard<py::gil_scoped_release>(),
+            R"pbdoc(
+                Load a model written by ``compile_model``.
+
+                The model's batch norm is already folded into its convolutions and its
+                .cfg and weights are read from the one file, which saves reading the batch
+                norm parameters. This is not a fast-load format: darknet still parses the
+                .cfg and copies the weights into buffers of its own in every process, and
+                nothing is memory-mapped, so the gain over the constructor is modest; see
+                ``benchmarks/suite.py`` for the load times. Loading the weights in place
+                from a mapped file needs a patch to the darknet port that points the layer
+                weights at the mapped region.
+            )pbdoc")
+        .def_static(
+            "load_image", [](const std::string &image_filename)
+            { return PyImage(Detector::load_image(image_filename)); },
+            py::arg("image_filename"), py::call_guard<py::gil_scoped_release>())
+        .def_static(
+            "free_image", [](PyImage &m)
+            { m.close(); },
+            py::arg("m"), "Release an image's pixels, same as image_t.close()")
         .def("get_net_width", &Detector::get_net_width)
         .def("get_net_height", &Detector::get_net_height)
         .def("get_net_color_depth", &Detector::get_net_color_depth)
-        .def("tracking_id", &Detector::tracking_id, py::arg("cur_bbox_vec"), py::arg("change_history") = true, py::arg("frames_story") = 5, py::arg("max_dist") = 40)
+        .def("tracking_id", &Detector::tracking_id, py::arg("cur_bbox_vec"), py::arg("change_history") = true, py::arg("frames_story") = 5, py::arg("max_dist") = 40, py::call_guard<py::gil_scoped_release>())
         // wrapper function for above
         .def(
-            "detect_raw", [](Detector &d, const std::vector<uint8_t> &vdata, float thresh = 0.2, bool use_mean = false)
+            "detect_raw", [](PyDetector &d, const py::buffer &buf, float thresh, bool use_mean, bool letterbox, const std::string &output)
             {
-#ifdef OPENCV
-                cv::Mat mat = imdecode(cv::Mat(vdata), 1);
-                return d.detect(mat, thresh, use_mean);
-#else
-                image_t im;
-                raw_data_to_image_t_vec(im, vdata);
-                return d.detect(mat, thresh, use_mean);
-#endif
+                // the buffer view must be requested and released with the GIL held
+                py::buffer_info info = buf.request();
+                buffer_image src = parse_buffer(info);
+                if (src.kind != buffer_image::ENCODED)
+                    throw std::invalid_argument("detect_raw expects an encoded image buffer, use detect_array for decoded pixels");
+                return run_detection(d.profiler, "detect_raw", output, [&]()
+                                     { return detect_buffer(d, src, thresh, use_mean, false, letterbox); });
+            },
+            py::arg("vdata"), py::arg("thresh") = 0.2, py::arg("use_mean") = false, py::arg("letterbox") = false, py::arg("output") = "list")
+        .def(
+            "detect_raw", [](PyDetector &d, const std::vector<uint8_t> &vdata, float thresh, bool use_mean, bool letterbox, const std::string &output)
+            {
+                return run_detection(d.profiler, "detect_raw", output, [&]()
+                                     {
+                    decoded_image dec;
+                    decode_image(dec, vdata.data(), vdata.size(), d.get_net_width(), d.get_net_height());
+                    return detect_pixels(d, dec.view, thresh, use_mean, letterbox); });
+            },
+            py::arg("vdata"), py::arg("thresh") = 0.2, py::arg("use_mean") = false, py::arg("letterbox") = false, py::arg("output") = "list")
+        .def(
+            "detect_array", [](PyDetector &d, const py::buffer &buf, float thresh, bool use_mean, bool bgr, bool letterbox, const std::string &output)
+            {
+                py::buffer_info info = buf.request();
+                buffer_image src = parse_buffer(info);
+                return run_detection(d.profiler, "detect_array", output, [&]()
+                                     { return detect_buffer(d, src, thresh, use_mean, bgr, letterbox); });
+            },
+            py::arg("data"), py::arg("thresh") = 0.2, py::arg("use_mean") = false, py::arg("bgr") = false, py::arg("letterbox") = false, py::arg("output") = "list",
+            R"pbdoc(
+                Detect objects in an in-memory image without copying it into Python objects.
+
+                ``data`` is any buffer-protocol object: ``bytes``/``memoryview``/1-D uint8
+                arrays are decoded as an encoded image (JPEG, PNG, ...), ``(h, w)`` or
+                ``(h, w, c)`` uint8 arrays are decoded frames (gray, RGB or RGBA; pass
+                ``bgr=True`` for OpenCV frames) and ``(c, h, w)`` float32 arrays are
+                planar pixels scaled to [0, 1].
+
+                Encoded and uint8 input is resized to the network resolution before it is
+                converted to float (large JPEGs are decoded at reduced scale), stretched
+                like darknet does or, with ``letterbox=True``, scaled to fit and padded.
+                Boxes are always reported in the coordinates of the original image.
+            )pbdoc")
+        .def(
+            "detect_many", [](PyDetector &d, const py::sequence &images, float thresh, bool make_nms, bool bgr, bool letterbox, const std::string &output)
+            {
+                std::vector<py::buffer_info> infos;
+                std::vector<buffer_image> srcs = parse_buffers(images, infos);
+                return run_detection(d.profiler, "detect_many", output, [&]()
+                                     { return detect_images(d, srcs, thresh, make_nms, bgr, letterbox); });
+            },
+            py::arg("images"), py::arg("thresh") = 0.2, py::arg("make_nms") = true, py::arg("bgr") = false, py::arg("letterbox") = false, py::arg("output") = "list",
+            R"pbdoc(
+                Detect objects in a sequence of images with batched forward passes.
+
+                ``images`` holds any inputs ``detect_array`` accepts (planar float32
+                input must already have the network size). They are packed
+                ``batch_size`` at a time into one network input, so construct the
+                detector with the batch size you want to run; longer sequences are
+                split into several forward passes automatically. Returns one box list
+                per image, in the coordinates of that image.
+
+                The images are decoded and placed before their forward pass, so one
+                that can't be (not an image, corrupt data) fails the whole call: the
+                error of the first such image is raised and no results are returned
+                for the others. Detect the images of a failed call one at a time to
+                tell the bad ones apart.
+            )pbdoc")
+        .def(
+            "detect_tiled", [](PyDetector &d, const py::buffer &image, int tile, float overlap, float thresh, bool full_pass, bool bgr, bool letterbox, const std::string &output)
+            {
+                if (tile < 0)
+                    throw std::invalid_argument("tile must not be negative");
+                if (!(overlap >= 0.f && overlap < 1.f))
+                    throw std::invalid_argument("overlap must be in [0, 1)");
+                py::buffer_info info = image.request();
+                buffer_image src = parse_buffer(info);
+                if (src.kind == buffer_image::CHW_F32)
+                    throw std::invalid_argument("detect_tiled needs an encoded image or an (h, w, c) uint8 array");
+                return run_detection(d.profiler, "detect_tiled", output, [&]()
+                                     { return detect_tiles(d, src, tile, overlap, thresh, full_pass, bgr, letterbox); });
+            },
+            py::arg("image"), py::arg("tile") = 0, py::arg("overlap") = 0.2, py::arg("thresh") = 0.2,
+            py::arg("full_pass") = false, py::arg("bgr") = false, py::arg("letterbox") = false, py::arg("output") = "list",
+            R"pbdoc(
+                Detect small objects in a large image through overlapping tiles.
+
+                ``image`` is an encoded image, decoded at full resolution, or an (h, w, c)
+                uint8 array. It is cut into ``tile`` x ``tile`` windows (by default the
+                network size) overlapping by the fraction ``overlap``; the windows are
+                views into the image, resized into the network input like whole images,
+                and run ``batch_size`` at a time. Their boxes are mapped to image
+                coordinates and merged across tiles: a box lying inside a better box of
+                another tile by more than ``Detector.nms`` of its area (intersection
+                over the smaller box), like the part of an object cut by a tile border,
+                is dropped, then the method of ``set_nms`` (greedy for darknet's)
+                suppresses the remaining overlaps. With ``set_nms("none")`` boxes are
+                not merged. ``full_pass=True`` also runs the whole image, downscaled,
+                to catch objects larger than a tile.
+            )pbdoc")
+
+        .def_property(
+            "profiling", [](const PyDetector &d)
+            { return d.profiler.enabled.load(); },
+            [](PyDetector &d, bool on)
+            { d.profiler.enabled = on; },
+            R"pbdoc(
+                Record the timings of every detection call, off by default.
+
+                Each call is split into stages: ``decode`` (encoded images), ``preprocess``
+                (resizing and float conversion; for ``detect_many`` decoding as well, as
+                images are prepared in parallel), ``network`` (darknet's forward pass, box
+                decoding and NMS, which it runs as one call), ``nms`` (the NMS chosen with
+                ``set_nms``, unless it is darknet's) and ``pack`` (building the Python
+                result). See ``last_profile`` and ``profile_stats``. Disabled
+                profiling costs next to nothing, so it can stay in production code.
+            )pbdoc")
+        .def_property(
+            "profile_layers", [](const PyDetector &d)
+            { return d.profiler.layers.load(); },
+            [](PyDetector &d, bool on)
+            {
+                if (on && built_with_cuda())
+                    throw std::runtime_error("Per-layer profiling is only available in CPU builds");
+                d.profiler.layers = on;
+            },
+            R"pbdoc(
+                Also time each layer of the forward pass while ``profiling`` is on.
+
+                darknet's forward pass can't be instrumented, so profiled calls run it
+                a second time layer by layer; this roughly doubles their cost, but is
+                not counted in their timings. Layers are timed for inputs at the network
+                resolution, i.e. not for ``detect`` on image files or differently sized
+                planar float input.
+            )pbdoc")
+        .def_property_readonly(
+            "last_profile", [](const PyDetector &d)
+            { return profile_to_dict(d.profiler.last().get()); },
+            R"pbdoc(
+                Timings of the last profiled call, or None.
+
+                A dict with the ``method`` called, its ``total`` time, the time of each
+                of its ``stages`` and a list of ``layers`` (``index``, ``type``, ``time``),
+                all in seconds.
+            )pbdoc")
+        .def(
+            "profile_stats", [](const PyDetector &d)
+            { return stats_to_dict(d.profiler.stats()); },
+            R"pbdoc(
+                Aggregated timings of all profiled calls since the last ``reset_profile``.
+
+                ``calls`` counts the calls per method. ``total`` and each entry of
+                ``stages`` summarize the times in seconds (``count``, ``sum``, ``min``,
+                ``max``) with a histogram: ``buckets`` holds cumulative counts per upper
+                bound, the last one infinite, like a Prometheus histogram. ``layers``
+                holds the same summaries per layer, without buckets.
+            )pbdoc")
+        .def(
+            "reset_profile", [](PyDetector &d)
+            { d.profiler.reset(); },
+            "Forget the recorded timings")
+        .def(
+            "set_nms", [](PyDetector &d, const std::string &method, const py::object &threshold, bool class_aware, int top_k, int max_detections, float sigma)
+            {
+                nms_options opts;
+                opts.method = parse_nms_method(method);
+                opts.class_aware = class_aware;
+                opts.top_k = top_k;
+                opts.max_detections = max_detections;
+                opts.sigma = sigma;
+                check_nms_options(opts);
+                if (!threshold.is_none())
+                    d.nms = threshold.cast<float>();
+                d.nms_opts = opts;
+            },
+            py::arg("method") = "darknet", py::arg("threshold") = py::none(), py::arg("class_aware") = true,
+            py::arg("top_k") = 0, py::arg("max_detections") = 0, py::arg("sigma") = 0.5,
+            R"pbdoc(
+                Choose how overlapping boxes are suppressed by all ``detect*`` methods.
+
+                ``method`` is ``"darknet"`` (the default: darknet's own per-class NMS),
+                ``"greedy"`` (hard NMS), ``"diou"`` (hard NMS on IoU minus the normalized
+                distance of the box centers, which keeps close but distinct objects),
+                ``"soft"`` (Gaussian soft-NMS: the scores of overlapping boxes decay by
+                ``exp(-iou**2 / sigma)`` and boxes falling below the detection threshold
+                are dropped) or ``"none"``. ``threshold`` sets ``Detector.nms``, the IoU
+                above which boxes are suppressed.
+
+                Except for darknet's, the methods suppress across classes unless
+                ``class_aware``, consider only the ``top_k`` best boxes of an image (0 for
+                all) and return boxes ordered by decreasing score. ``max_detections``
+                keeps at most that many boxes per image with every method (0 for all).
+                ``make_nms=False`` still turns suppression off for batched calls.
+            )pbdoc")
+        .def_property_readonly(
+            "nms_options", [](const PyDetector &d)
+            {
+                const nms_options &o = d.nms_opts;
+                return py::dict(py::arg("method") = nms_method_name(o.method), py::arg("threshold") = d.nms,
+                                py::arg("class_aware") = o.class_aware, py::arg("top_k") = o.top_k,
+                                py::arg("max_detections") = o.max_detections, py::arg("sigma") = o.sigma);
+            },
+            "The settings of ``set_nms`` as a dict")
+        .def(
+            "forward", [](PyDetector &d, const py::object &images, const py::object &layers, bool copy, bool bgr, bool letterbox)
+            {
+                const bool single = py::isinstance<py::buffer>(images);
+                std::vector<py::buffer_info> infos;
+                std::vector<buffer_image> srcs;
+                if (single)
+                {
+                    infos.push_back(images.cast<py::buffer>().request());
+                    srcs.push_back(parse_buffer(infos.back()));
+                }
+                else
+                    srcs = parse_buffers(images, infos);
+                std::vector<int> indices;
+                if (!layers.is_none())
+                    for (auto i : layers)
+                        indices.push_back(i.cast<int>());
+                std::vector<std::pair<int, layer_buffer>> outputs;
+                {
+                    py::gil_scoped_release release;
+                    outputs = forward_images(d, srcs, indices, bgr, letterbox);
+                }
+
+                py::object owner = py::cast(&d, py::return_value_policy::reference);
+                py::dict ret;
+                for (auto &out : outputs)
+                {
+                    const layer_buffer &l = out.second;
+                    std::vector<ptrdiff_t> shape = l.shape, strides(shape.size());
+                    ptrdiff_t stride = sizeof(float);
+                    for (size_t k = shape.size(); k-- > 0;)
+                    {
+                        strides[k] = stride;
+                        stride *= shape[k];
+                    }
+                    if (!single)
+                    {
+                        shape.insert(shape.begin(), (ptrdiff_t)srcs.size());
+                        strides.insert(strides.begin(), stride);
+                    }
+                    py::array_t<float> arr;
+                    if (copy)
+                        arr = py::array_t<float>(shape, strides, l.data);
+                    else
+                    {
+                        arr = py::array_t<float>(shape, strides, l.data, owner);
+                        arr.attr("flags").attr("writeable") = false;
+                    }
+                    ret[py::int_(out.first)] = arr;
+                }
+                return ret;
+            },
+            py::arg("images"), py::arg("layers") = py::none(), py::arg("copy") = false, py::arg("bgr") = false,
+            py::arg("letterbox") = false,
+            R"pbdoc(
+                Run the network and return raw layer outputs as NumPy arrays.
+
+                ``images`` is one input ``detect_array`` accepts, or a sequence of up to
+                ``batch_size`` of them. Returns a dict from layer index to the layer's
+                output: ``(channels, height, width)`` float32 for layers with a spatial
+                layout, ``(outputs,)`` otherwise, with a leading image axis when
+                ``images`` is a sequence. ``layers`` lists the layers wanted (negative
+                indices count from the end); by default the detection (yolo, region)
+                layers, whose outputs are the activated predictions darknet decodes
+                boxes from. See ``describe_layers`` for the indices.
+
+                The arrays are read-only views of the network's own buffers: no copy is
+                made, but they are overwritten by the next call using this detector.
+                Pass ``copy=True`` for arrays that stay valid. Only available in CPU
+                builds; no NMS or box decoding is run.
+            )pbdoc")
+        .def(
+            "describe_layers", [](PyDetector &d)
+            {
+                void *net = d.get_network();
+                py::list ret;
+                for (int i = 0, n = network_layer_count(net); i < n; ++i)
+                {
+                    layer_buffer l = network_layer(net, i);
+                    ret.append(py::make_tuple(layer_type_name(l.type), py::tuple(py::cast(l.shape))));
+                }
+                return ret;
             },
-            py::arg("vdata"), py::arg("thresh") = 0.2, py::arg("use_mean") = false)
+            R"pbdoc(
+                Return the ``(type, shape)`` of every layer, in order.
+
+                ``type`` is the .cfg section name, e.g. ``"convolutional"``, and ``shape``
+                the shape ``forward`` returns for one image.
+            )pbdoc")
+        .def(
+            "quantize", [](PyDetector &d, const std::string &mode)
+            {
+                quant_mode qm;
+                if (mode == "int8")
+                    qm = quant_mode::int8;
+                else if (mode == "fp16")
+                    qm = quant_mode::fp16;
+                else
+                    throw std::invalid_argument("mode must be 'int8' or 'fp16', got '" + mode + "'");
+                if (built_with_cuda())
+                    throw std::runtime_error("Quantization is only available in CPU builds");
+                if (d.precision != quant_mode::float32 && d.precision != qm)
+                    throw std::invalid_argument("The detector is already quantized to another mode");
+                quantize_report r;
+                {
+                    py::gil_scoped_release release;
+                    r = quantize_network(d.get_network(), qm);
+                }
+                d.precision = qm;
+                return py::dict(py::arg("quantized") = r.quantized, py::arg("skipped") = r.skipped,
+                                py::arg("bytes_before") = r.bytes_before, py::arg("bytes_after") = r.bytes_after);
+            },
+            py::arg("mode") = "int8",
+            R"pbdoc(
+                Store the convolution weights in reduced precision for CPU inference.
+
+                ``"int8"`` keeps per-output-channel INT8 weights and scales, ``"fp16"``
+                half-precision weights; batch norm is folded into the convolutions
+                first. Weights are expanded to float one output channel at a time and
+                accumulated in FP32, so they take 4x (INT8) or 2x (FP16) less memory
+                while results drift only by the rounding of the weights; use
+                ``libdarknetpy.quantization.calibrate`` to measure the drift on your
+                images. Layers the reduced-precision pass doesn't cover keep float
+                weights. Returns how many convolutional layers were converted or
+                skipped, and their weight storage before and after in bytes.
+
+                Can't be undone. The detector must not be running a detection
+                meanwhile.
+            )pbdoc")
+        .def_property_readonly(
+            "precision", [](const PyDetector &d)
+            { return d.precision == quant_mode::int8 ? "int8" : d.precision == quant_mode::fp16 ? "fp16" : "float32"; },
+            "Storage of the convolution weights: ``\"float32\"``, or the ``quantize`` mode")
 
         // .def("get_cuda_context", &Detector::get_cuda_context)
         ;
+
+    py::class_<FrameGate, std::shared_ptr<FrameGate>>(m, "FrameGate", R"pbdoc(
+        Skip inference on frames that barely differ from the last inferred one.
+
+        Meant for fixed cameras, whose frames are mostly the same scene. Each frame
+        is reduced to a luma thumbnail ``grid`` cells wide from a sparse sample of its
+        pixels; its motion score is the fraction of cells whose mean changed by more
+        than ``pixel_delta`` levels since the last frame that was inferred. Frames
+        scoring below ``threshold`` are gated, i.e. may reuse the previous
+        detections, but at most ``force_every - 1`` in a row (``0`` for no limit).
+
+        Pass a gate to ``StreamDetector``, or call ``check`` before detecting a frame
+        yourself. The counters tell how often frames were gated, to tune
+        ``threshold``. A gate follows one stream; it is thread-safe.
+    )pbdoc")
+        .def(py::init<float, int, int, int>(),
+             py::arg("threshold") = 0.01, py::arg("force_every") = 30, py::arg("pixel_delta") = 12,
+             py::arg("grid") = 64)
+        .def(
+            "check", [](FrameGate &g, const py::buffer &frame, bool force)
+            {
+                py::buffer_info info = frame.request();
+                buffer_image src = gate_frame(info);
+                py::gil_scoped_release release;
+                return g.check((const uint8_t *)src.ptr, src.h, src.w, src.c, src.strides[0], src.strides[1], src.strides[2], force);
+            },
+            py::arg("frame"), py::arg("force") = false,
+            R"pbdoc(
+                Return whether ``frame`` needs a new inference.
+
+                When it does (always with ``force=True``), ``frame`` becomes the
+                reference the next frames are compared against.
+            )pbdoc")
+        .def(
+            "score", [](FrameGate &g, const py::buffer &frame)
+            {
+                py::buffer_info info = frame.request();
+                buffer_image src = gate_frame(info);
+                py::gil_scoped_release release;
+                return g.score((const uint8_t *)src.ptr, src.h, src.w, src.c, src.strides[0], src.strides[1], src.strides[2]);
+            },
+            py::arg("frame"), "Motion score of ``frame`` against the reference, without updating anything")
+        .def("reset", &FrameGate::reset, "Forget the reference frame and zero the counters")
+        .def_readwrite("threshold", &FrameGate::threshold)
+        .def_readwrite("force_every", &FrameGate::force_every)
+        .def_readwrite("pixel_delta", &FrameGate::pixel_delta)
+        .def_readonly("grid", &FrameGate::grid)
+        .def_property_readonly("inferred", &FrameGate::inferred, "Frames that needed an inference")
+        .def_property_readonly("gated", &FrameGate::gated, "Frames that could reuse the previous detections")
+        .def_property_readonly("forced", &FrameGate::forced, "Inferred frames that would have been gated but for ``force_every``")
+        .def_property_readonly("last_score", &FrameGate::last_score, "Motion score of the last checked frame");
+
+    py::class_<ResultPublisher, std::shared_ptr<ResultPublisher>>(m, "ResultPublisher", R"pbdoc(
+        Stream detection results to TCP subscribers without blocking the caller.
+
+        Listens on ``host:port`` (``port=0`` picks a free port, see ``port``) until
+        closed; any number of clients may connect and disconnect meanwhile. Each
+        published result goes to every connected client as one message in
+        ``format``, see ``serialize``; with the default, one line of JSON::
+
+            {"frame":12,"boxes":[{"x":10,"y":20,"w":30,"h":40,"prob":0.9123,"obj_id":0,"track_id":0}]}
+
+        ``publish`` only queues the boxes. Serialization and sending happen on a
+        native background thread with non-blocking sockets, so a slow client never
+        stalls inference: every queue holds at most ``capacity`` messages and drops
+        its oldest one when full, counted in ``dropped``. Results published while no
+        client is connected are discarded. The publisher is thread-safe.
+
+        Unlike ``send_json_custom``, which opens the connection and blocks for every
+        message, the sockets stay open and ``publish`` returns at once.
+    )pbdoc")
+        .def(py::init([](int port, const std::string &host, size_t capacity, const std::string &format)
+                      {
+                          box_format fmt = parse_box_format(format);
+                          py::gil_scoped_release release;
+                          return std::make_shared<ResultPublisher>(host, port, capacity, fmt); }),
+             py::arg("port") = 8070, py::arg("host") = "127.0.0.1", py::arg("capacity") = 64,
+             py::arg("format") = "json")
+        .def(
+            "publish", [](ResultPublisher &p, const py::handle &boxes, const py::object &frame)
+            { p.publish(unpack_boxes(boxes), frame.is_none() ? -1 : frame.cast<int64_t>()); },
+            py::arg("boxes"), py::arg("frame") = py::none(),
+            R"pbdoc(
+                Queue the boxes of one image for the subscribers.
+
+                ``boxes`` is a detection result in any output format of a single
+                image: a list of ``bbox_t``, a structured array or a dict of columns.
+                ``frame`` numbers the message, by default with the count of results
+                published before.
+            )pbdoc")
+        .def(
+            "publish_raw", [](ResultPublisher &p, const py::object &message)
+            {
+                std::string data = py::isinstance<py::str>(message) ? message.cast<std::string>() : std::string(message.cast<py::bytes>());
+                p.publish_raw(std::move(data)); },
+            py::arg("message"), "Queue a ``str`` or ``bytes`` message that is sent as is, without a newline added")
+        .def("close", &ResultPublisher::close, "Disconnect the subscribers and stop listening; queued results are dropped",
+             py::call_guard<py::gil_scoped_release>())
+        .def("__enter__", [](ResultPublisher &p) -> ResultPublisher &
+             { return p; }, py::return_value_policy::reference)
+        .def("__exit__", [](ResultPublisher &p, const py::args &)
+             {
+                 py::gil_scoped_release release;
+                 p.close(); })
+        .def_readonly("capacity", &ResultPublisher::capacity)
+        .def_property_readonly("format", [](const ResultPublisher &p)
+                               { return p.format == box_format::msgpack ? "msgpack" : p.format == box_format::binary ? "binary" : "json"; })
+        .def_property_readonly("port", &ResultPublisher::port, "Port the publisher listens on")
+        .def_property_readonly("closed", &ResultPublisher::closed, "Whether ``close`` was called")
+        .def_property_readonly("subscribers", &ResultPublisher::subscribers, "Clients connected now")
+        .def_property_readonly("published", &ResultPublisher::published, "Results and messages published so far")
+        .def_property_readonly("sent", &ResultPublisher::sent, "Messages written to a subscriber, counted once per subscriber")
+        .def_property_readonly("dropped", &ResultPublisher::dropped, "Messages discarded because a queue was full");
+
+    py::class_<PyStreamDetector>(m, "StreamDetector", R"pbdoc(
+        Run a detector over a video file, URL (e.g. RTSP) or camera index.
+
+        Frames are decoded with OpenCV on a native background thread into a ring of
+        ``capacity`` frames while the previous frame is being detected. Iterating
+        yields ``(index, boxes)`` tuples, or ``(index, boxes, frame)`` with
+        ``return_frames=True`` (``frame`` is the decoded BGR uint8 array), where
+        ``index`` is the frame's position in the stream.
+
+        With ``latest=True`` (the default) inference always runs on the freshest
+        frame: older frames are dropped when detection falls behind and counted in
+        ``dropped``. Pass ``latest=False`` to process every frame of a file; decoding
+        then waits for room in the ring instead.
+
+        With a ``FrameGate``, frames it gates are not detected: they get a copy of the
+        boxes of the last inferred frame and are counted in ``gated``. A ``tracker``
+        (e.g. ``libdarknetpy.tracking.Tracker``, with ``output="array"`` or
+        ``"dict"``) is updated with the boxes of every frame, gated ones included, so
+        its tracks live on through static scenes. With a ``ResultPublisher``, the
+        boxes of every frame are published, numbered with the frame index.
+
+        A URL source that sends nothing for 5 seconds ends the stream (10 seconds
+        to connect), so a stalled camera can't block ``close``; this needs OpenCV
+        4.5.2 or later. The detector must not be used elsewhere while the stream
+        is iterated.
+    )pbdoc")
+        .def(py::init([](PyDetector &d, const py::object &source, size_t capacity, bool latest, float thresh, bool use_mean, bool letterbox, bool return_frames, const std::string &output, std::shared_ptr<FrameGate> gate, const py::object &tracker, std::shared_ptr<ResultPublisher> publisher)
+                      {
+                          box_format fmt = parse_box_format(output);
+                          if (fmt != box_format::array && fmt != box_format::dict && !tracker.is_none())
+                              throw std::invalid_argument("A tracker needs output='array' or 'dict'");
+                          if (is_serialized(fmt) && publisher)
+                              throw std::invalid_argument("A publisher needs output='list', 'array' or 'dict'");
+                          std::unique_ptr<FrameStream> stream;
+                          if (py::isinstance<py::int_>(source))
+                          {
+                              int camera = source.cast<int>();
+                              py::gil_scoped_release release;
+                              stream.reset(new FrameStream(camera, capacity, latest));
+                          }
+                          else
+                          {
+                              std::string url = py::str(source);
+                              py::gil_scoped_release release;
+                              stream.reset(new FrameStream(url, capacity, latest));
+                          }
+                          auto *s = new PyStreamDetector{d, std::move(stream), thresh, use_mean, letterbox, return_frames, output};
+                          s->gate = std::move(gate);
+                          s->tracker = tracker;
+                          s->publisher = std::move(publisher);
+                          return s; }),
+             py::arg("detector"), py::arg("source"), py::arg("capacity") = 4, py::arg("latest") = true,
+             py::arg("thresh") = 0.2, py::arg("use_mean") = false, py::arg("letterbox") = false,
+             py::arg("return_frames") = false, py::arg("output") = "list", py::arg("gate") = nullptr,
+             py::arg("tracker") = py::none(), py::arg("publisher") = nullptr, py::keep_alive<1, 2>())
+        .def("__iter__", [](PyStreamDetector &s) -> PyStreamDetector &
+             { return s; }, py::return_value_policy::reference_internal)
+        .def("__next__", [](PyStreamDetector &s)
+             {
+                 stream_frame f;
+                 bool ok;
+                 {
+                     py::gil_scoped_release release;
+                     ok = s.stream->next(f);
+                 }
+                 if (!ok)
+                     throw py::stop_iteration();
+                 const int c = f.mat.channels();
+                 pixel_view px{f.mat.data, f.mat.rows, f.mat.cols, c, (ptrdiff_t)f.mat.step, c, 1, true, f.mat.cols, f.mat.rows};
+                 bool infer = true;
+                 if (s.gate)
+                 {
+                     const bool first = s.last_boxes.is_none();
+                     py::gil_scoped_release release;
+                     infer = s.gate->check(px.data, px.h, px.w, px.c, px.row_stride, px.px_stride, px.ch_stride, first);
+                 }
+                 py::object boxes;
+                 if (infer)
+                 {
+                     boxes = run_detection(s.detector.profiler, "StreamDetector", s.output, [&]()
+                                           { return detect_pixels(s.detector, px, s.thresh, s.use_mean, s.letterbox); });
+                     ++s.processed;
+                     if (s.gate)
+                         s.last_boxes = copy_boxes(boxes);
+                 }
+                 else
+                 {
+                     boxes = copy_boxes(s.last_boxes);
+                     ++s.gated;
+                 }
+                 if (!s.tracker.is_none())
+                     s.tracker.attr("update")(boxes);
+                 if (s.publisher)
+                     s.publisher->publish(unpack_boxes(boxes), (int64_t)f.index);
+                 if (!s.return_frames)
+                     return py::make_tuple(f.index, boxes);
+                 return py::make_tuple(f.index, boxes, mat_to_array(std::move(f.mat))); })
+        .def("close", [](PyStreamDetector &s)
+             { s.stream->close(); }, "Stop decoding; iteration ends", py::call_guard<py::gil_scoped_release>())
+        .def("__enter__", [](PyStreamDetector &s) -> PyStreamDetector &
+             { return s; }, py::return_value_policy::reference)
+        .def("__exit__", [](PyStreamDetector &s, const py::args &)
+             {
+                 py::gil_scoped_release release;
+                 s.stream->close(); })
+        .def_property_readonly("fps", [](const PyStreamDetector &s)
+                               { return s.stream->fps(); }, "Frame rate reported by the source, 0 if unknown")
+        .def_property_readonly("decoded", [](const PyStreamDetector &s)
+                               { return s.stream->decoded(); }, "Frames decoded so far")
+        .def_property_readonly("dropped", [](const PyStreamDetector &s)
+                               { return s.stream->dropped(); }, "Frames skipped because a newer one was available")
+        .def_readonly("processed", &PyStreamDetector::processed, "Frames detected so far")
+        .def_readonly("gated", &PyStreamDetector::gated, "Frames that reused the detections of an earlier frame")
+        .def_property_readonly("buffered", [](const PyStreamDetector &s)
+                               { return s.stream->buffered(); }, "Frames waiting in the ring");
+
+    // bound after Detector: pybind11 renders signatures when a function is defined, and
+    // only types registered by then appear under their Python name, here in
+    // ImagePool(detector, capacity)
+    py::class_<ImagePool, std::shared_ptr<ImagePool>>(m, "ImagePool", R"pbdoc(
+        A pool of fixed-size image buffers, typically the detector's input size.
+
+        ``acquire()`` and ``load()`` return ``image_t`` objects backed by recycled
+        buffers; closing or dropping such an image hands its buffer back to the
+        pool. Up to ``capacity`` idle buffers are kept for reuse, so memory stays
+        flat however many requests are served. The pool is thread-safe.
+    )pbdoc")
+        .def(py::init<int, int, int, size_t>(),
+             py::arg("width"), py::arg("height"), py::arg("channels") = 3, py::arg("capacity") = 4)
+        .def(py::init([](const PyDetector &d, size_t capacity)
+                      { return std::make_shared<ImagePool>(d.get_net_width(), d.get_net_height(), 3, capacity); }),
+             py::arg("detector"), py::arg("capacity") = 4)
+        .def("acquire", &ImagePool::acquire, "Take an image from the pool; its pixels are uninitialized",
+             py::call_guard<py::gil_scoped_release>())
+        .def(
+            "load", [](ImagePool &pool, const py::buffer &buf, bool bgr, bool letterbox)
+            {
+                if (pool.c != 3)
+                    throw std::invalid_argument("load() needs a pool of 3-channel images");
+                py::buffer_info info = buf.request();
+                buffer_image src = parse_buffer(info);
+                py::gil_scoped_release release;
+                PyImage im = pool.acquire();
+                im.placement = place_buffer(im.data, pool.w, pool.h, src, bgr, letterbox);
+                im.placed = true;
+                return im;
+            },
+            py::arg("data"), py::arg("bgr") = false, py::arg("letterbox") = false,
+            R"pbdoc(
+                Take an image from the pool and fill it from ``data``.
+
+                ``data`` is any input ``Detector.detect_array`` accepts; it is resized
+                (or letterboxed) to the pool's size. ``Detector.detect`` reports the boxes
+                found in such an image in the coordinates of ``data``.
+            )pbdoc")
+        .def("clear", &ImagePool::clear, "Free all idle buffers")
+        .def_readonly("width", &ImagePool::w)
+        .def_readonly("height", &ImagePool::h)
+        .def_readonly("channels", &ImagePool::c)
+        .def_readonly("capacity", &ImagePool::capacity)
+        .def_property_readonly("buffer_bytes", &ImagePool::buffer_bytes)
+        .def_property_readonly("hits", &ImagePool::hits)
+        .def_property_readonly("misses", &ImagePool::misses)
+        .def_property_readonly("in_use", &ImagePool::in_use)
+        .def_property_readonly("idle", &ImagePool::idle)
+        .def_property_readonly("bytes_resident", &ImagePool::bytes_resident);
+
 #ifdef VERSION_INFO
     m.attr("__version__") = MACRO_STRINGIFY(VERSION_INFO);
 #else
@@ -0,0 +1,32 @@
+#include <algorithm>
+
+#include "metrics.hpp"
+
+const char *const STAGE_NAMES[N_STAGES] = {"decode", "preprocess", "network", "nms", "pack"};
+
+const std::vector<double> LATENCY_BUCKETS = {0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                                             0.025, 0.05, 0.1, 0.25, 0.5, 1.0};
+
+metrics_registry metrics;
+
+latency_histogram::latency_histogram() : counts(LATENCY_BUCKETS.size() + 1)
+{
+    for (auto &c : counts)
+        c.store(0, std::memory_order_relaxed);
+}
+
+void latency_histogram::observe(double seconds)
+{
+    size_t i = std::lower_bound(LATENCY_BUCKETS.begin(), LATENCY_BUCKETS.end(), seconds) - LATENCY_BUCKETS.begin();
+    counts[i].fetch_add(1, std::memory_order_relaxed);
+    sum_ns.fetch_add((uint64_t)(std::max(seconds, 0.0) * 1e9), std::memory_order_relaxed);
+}
+
+std::vector<uint64_t> latency_histogram::buckets() const
+{
+    std::vector<uint64_t> ret;
+    ret.reserve(counts.size());
+    for (const auto &c : counts)
+        ret.push_back(c.load(std::memory_order_relaxed));
+    return ret;
+}
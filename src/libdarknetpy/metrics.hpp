@@ -0,0 +1,61 @@
+#pragma once
+#include <atomic>
+#include <cstdint>
+#include <vector>
+
+// Process-wide counters and latency histograms, updated by the native layer as it
+// works. Every update is a relaxed atomic add, so any number of threads can record
+// concurrently without taking a lock; a snapshot reads each value separately.
+
+enum stage_t
+{
+    STAGE_DECODE,
+    STAGE_PREPROCESS,
+    STAGE_NETWORK,
+    STAGE_NMS,
+    STAGE_PACK,
+    N_STAGES
+};
+
+extern const char *const STAGE_NAMES[N_STAGES];
+
+// Upper bounds, in seconds, of the latency histogram buckets; the last one is infinite.
+extern const std::vector<double> LATENCY_BUCKETS;
+
+class latency_histogram
+{
+public:
+    latency_histogram();
+    void observe(double seconds);
+
+    // counts per bucket (not cumulative) and the sum of the observations
+    std::vector<uint64_t> buckets() const;
+    double sum() const { return sum_ns.load(std::memory_order_relaxed) * 1e-9; }
+
+private:
+    std::vector<std::atomic<uint64_t>> counts;
+    std::atomic<uint64_t> sum_ns{0};
+};
+
+struct metrics_registry
+{
+    // detection calls that returned, the images they covered and the boxes they
+    // returned; calls that threw
+    std::atomic<uint64_t> inferences{0}, images{0}, boxes{0}, failures{0};
+    // size of the encoded images decoded
+    std::atomic<uint64_t> decoded_bytes{0};
+    // image_t buffers currently allocated, including idle ones kept by ImagePools
+    std::atomic<int64_t> image_buffers{0}, image_buffer_bytes{0};
+    // whole detection calls, and each stage of them
+    latency_histogram inference_seconds;
+    latency_histogram stage_seconds[N_STAGES];
+
+    void add(std::atomic<uint64_t> &counter, uint64_t n) { counter.fetch_add(n, std::memory_order_relaxed); }
+    void add_buffers(int64_t n, int64_t bytes)
+    {
+        image_buffers.fetch_add(n, std::memory_order_relaxed);
+        image_buffer_bytes.fetch_add(bytes, std::memory_order_relaxed);
+    }
+};
+
+extern metrics_registry metrics;
@@ -0,0 +1,163 @@
+"""
+Process-wide detection metrics.
+
+The native layer counts every detection call as it runs (inferences, images,
+boxes, failures, decoded bytes, resident image buffers) and records the
+latency of each call and of each of its stages in histograms. The updates are
+lock-free atomic adds, so they are always on. ``snapshot`` returns the
+current values as a dict, ``prometheus_text`` renders them in the Prometheus
+text exposition format and ``serve`` exposes them on a local HTTP endpoint
+for scraping.
+
+The metrics are per process: every ``DetectorPool`` worker keeps its own,
+and ``DetectorPool.metrics_snapshot`` sums them. ``prometheus_text`` and
+``serve`` take the pool, or anything else with a ``metrics_snapshot`` method,
+as their source.
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Sequence
+
+__all__ = ["merge", "prometheus_text", "serve", "snapshot"]
+
+PREFIX = "libdarknetpy"
+
+_COUNTERS = (
+    ("inferences", "Detection calls that returned."),
+    ("images", "Images detections were run on."),
+    ("boxes", "Boxes returned by detection calls."),
+    ("failures", "Detection calls that raised an error."),
+    ("decoded_bytes", "Bytes of encoded images decoded."),
+)
+_GAUGES = (
+    ("image_buffers", "image_t buffers allocated, including idle pooled ones."),
+    ("image_buffer_bytes", "Bytes of image_t buffers allocated."),
+)
+
+
+def snapshot() -> dict[str, Any]:
+    """Return the current metrics, see ``metrics_snapshot``."""
+    from ._libdarknetpy import metrics_snapshot
+
+    return metrics_snapshot()
+
+
+def merge(snapshots: Sequence[dict[str, Any]]) -> dict[str, Any]:
+    """Sum the metrics of several processes, e.g. the workers of a pool."""
+
+    def add_histograms(hists: list[dict]) -> dict[str, Any]:
+        return {
+            "count": sum(h["count"] for h in hists),
+            "sum": sum(h["sum"] for h in hists),
+            "buckets": [
+                (buckets[0][0], sum(count for _, count in buckets))
+                for buckets in zip(*(h["buckets"] for h in hists))
+            ],
+        }
+
+    if not snapshots:
+        msg = "no snapshots to merge"
+        raise ValueError(msg)
+    out: dict[str, Any] = {
+        key: sum(s[key] for s in snapshots) for key, _ in _COUNTERS + _GAUGES
+    }
+    out["inference_seconds"] = add_histograms(
+        [s["inference_seconds"] for s in snapshots]
+    )
+    out["stage_seconds"] = {
+        stage: add_histograms([s["stage_seconds"][stage] for s in snapshots])
+        for stage in snapshots[0]["stage_seconds"]
+    }
+    return out
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf"
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _histogram(lines: list[str], name: str, labels: str, hist: dict) -> None:
+    sep = "," if labels else ""
+    for bound, count in hist["buckets"]:
+        lines.append(f'{name}_bucket{{{labels}{sep}le="{_number(bound)}"}} {count}')
+    braces = f"{{{labels}}}" if labels else ""
+    lines.append(f"{name}_sum{braces} {_number(hist['sum'])}")
+    lines.append(f"{name}_count{braces} {hist['count']}")
+
+
+def prometheus_text(metrics: dict[str, Any] | Any = None) -> str:
+    """
+    Render ``metrics`` as Prometheus text.
+
+    ``metrics`` is a snapshot, or a source such as a ``DetectorPool`` to take
+    one from; by default a fresh ``snapshot`` of this process.
+    """
+    if metrics is None:
+        metrics = snapshot()
+    elif not isinstance(metrics, dict):
+        metrics = metrics.metrics_snapshot()
+    lines = []
+    for key, help_text in _COUNTERS:
+        name = f"{PREFIX}_{key}_total"
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+        lines.append(f"{name} {metrics[key]}")
+    for key, help_text in _GAUGES:
+        name = f"{PREFIX}_{key}"
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+        lines.append(f"{name} {metrics[key]}")
+
+    name = f"{PREFIX}_inference_seconds"
+    lines += [
+        f"# HELP {name} Latency of detection calls.",
+        f"# TYPE {name} histogram",
+    ]
+    _histogram(lines, name, "", metrics["inference_seconds"])
+    name = f"{PREFIX}_stage_seconds"
+    lines += [
+        f"# HELP {name} Latency of the stages of detection calls.",
+        f"# TYPE {name} histogram",
+    ]
+    for stage, hist in metrics["stage_seconds"].items():
+        _histogram(lines, name, f'stage="{stage}"', hist)
+    return "\n".join(lines) + "\n"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = prometheus_text(getattr(self.server, "source", None)).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+
+def serve(
+    port: int = 9464, host: str = "127.0.0.1", source: Any = None
+) -> ThreadingHTTPServer:
+    """
+    Serve the metrics at ``http://host:port/metrics`` from a daemon thread.
+
+    ``source`` is where each scrape takes its snapshot from, e.g. a
+    ``DetectorPool``; by default this process. Returns the server; call its
+    ``shutdown`` and ``server_close`` methods to stop it. Pass
+    ``port=0`` to pick a free port, then read it from ``server_address``.
+    """
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.source = source  # type: ignore[attr-defined]
+    threading.Thread(
+        target=server.serve_forever, name="libdarknetpy-metrics", daemon=True
+    ).start()
+    return server
@@ -0,0 +1,199 @@
+#include <algorithm>
+#include <cmath>
+#include <cstdint>
+#include <stdexcept>
+
+#include "nms.hpp"
+
+nms_method parse_nms_method(const std::string &name)
+{
+    if (name == "darknet")
+        return nms_method::darknet;
+    if (name == "none")
+        return nms_method::none;
+    if (name == "greedy")
+        return nms_method::greedy;
+    if (name == "diou")
+        return nms_method::diou;
+    if (name == "soft")
+        return nms_method::soft;
+    throw std::invalid_argument("NMS method must be 'darknet', 'none', 'greedy', 'diou' or 'soft', got '" + name + "'");
+}
+
+void check_nms_options(const nms_options &opts)
+{
+    if (opts.top_k < 0 || opts.max_detections < 0)
+        throw std::invalid_argument("top_k and max_detections must not be negative");
+    if (!(opts.sigma > 0.f))
+        throw std::invalid_argument("sigma must be positive");
+}
+
+const char *nms_method_name(nms_method method)
+{
+    switch (method)
+    {
+    case nms_method::none:
+        return "none";
+    case nms_method::greedy:
+        return "greedy";
+    case nms_method::diou:
+        return "diou";
+    case nms_method::soft:
+        return "soft";
+    default:
+        return "darknet";
+    }
+}
+
+// The boxes of one NMS group as arrays of corners.
+struct box_arrays
+{
+    std::vector<float> x1, y1, x2, y2, area, score;
+
+    void assign(const bbox_t *boxes, size_t n)
+    {
+        for (auto *v : {&x1, &y1, &x2, &y2, &area, &score})
+            v->resize(n);
+        for (size_t i = 0; i < n; ++i)
+        {
+            const bbox_t &b = boxes[i];
+            x1[i] = (float)b.x;
+            y1[i] = (float)b.y;
+            x2[i] = (float)b.x + b.w;
+            y2[i] = (float)b.y + b.h;
+            area[i] = (float)b.w * b.h;
+            score[i] = b.prob;
+        }
+    }
+};
+
+// Writes the overlap of box `i` with boxes [from, n) to `out`: their IoU, minus the
+// squared distance of the centers over the squared diagonal of the enclosing box for
+// DIoU.
+template <bool DIOU>
+static void overlaps(const box_arrays &a, size_t i, size_t from, size_t n, float *__restrict out)
+{
+    const float ax1 = a.x1[i], ay1 = a.y1[i], ax2 = a.x2[i], ay2 = a.y2[i], aarea = a.area[i];
+    const float *__restrict x1 = a.x1.data();
+    const float *__restrict y1 = a.y1.data();
+    const float *__restrict x2 = a.x2.data();
+    const float *__restrict y2 = a.y2.data();
+    const float *__restrict area = a.area.data();
+#pragma omp simd
+    for (size_t j = from; j < n; ++j)
+    {
+        float iw = std::max(0.f, std::min(ax2, x2[j]) - std::max(ax1, x1[j]));
+        float ih = std::max(0.f, std::min(ay2, y2[j]) - std::max(ay1, y1[j]));
+        float inter = iw * ih;
+        float uni = aarea + area[j] - inter;
+        float v = uni > 0.f ? inter / uni : 0.f;
+        if (DIOU)
+        {
+            float dx = (ax1 + ax2) - (x1[j] + x2[j]), dy = (ay1 + ay2) - (y1[j] + y2[j]);
+            float ew = std::max(ax2, x2[j]) - std::min(ax1, x1[j]), eh = std::max(ay2, y2[j]) - std::min(ay1, y1[j]);
+            // the center offsets are doubled, hence the factor on the diagonal
+            float diag = 4.f * (ew * ew + eh * eh);
+            v -= diag > 0.f ? (dx * dx + dy * dy) / diag : 0.f;
+        }
+        out[j] = v;
+    }
+}
+
+// Hard NMS over a group sorted by decreasing score; appends the kept indices.
+template <bool DIOU>
+static void greedy_nms(const box_arrays &a, float iou_thresh, std::vector<size_t> &keep)
+{
+    const size_t n = a.x1.size();
+    std::vector<uint8_t> removed(n, 0);
+    std::vector<float> ov(n);
+    for (size_t i = 0; i < n; ++i)
+    {
+        if (removed[i])
+            continue;
+        keep.push_back(i);
+        overlaps<DIOU>(a, i, i + 1, n, ov.data());
+        for (size_t j = i + 1; j < n; ++j)
+            removed[j] |= ov[j] > iou_thresh;
+    }
+}
+
+// Gaussian soft-NMS: repeatedly keeps the best remaining box and decays the scores of
+// the others by their overlap with it. Appends the kept indices and updates their
+// scores in `a`.
+static void soft_nms(box_arrays &a, float sigma, float score_thresh, std::vector<size_t> &keep)
+{
+    const size_t n = a.x1.size();
+    std::vector<uint8_t> alive(n, 1);
+    std::vector<float> ov(n);
+    float *score = a.score.data();
+    const float k = -1.f / sigma;
+    for (size_t left = n; left > 0; --left)
+    {
+        size_t best = n;
+        for (size_t j = 0; j < n; ++j)
+            if (alive[j] && (best == n || score[j] > score[best]))
+                best = j;
+        if (score[best] < score_thresh)
+            break;
+        alive[best] = 0;
+        keep.push_back(best);
+        overlaps<false>(a, best, 0, n, ov.data());
+#pragma omp simd
+        for (size_t j = 0; j < n; ++j)
+            score[j] *= alive[j] ? std::exp(k * ov[j] * ov[j]) : 1.f;
+    }
+}
+
+static bool by_score(const bbox_t &a, const bbox_t &b)
+{
+    return a.prob > b.prob;
+}
+
+void apply_nms(std::vector<bbox_t> &boxes, const nms_options &opts, float iou_thresh, float score_thresh)
+{
+    const bool suppress = opts.method != nms_method::darknet && opts.method != nms_method::none;
+    if (suppress && opts.top_k > 0 && boxes.size() > (size_t)opts.top_k)
+    {
+        std::partial_sort(boxes.begin(), boxes.begin() + opts.top_k, boxes.end(), by_score);
+        boxes.resize(opts.top_k);
+    }
+    if (suppress)
+    {
+        if (opts.class_aware)
+            std::sort(boxes.begin(), boxes.end(), [](const bbox_t &a, const bbox_t &b)
+                      { return a.obj_id != b.obj_id ? a.obj_id < b.obj_id : a.prob > b.prob; });
+        else
+            std::sort(boxes.begin(), boxes.end(), by_score);
+
+        std::vector<bbox_t> kept;
+        std::vector<size_t> keep;
+        box_arrays a;
+        for (size_t start = 0, end; start < boxes.size(); start = end)
+        {
+            end = start + 1;
+            if (opts.class_aware)
+                while (end < boxes.size() && boxes[end].obj_id == boxes[start].obj_id)
+                    ++end;
+            else
+                end = boxes.size();
+            a.assign(&boxes[start], end - start);
+            keep.clear();
+            if (opts.method == nms_method::greedy)
+                greedy_nms<false>(a, iou_thresh, keep);
+            else if (opts.method == nms_method::diou)
+                greedy_nms<true>(a, iou_thresh, keep);
+            else
+                soft_nms(a, opts.sigma, score_thresh, keep);
+            for (size_t i : keep)
+            {
+                kept.push_back(boxes[start + i]);
+                kept.back().prob = a.score[i];
+            }
+        }
+        boxes.swap(kept);
+    }
+    if (suppress || (opts.max_detections > 0 && boxes.size() > (size_t)opts.max_detections))
+        std::stable_sort(boxes.begin(), boxes.end(), by_score);
+    if (opts.max_detections > 0 && boxes.size() > (size_t)opts.max_detections)
+        boxes.resize(opts.max_detections);
+}
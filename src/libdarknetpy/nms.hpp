@@ -0,0 +1,46 @@
+#pragma once
+#include <string>
+#include <vector>
+
+#include "common.hpp"
+
+// Non-maximum suppression over detection results, as an alternative to the NMS
+// darknet runs inside Detector::detect/detectBatch.
+//
+// Boxes are sorted by score (and class, when suppression is class-aware) once, and
+// their corners are laid out as separate float arrays, so each suppression step is a
+// branch-free loop over contiguous memory that the compiler vectorizes. Class-aware
+// NMS only compares boxes of the same class. A pre-NMS top-k bounds the quadratic part
+// on crowded scenes with low thresholds.
+
+enum class nms_method
+{
+    darknet, // darknet's own per-class NMS, with the threshold Detector.nms
+    none,
+    greedy,  // hard NMS: drop boxes overlapping a better one by more than the threshold
+    diou,    // like greedy, with IoU minus the normalized distance of the centers
+    soft     // Gaussian soft-NMS: decay the scores of overlapping boxes instead
+};
+
+struct nms_options
+{
+    nms_method method = nms_method::darknet;
+    bool class_aware = true;
+    // keep only the `top_k` best boxes before NMS, 0 for all (not for darknet's NMS)
+    int top_k = 0;
+    // keep only the `max_detections` best boxes after NMS, 0 for all
+    int max_detections = 0;
+    // Gaussian soft-NMS decay: score *= exp(-iou^2 / sigma)
+    float sigma = 0.5f;
+};
+
+nms_method parse_nms_method(const std::string &name);
+// Throws std::invalid_argument for negative limits or a non-positive sigma.
+void check_nms_options(const nms_options &opts);
+const char *nms_method_name(nms_method method);
+
+// Suppresses overlapping boxes in place with `opts.method` (nothing is done for
+// nms_method::darknet and none but the max_detections cut). Boxes overlapping by more
+// than `iou_thresh` are suppressed; soft-NMS drops boxes whose score decays below
+// `score_thresh`. The boxes kept are ordered by decreasing score.
+void apply_nms(std::vector<bbox_t> &boxes, const nms_options &opts, float iou_thresh, float score_thresh);
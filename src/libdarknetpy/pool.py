@@ -0,0 +1,392 @@
+"""
+Multi-process detector pool.
+
+Darknet parallelizes a forward pass with OpenMP inside one process, which
+stops scaling well long before a large machine runs out of cores. A
+``DetectorPool`` runs several independent ``Detector`` instances in worker
+processes instead. Frames reach the workers through per-worker
+``multiprocessing.shared_memory`` rings of fixed-size slots, so the only copy
+is the one into the ring; only the slot index and shape go through the pipe.
+Results come back as NumPy structured arrays (``output="array"``).
+``metrics_snapshot`` asks every worker for its metrics over the same pipes.
+
+Requires Python 3.8+ and NumPy.
+"""
+
+from __future__ import annotations
+
+import itertools
+import os
+import threading
+from concurrent.futures import Future
+from multiprocessing import connection, get_context
+from typing import Any, Sequence
+
+__all__ = ["DetectorPool"]
+
+# room for a 1080p RGB frame
+DEFAULT_SLOT_BYTES = 1920 * 1080 * 3
+
+
+def _worker_main(
+    cfg: str,
+    weights: str,
+    gpu: int,
+    batch_size: int,
+    shm_name: str,
+    slot_bytes: int,
+    cpus: Sequence[int] | None,
+    conn: connection.Connection,
+) -> None:
+    from multiprocessing.shared_memory import SharedMemory
+
+    import numpy as np
+
+    from ._libdarknetpy import Detector, metrics_snapshot
+
+    if cpus and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+    shm = SharedMemory(name=shm_name)
+    try:
+        det = Detector(cfg, weights, gpu, batch_size)
+    except Exception as e:
+        conn.send((None, None, e))
+        return
+    # an empty message tells the pool the network is loaded
+    conn.send((None, None, None))
+    while True:
+        try:
+            msg = conn.recv()
+        except EOFError:
+            break
+        if msg is None:
+            break
+        req_id, slot, shape, dtype, kwargs = msg
+        # a request without a slot asks for the worker's metrics
+        if slot is None:
+            conn.send((req_id, metrics_snapshot(), None))
+            continue
+        frame = np.ndarray(shape, dtype, buffer=shm.buf, offset=slot * slot_bytes)
+        try:
+            result = det.detect_array(frame, output="array", **kwargs)
+        except Exception as e:
+            conn.send((req_id, None, e))
+        else:
+            conn.send((req_id, result, None))
+        del frame
+    shm.close()
+
+
+class _Worker:
+    def __init__(self, index: int, process: Any, conn: connection.Connection):
+        self.index = index
+        self.process = process
+        self.conn = conn
+        # guards `alive` and `pending` against the collector thread
+        self.lock = threading.Lock()
+        self.alive = True
+        # slot is None for metrics requests
+        self.pending: dict[int, tuple[Future, int | None]] = {}
+        self.ready = threading.Event()
+        self.error: BaseException | None = None
+
+
+class DetectorPool:
+    """
+    Run detections on ``workers`` processes, each with its own ``Detector``.
+
+    Each worker owns a shared-memory ring of ``slots`` frames of up to
+    ``slot_bytes`` bytes; ``submit`` copies the frame into a free slot of the
+    least busy worker, waiting for one to free up when all rings are full.
+    Frames are the arrays ``Detector.detect_array`` accepts: encoded image
+    bytes, ``(h, w[, c])`` uint8 or ``(3, h, w)`` float32.
+
+    ``cpu_affinity`` pins the workers (where the OS supports it): ``"auto"``
+    splits the CPUs available to this process evenly between them, or pass
+    one CPU set per worker. OpenMP sizes its thread team when the worker
+    starts, so also set ``OMP_NUM_THREADS`` to the CPUs per worker.
+
+    A worker that dies is restarted; the requests it had accepted fail with
+    ``RuntimeError``. The constructor returns once every worker has loaded
+    its network, and raises if one of them fails to.
+    """
+
+    def __init__(
+        self,
+        configurationFilename: str,
+        weightsFilename: str,
+        workers: int | None = None,
+        gpu: int = 0,
+        batch_size: int = 1,
+        slots: int = 2,
+        slot_bytes: int = DEFAULT_SLOT_BYTES,
+        cpu_affinity: str | Sequence[Sequence[int]] | None = None,
+        start_method: str = "spawn",
+    ) -> None:
+        from multiprocessing.shared_memory import SharedMemory
+
+        workers = workers or os.cpu_count() or 1
+        self.args = (configurationFilename, weightsFilename, gpu, batch_size)
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.cpu_affinity = _split_cpus(cpu_affinity, workers)
+        self.restarts = 0
+        self._ctx = get_context(start_method)
+        self._ids = itertools.count()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._shm = [
+            SharedMemory(create=True, size=slots * slot_bytes) for _ in range(workers)
+        ]
+        self._free = [list(range(slots)) for _ in range(workers)]
+        self._workers = [self._start(i) for i in range(workers)]
+        self._collector = threading.Thread(
+            target=self._collect, name="DetectorPool", daemon=True
+        )
+        self._collector.start()
+        for w in self._workers:
+            w.ready.wait()
+        errors = [w.error for w in self._workers if w.error is not None]
+        if errors:
+            self.close()
+            raise errors[0]
+
+    @property
+    def workers(self) -> int:
+        return len(self._workers)
+
+    @property
+    def in_flight(self) -> int:
+        """Number of frames held in the rings, queued or being detected."""
+        with self._cond:
+            return sum(self.slots - len(free) for free in self._free)
+
+    def submit(
+        self,
+        frame: Any,
+        thresh: float = 0.2,
+        use_mean: bool = False,
+        bgr: bool = False,
+        letterbox: bool = False,
+    ) -> Future:
+        """Queue ``frame`` on a worker; the future resolves to its boxes."""
+        import numpy as np
+
+        a = (
+            np.frombuffer(frame, np.uint8)
+            if isinstance(frame, bytes)
+            else np.asarray(frame)
+        )
+        if a.nbytes > self.slot_bytes:
+            msg = f"frame of {a.nbytes} bytes does not fit in a {self.slot_bytes} byte slot"
+            raise ValueError(msg)
+
+        with self._cond:
+            while True:
+                if self._closed:
+                    msg = "DetectorPool is closed"
+                    raise RuntimeError(msg)
+                alive = [w.index for w in self._workers if w.alive]
+                if not alive:
+                    msg = "all detector workers have exited"
+                    raise RuntimeError(msg)
+                i = max(alive, key=lambda i: len(self._free[i]))
+                if self._free[i]:
+                    break
+                self._cond.wait()
+            slot = self._free[i].pop()
+            w = self._workers[i]
+            req_id = next(self._ids)
+
+        dst = np.ndarray(
+            a.shape, a.dtype, buffer=self._shm[i].buf, offset=slot * self.slot_bytes
+        )
+        dst[...] = a
+        del dst
+
+        fut: Future = Future()
+        kwargs = {
+            "thresh": thresh,
+            "use_mean": use_mean,
+            "bgr": bgr,
+            "letterbox": letterbox,
+        }
+        with w.lock:
+            if w.alive:
+                w.pending[req_id] = (fut, slot)
+                try:
+                    w.conn.send((req_id, slot, a.shape, a.dtype.str, kwargs))
+                    return fut
+                except OSError:
+                    del w.pending[req_id]
+        self._release(i, slot)
+        fut.set_exception(RuntimeError(f"detector worker {i} exited"))
+        return fut
+
+    def detect(self, frame: Any, timeout: float | None = None, **kwargs: Any):
+        """Submit ``frame`` and wait for its boxes."""
+        return self.submit(frame, **kwargs).result(timeout)
+
+    def metrics_snapshot(self, timeout: float | None = None) -> dict[str, Any]:
+        """
+        Return the metrics of all workers summed, see ``metrics_snapshot``.
+
+        Each worker answers after the frames queued before the request. A
+        restarted worker starts counting from zero again.
+        """
+        from .metrics import merge
+
+        futures = []
+        with self._cond:
+            workers = [w for w in self._workers if w.alive]
+            ids = [next(self._ids) for _ in workers]
+        for w, req_id in zip(workers, ids):
+            fut: Future = Future()
+            with w.lock:
+                if not w.alive:
+                    continue
+                w.pending[req_id] = (fut, None)
+                try:
+                    w.conn.send((req_id, None, None, None, None))
+                except OSError:
+                    del w.pending[req_id]
+                    continue
+            futures.append(fut)
+        if not futures:
+            msg = "all detector workers have exited"
+            raise RuntimeError(msg)
+        return merge([fut.result(timeout) for fut in futures])
+
+    def close(self) -> None:
+        """Let the workers finish their queued frames, then stop them."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        for w in self._workers:
+            with w.lock:
+                if w.alive:
+                    try:
+                        w.conn.send(None)
+                    except OSError:
+                        pass
+        for w in self._workers:
+            w.process.join()
+        self._collector.join()
+        for shm in self._shm:
+            shm.close()
+            shm.unlink()
+
+    def __enter__(self) -> DetectorPool:
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
+
+    def _start(self, i: int) -> _Worker:
+        parent, child = self._ctx.Pipe()
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(
+                *self.args,
+                self._shm[i].name,
+                self.slot_bytes,
+                self.cpu_affinity[i] if self.cpu_affinity else None,
+                child,
+            ),
+            name=f"DetectorPool-{i}",
+            daemon=True,
+        )
+        process.start()
+        child.close()
+        return _Worker(i, process, parent)
+
+    def _release(self, i: int, slot: int) -> None:
+        with self._cond:
+            self._free[i].append(slot)
+            self._cond.notify()
+
+    def _collect(self) -> None:
+        while True:
+            with self._cond:
+                workers = [w for w in self._workers if w.alive]
+            if not workers:
+                return
+            handles: dict[Any, tuple[_Worker, bool]] = {}
+            for w in workers:
+                handles[w.conn] = (w, False)
+                handles[w.process.sentinel] = (w, True)
+            ready = connection.wait(list(handles))
+            # handle exits last so results sent right before one are kept
+            for h in sorted(ready, key=lambda h: handles[h][1]):
+                w, exited = handles[h]
+                if exited:
+                    self._exited(w)
+                elif w.alive:
+                    try:
+                        self._complete(w, *w.conn.recv())
+                    except (EOFError, OSError):
+                        pass
+
+    def _complete(self, w: _Worker, req_id: int | None, result: Any, exc: Any) -> None:
+        if req_id is None:
+            w.error = exc
+            w.ready.set()
+            return
+        with w.lock:
+            fut, slot = w.pending.pop(req_id)
+        if slot is not None:
+            self._release(w.index, slot)
+        if exc is not None:
+            fut.set_exception(exc)
+        else:
+            fut.set_result(result)
+
+    def _exited(self, w: _Worker) -> None:
+        try:
+            while w.conn.poll():
+                self._complete(w, *w.conn.recv())
+        except (EOFError, OSError):
+            pass
+        w.process.join()
+        with w.lock:
+            w.alive = False
+            pending = list(w.pending.values())
+            w.pending.clear()
+        w.conn.close()
+        started = w.ready.is_set() and w.error is None
+        msg = f"detector worker {w.index} exited with code {w.process.exitcode}"
+        if not w.ready.is_set():
+            w.error = RuntimeError(msg)
+            w.ready.set()
+        for fut, slot in pending:
+            if slot is not None:
+                self._release(w.index, slot)
+            fut.set_exception(RuntimeError(msg))
+        with self._cond:
+            # a worker that never got its network loaded would fail again
+            if started and not self._closed:
+                self.restarts += 1
+                self._workers[w.index] = self._start(w.index)
+            self._cond.notify_all()
+
+
+def _split_cpus(
+    cpu_affinity: str | Sequence[Sequence[int]] | None, workers: int
+) -> list[list[int]] | None:
+    if cpu_affinity is None:
+        return None
+    if cpu_affinity == "auto":
+        if not hasattr(os, "sched_getaffinity"):
+            return None
+        cpus = sorted(os.sched_getaffinity(0))
+        per = max(1, len(cpus) // workers)
+        return [
+            cpus[(i * per) % len(cpus) : (i * per) % len(cpus) + per]
+            for i in range(workers)
+        ]
+    if len(cpu_affinity) != workers:
+        msg = "cpu_affinity needs one CPU set per worker"
+        raise ValueError(msg)
+    return [list(cpus) for cpus in cpu_affinity]
@@ -0,0 +1,104 @@
+#include <algorithm>
+#include <iterator>
+
+#include "profiling.hpp"
+
+thread_local call_profile *current_profile = nullptr;
+
+void call_profile::add_stage(const char *stage, double seconds)
+{
+    // batched calls run some stages once per chunk
+    for (auto &s : stages)
+        if (s.first == stage)
+        {
+            s.second += seconds;
+            return;
+        }
+    stages.emplace_back(stage, seconds);
+}
+
+void timing_summary::add(double seconds)
+{
+    if (!count || seconds < min)
+        min = seconds;
+    if (!count || seconds > max)
+        max = seconds;
+    ++count;
+    sum += seconds;
+    if (!buckets.empty())
+        ++buckets[std::lower_bound(LATENCY_BUCKETS.begin(), LATENCY_BUCKETS.end(), seconds) - LATENCY_BUCKETS.begin()];
+}
+
+static timing_summary histogram()
+{
+    timing_summary s;
+    s.buckets.assign(LATENCY_BUCKETS.size() + 1, 0);
+    return s;
+}
+
+void Profiler::record(std::unique_ptr<call_profile> call)
+{
+    std::lock_guard<std::mutex> guard(lock);
+    ++totals.calls[call->method];
+    if (!totals.total.count)
+        totals.total = histogram();
+    totals.total.add(call->total);
+    for (const auto &s : call->stages)
+    {
+        auto it = totals.stages.find(s.first);
+        if (it == totals.stages.end())
+            it = totals.stages.emplace(s.first, histogram()).first;
+        it->second.add(s.second);
+    }
+    // a model has one set of layers, so they are aggregated by index
+    for (size_t i = 0; i < call->layer_times.size(); ++i)
+    {
+        if (i == totals.layers.size())
+            totals.layers.emplace_back(call->layer_times[i].type, timing_summary());
+        totals.layers[i].second.add(call->layer_times[i].seconds);
+    }
+    last_call = std::move(call);
+}
+
+std::shared_ptr<const call_profile> Profiler::last() const
+{
+    std::lock_guard<std::mutex> guard(lock);
+    return last_call;
+}
+
+Profiler::stats_t Profiler::stats() const
+{
+    std::lock_guard<std::mutex> guard(lock);
+    return totals;
+}
+
+void Profiler::reset()
+{
+    std::lock_guard<std::mutex> guard(lock);
+    last_call.reset();
+    totals = stats_t();
+}
+
+profile_scope::profile_scope(Profiler &profiler, const char *method) : profiler(profiler)
+{
+    if (!profiler.enabled.load(std::memory_order_relaxed) || current_profile)
+        return;
+    call.reset(new call_profile(method, profiler.layers.load(std::memory_order_relaxed)));
+    current_profile = call.get();
+    start = profile_clock::now();
+}
+
+profile_scope::~profile_scope()
+{
+    if (call)
+        current_profile = nullptr;
+}
+
+void profile_scope::commit()
+{
+    if (!call)
+        return;
+    call->total = seconds_since(start) - call->overhead;
+    current_profile = nullptr;
+    profiler.record(std::move(call));
+}
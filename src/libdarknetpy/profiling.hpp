@@ -0,0 +1,146 @@
+#pragma once
+#include <atomic>
+#include <chrono>
+#include <cstdint>
+#include <map>
+#include <memory>
+#include <mutex>
+#include <string>
+#include <utility>
+#include <vector>
+
+#include "metrics.hpp"
+
+// Opt-in timing of detection calls. A Detector with profiling enabled records how long
+// each stage of a call took (decode, preprocess, network, pack) and, optionally, each
+// layer of the forward pass, and aggregates them into histograms. While profiling is
+// off this costs a call one relaxed atomic load, on top of the always-on metrics.
+
+typedef std::chrono::steady_clock profile_clock;
+
+inline double seconds_since(profile_clock::time_point start)
+{
+    return std::chrono::duration<double>(profile_clock::now() - start).count();
+}
+
+struct layer_time
+{
+    int type; // darknet's LAYER_TYPE
+    double seconds;
+};
+
+// The timings of one detection call.
+struct call_profile
+{
+    const char *method;
+    bool layers;
+    double total = 0;
+    // time spent on the layer-by-layer pass, which is not part of `total`
+    double overhead = 0;
+    std::vector<std::pair<const char *, double>> stages;
+    std::vector<layer_time> layer_times;
+    // number of stage_timers currently running
+    int depth = 0;
+
+    call_profile(const char *method, bool layers) : method(method), layers(layers) {}
+    void add_stage(const char *stage, double seconds);
+};
+
+// The call being profiled on this thread, or null.
+extern thread_local call_profile *current_profile;
+
+struct timing_summary
+{
+    uint64_t count = 0;
+    double sum = 0, min = 0, max = 0;
+    // per LATENCY_BUCKETS bucket, not cumulative; empty for layer summaries
+    std::vector<uint64_t> buckets;
+
+    void add(double seconds);
+};
+
+// The profiling switches and aggregated timings of one Detector. Calls are recorded
+// by the thread running them; snapshots may be taken from any thread.
+class Profiler
+{
+public:
+    std::atomic<bool> enabled{false};
+    std::atomic<bool> layers{false};
+
+    struct stats_t
+    {
+        std::map<std::string, uint64_t> calls;
+        timing_summary total;
+        std::map<std::string, timing_summary> stages;
+        std::vector<std::pair<int, timing_summary>> layers;
+    };
+
+    void record(std::unique_ptr<call_profile> call);
+    std::shared_ptr<const call_profile> last() const;
+    stats_t stats() const;
+    void reset();
+
+private:
+    mutable std::mutex lock;
+    std::shared_ptr<const call_profile> last_call;
+    stats_t totals;
+};
+
+// Profiles the detection call running on this thread while in scope, if the profiler
+// is enabled. commit() records the call; one that throws is dropped.
+class profile_scope
+{
+public:
+    profile_scope(Profiler &profiler, const char *method);
+    ~profile_scope();
+    profile_scope(const profile_scope &) = delete;
+    profile_scope &operator=(const profile_scope &) = delete;
+
+    void commit();
+    // time the call spent on layer profiling so far
+    double overhead() const { return call ? call->overhead : 0; }
+
+private:
+    Profiler &profiler;
+    std::unique_ptr<call_profile> call;
+    profile_clock::time_point start;
+};
+
+// Times `stage` until it goes out of scope: the time is observed in the stage's
+// latency histogram (unless `observe` is false) and added to the call profiled on
+// this thread, if any. In a profile, a stage started inside another one counts as part
+// of the outer one.
+class stage_timer
+{
+public:
+    explicit stage_timer(stage_t stage, bool observe = true)
+        : call(current_profile), stage(stage), observe(observe), start(profile_clock::now())
+    {
+        if (call)
+            ++call->depth;
+    }
+    ~stage_timer()
+    {
+        double seconds = seconds_since(start);
+        if (observe)
+            metrics.stage_seconds[stage].observe(seconds);
+        if (call && --call->depth == 0)
+            call->add_stage(STAGE_NAMES[stage], seconds);
+    }
+    stage_timer(const stage_timer &) = delete;
+    stage_timer &operator=(const stage_timer &) = delete;
+
+private:
+    call_profile *call;
+    stage_t stage;
+    bool observe;
+    profile_clock::time_point start;
+};
+
+// Runs the forward pass of `net` (a darknet network*) on `input` layer by layer,
+// adding each layer's time to `times`. Does nothing unless the network was built for
+// exactly `batch` images. Implemented against darknet's C API, see layer_timing.cpp.
+void time_layers(void *net, float *input, int batch, std::vector<layer_time> &times);
+
+// The .cfg section name of a darknet LAYER_TYPE, e.g. "convolutional".
+const char *layer_type_name(int type);
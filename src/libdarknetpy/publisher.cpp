@@ -0,0 +1,310 @@
+#include <cerrno>
+#include <chrono>
+#include <iterator>
+#include <stdexcept>
+#include <utility>
+
+#ifdef _WIN32
+#include <winsock2.h>
+#include <ws2tcpip.h>
+#else
+#include <fcntl.h>
+#include <netdb.h>
+#include <netinet/in.h>
+#include <netinet/tcp.h>
+#include <sys/socket.h>
+#include <unistd.h>
+#endif
+
+#include "publisher.hpp"
+#include "serialize.hpp"
+
+namespace
+{
+#ifdef _WIN32
+const socket_t no_socket = INVALID_SOCKET;
+const int send_flags = 0;
+
+void close_socket(socket_t s) { closesocket(s); }
+
+void set_nonblocking(socket_t s)
+{
+    u_long on = 1;
+    ioctlsocket(s, FIONBIO, &on);
+}
+
+bool retry_later() { return WSAGetLastError() == WSAEWOULDBLOCK; }
+#else
+const socket_t no_socket = -1;
+// a subscriber hanging up must not raise SIGPIPE in the process
+#ifdef MSG_NOSIGNAL
+const int send_flags = MSG_NOSIGNAL;
+#else
+const int send_flags = 0;
+#endif
+
+void close_socket(socket_t s) { ::close(s); }
+
+void set_nonblocking(socket_t s) { fcntl(s, F_SETFL, fcntl(s, F_GETFL) | O_NONBLOCK); }
+
+bool retry_later() { return errno == EAGAIN || errno == EWOULDBLOCK || errno == EINTR; }
+#endif
+
+// How long the publisher thread sleeps between looking for new subscribers, and between
+// attempts to write to subscribers that couldn't take everything.
+const std::chrono::milliseconds idle_wait(20), backlog_wait(2);
+} // namespace
+
+ResultPublisher::ResultPublisher(const std::string &host, int port, size_t capacity, box_format format)
+    : capacity(capacity ? capacity : 1), format(format), listener(no_socket)
+{
+    if (!is_serialized(format))
+        throw std::invalid_argument("format must be 'json', 'msgpack' or 'binary'");
+    if (port < 0 || port > 65535)
+        throw std::invalid_argument("port must be in [0, 65535], got " + std::to_string(port));
+#ifdef _WIN32
+    WSADATA wsa;
+    if (WSAStartup(MAKEWORD(2, 2), &wsa))
+        throw std::runtime_error("Can't initialize Winsock");
+#endif
+    addrinfo hints = {};
+    hints.ai_family = AF_UNSPEC;
+    hints.ai_socktype = SOCK_STREAM;
+    hints.ai_flags = AI_PASSIVE | AI_NUMERICSERV;
+    const std::string service = std::to_string(port);
+    addrinfo *addrs = nullptr;
+    int err = getaddrinfo(host.empty() ? nullptr : host.c_str(), service.c_str(), &hints, &addrs);
+    for (addrinfo *ai = err ? nullptr : addrs; ai && listener == no_socket; ai = ai->ai_next)
+    {
+        socket_t s = socket(ai->ai_family, ai->ai_socktype, ai->ai_protocol);
+        if (s == no_socket)
+            continue;
+#ifndef _WIN32
+        // restarting a publisher must not wait for the connections of the previous one
+        int on = 1;
+        setsockopt(s, SOL_SOCKET, SO_REUSEADDR, &on, sizeof(on));
+#endif
+        if (bind(s, ai->ai_addr, (int)ai->ai_addrlen) == 0 && listen(s, SOMAXCONN) == 0)
+            listener = s;
+        else
+            close_socket(s);
+    }
+    if (addrs)
+        freeaddrinfo(addrs);
+    if (listener == no_socket)
+    {
+#ifdef _WIN32
+        WSACleanup();
+#endif
+        if (err)
+            throw std::runtime_error("Can't resolve '" + host + "': " + gai_strerror(err));
+        throw std::runtime_error("Can't listen on " + host + ":" + service);
+    }
+    set_nonblocking(listener);
+
+    sockaddr_storage addr = {};
+    socklen_t len = sizeof(addr);
+    getsockname(listener, (sockaddr *)&addr, &len);
+    if (addr.ss_family == AF_INET6)
+        bound_port = ntohs(((sockaddr_in6 *)&addr)->sin6_port);
+    else
+        bound_port = ntohs(((sockaddr_in *)&addr)->sin_port);
+    worker = std::thread(&ResultPublisher::run, this);
+}
+
+void ResultPublisher::publish(std::vector<bbox_t> &&boxes, int64_t frame)
+{
+    push({std::move(boxes), std::string(), frame, false});
+}
+
+void ResultPublisher::publish_raw(std::string &&message)
+{
+    push({std::vector<bbox_t>(), std::move(message), 0, true});
+}
+
+void ResultPublisher::push(pending_message &&msg)
+{
+    {
+        std::lock_guard<std::mutex> lock(mutex);
+        if (stopping)
+            throw std::runtime_error("ResultPublisher is closed");
+        if (msg.frame < 0)
+            msg.frame = (int64_t)n_published;
+        ++n_published;
+        // nobody would receive it, so don't even serialize it
+        if (!n_subscribers)
+            return;
+        if (queue.size() == capacity)
+        {
+            queue.pop_front();
+            ++n_dropped;
+        }
+        queue.push_back(std::move(msg));
+    }
+    cond.notify_one();
+}
+
+void ResultPublisher::run()
+{
+    std::vector<pending_message> batch;
+    for (;;)
+    {
+        bool backlog = false;
+        for (const subscriber &sub : subs)
+            backlog = backlog || !sub.queue.empty();
+        {
+            std::unique_lock<std::mutex> lock(mutex);
+            cond.wait_for(lock, backlog ? backlog_wait : idle_wait, [this]()
+                          { return !queue.empty() || stopping; });
+            if (stopping)
+                return;
+            batch.assign(std::make_move_iterator(queue.begin()), std::make_move_iterator(queue.end()));
+            queue.clear();
+        }
+
+        accept_subscribers();
+        uint64_t dropped = 0, sent = 0;
+        for (pending_message &msg : batch)
+        {
+            std::string text;
+            if (msg.is_raw)
+                text = std::move(msg.raw);
+            else
+                append_message(text, format, msg.boxes.data(), msg.boxes.size(), msg.frame);
+            auto shared = std::make_shared<const std::string>(std::move(text));
+            for (subscriber &sub : subs)
+            {
+                // the front message may be partly written already, it has to be finished
+                const size_t started = sub.offset ? 1 : 0;
+                if (sub.queue.size() - started == capacity)
+                {
+                    sub.queue.erase(sub.queue.begin() + started);
+                    ++dropped;
+                }
+                sub.queue.push_back(shared);
+            }
+        }
+        batch.clear();
+
+        for (size_t i = 0; i < subs.size();)
+        {
+            if (service(subs[i], sent))
+            {
+                ++i;
+                continue;
+            }
+            close_socket(subs[i].sock);
+            subs.erase(subs.begin() + i);
+        }
+
+        std::lock_guard<std::mutex> lock(mutex);
+        n_subscribers = subs.size();
+        n_dropped += dropped;
+        n_sent += sent;
+    }
+}
+
+void ResultPublisher::accept_subscribers()
+{
+    for (;;)
+    {
+        socket_t s = accept(listener, nullptr, nullptr);
+        if (s == no_socket)
+            return;
+        set_nonblocking(s);
+        int on = 1;
+        // messages are small and latency matters more than packet count
+        setsockopt(s, IPPROTO_TCP, TCP_NODELAY, (const char *)&on, sizeof(on));
+#ifdef SO_NOSIGPIPE
+        setsockopt(s, SOL_SOCKET, SO_NOSIGPIPE, &on, sizeof(on));
+#endif
+        subscriber sub;
+        sub.sock = s;
+        subs.push_back(std::move(sub));
+    }
+}
+
+bool ResultPublisher::service(subscriber &sub, uint64_t &sent)
+{
+    char discard[512];
+    for (;;)
+    {
+        auto n = recv(sub.sock, discard, sizeof(discard), 0);
+        if (n == 0)
+            return false;
+        if (n < 0)
+        {
+            if (!retry_later())
+                return false;
+            break;
+        }
+    }
+    while (!sub.queue.empty())
+    {
+        const std::string &msg = *sub.queue.front();
+        auto n = send(sub.sock, msg.data() + sub.offset, (int)(msg.size() - sub.offset), send_flags);
+        if (n < 0)
+            return retry_later();
+        sub.offset += n;
+        if (sub.offset < msg.size())
+            return true;
+        sub.queue.pop_front();
+        sub.offset = 0;
+        ++sent;
+    }
+    return true;
+}
+
+void ResultPublisher::close()
+{
+    {
+        std::lock_guard<std::mutex> lock(mutex);
+        stopping = true;
+        queue.clear();
+        n_subscribers = 0;
+    }
+    cond.notify_all();
+    if (worker.joinable())
+        worker.join();
+    for (subscriber &sub : subs)
+        close_socket(sub.sock);
+    subs.clear();
+    if (listener != no_socket)
+    {
+        close_socket(listener);
+        listener = no_socket;
+#ifdef _WIN32
+        WSACleanup();
+#endif
+    }
+}
+
+bool ResultPublisher::closed() const
+{
+    std::lock_guard<std::mutex> lock(mutex);
+    return stopping;
+}
+
+size_t ResultPublisher::subscribers() const
+{
+    std::lock_guard<std::mutex> lock(mutex);
+    return n_subscribers;
+}
+
+uint64_t ResultPublisher::published() const
+{
+    std::lock_guard<std::mutex> lock(mutex);
+    return n_published;
+}
+
+uint64_t ResultPublisher::sent() const
+{
+    std::lock_guard<std::mutex> lock(mutex);
+    return n_sent;
+}
+
+uint64_t ResultPublisher::dropped() const
+{
+    std::lock_guard<std::mutex> lock(mutex);
+    return n_dropped;
+}
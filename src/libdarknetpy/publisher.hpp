@@ -0,0 +1,93 @@
+#pragma once
+#include <condition_variable>
+#include <cstdint>
+#include <deque>
+#include <memory>
+#include <mutex>
+#include <string>
+#include <thread>
+#include <vector>
+
+#include "common.hpp"
+#include "results.hpp"
+
+// a SOCKET on Windows, a file descriptor elsewhere
+#ifdef _WIN32
+typedef uintptr_t socket_t;
+#else
+typedef int socket_t;
+#endif
+
+// Streams detection results to any number of TCP subscribers from a background thread,
+// serialized in `format` (see serialize.hpp).
+//
+// The server socket stays open for the publisher's lifetime; clients connect whenever
+// they like and receive every message published from then on. publish() only queues
+// the boxes: serialization and all socket I/O happen on the publisher thread, so a
+// slow or stalled subscriber never blocks the caller.
+//
+// Every queue is bounded by `capacity` messages and drops its oldest message when
+// full, both the queue of results waiting to be serialized and the queue of messages
+// waiting to be written to each subscriber. A subscriber that falls behind thus
+// misses intermediate results but always gets the latest ones.
+class ResultPublisher
+{
+public:
+    const size_t capacity;
+    const box_format format;
+
+    ResultPublisher(const std::string &host, int port, size_t capacity, box_format format);
+    ~ResultPublisher() { close(); }
+    ResultPublisher(const ResultPublisher &) = delete;
+    ResultPublisher &operator=(const ResultPublisher &) = delete;
+
+    // Queues the boxes of a frame; `frame` < 0 numbers the message with the count of
+    // messages published before it.
+    void publish(std::vector<bbox_t> &&boxes, int64_t frame);
+    // Queues a message that is sent as is.
+    void publish_raw(std::string &&message);
+    // Disconnects the subscribers and closes the server socket; queued messages are
+    // dropped.
+    void close();
+
+    int port() const { return bound_port; }
+    bool closed() const;
+    size_t subscribers() const;
+    uint64_t published() const;
+    uint64_t sent() const;
+    uint64_t dropped() const;
+
+private:
+    struct pending_message
+    {
+        std::vector<bbox_t> boxes;
+        std::string raw;
+        int64_t frame;
+        bool is_raw;
+    };
+    struct subscriber
+    {
+        socket_t sock;
+        std::deque<std::shared_ptr<const std::string>> queue;
+        // bytes of the front message already written
+        size_t offset = 0;
+    };
+
+    void push(pending_message &&msg);
+    void run();
+    void accept_subscribers();
+    // Writes what the socket takes without blocking and discards what the subscriber
+    // sends; returns false once it is gone.
+    bool service(subscriber &sub, uint64_t &sent);
+
+    socket_t listener;
+    int bound_port = 0;
+    std::thread worker;
+    mutable std::mutex mutex;
+    std::condition_variable cond;
+    std::deque<pending_message> queue;
+    std::vector<subscriber> subs;
+    bool stopping = false;
+    size_t n_subscribers = 0;
+    uint64_t n_published = 0, n_sent = 0, n_dropped = 0;
+};
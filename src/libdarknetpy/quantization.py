@@ -0,0 +1,200 @@
+"""
+Calibration of reduced-precision detectors.
+
+``Detector.quantize`` stores the convolution weights in INT8 or FP16, which
+changes the results a little. ``calibrate`` measures how much on a sample of
+your own images: it runs the float model and a quantized copy side by side and
+reports how well their boxes agree, taking the float model's boxes as the
+ground truth. ``compare`` does the same for any two detectors, e.g. a
+quantized compiled model against the original.
+
+Requires NumPy.
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from typing import TYPE_CHECKING, Any, Iterable
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from ._libdarknetpy import Detector
+
+__all__ = ["calibrate", "compare"]
+
+
+def _load(image: Any) -> Any:
+    if isinstance(image, (str, os.PathLike)):
+        with open(image, "rb") as f:
+            return f.read()
+    return image
+
+
+def _corners(boxes: np.ndarray) -> np.ndarray:
+    xy = np.stack([boxes["x"], boxes["y"]], axis=1).astype(np.float32)
+    wh = np.stack([boxes["w"], boxes["h"]], axis=1).astype(np.float32)
+    return np.concatenate([xy, xy + wh], axis=1)
+
+
+def _iou(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """IoU matrix of (n, 4) and (m, 4) corner boxes."""
+    lo = np.maximum(a[:, None, :2], b[None, :, :2])
+    hi = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(hi - lo, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+
+def _match(ref: np.ndarray, cand: np.ndarray, iou: float) -> np.ndarray:
+    """
+    Match ``cand`` boxes, best score first, to unmatched ``ref`` boxes of the
+    same class overlapping by at least ``iou``, like a detection benchmark.
+    Returns the index of the matched ``ref`` box per ``cand`` box, or -1.
+    """
+    matched = np.full(len(cand), -1, np.int64)
+    if not len(ref) or not len(cand):
+        return matched
+    overlap = _iou(_corners(cand), _corners(ref))
+    overlap[cand["obj_id"][:, None] != ref["obj_id"][None, :]] = 0
+    taken = np.zeros(len(ref), bool)
+    for i in np.argsort(-cand["prob"], kind="stable"):
+        row = np.where(taken, 0, overlap[i])
+        j = int(np.argmax(row))
+        if row[j] >= iou:
+            matched[i] = j
+            taken[j] = True
+    return matched
+
+
+def _average_precision(scores: np.ndarray, hits: np.ndarray, n_ref: int) -> float:
+    """All-point interpolated AP, as in the VOC and COCO benchmarks."""
+    if n_ref == 0:
+        return float("nan")
+    order = np.argsort(-scores, kind="stable")
+    tp = np.cumsum(hits[order])
+    recall = tp / n_ref
+    precision = tp / np.arange(1, len(tp) + 1)
+    # precision envelope, integrated over the recall steps
+    envelope = np.maximum.accumulate(precision[::-1])[::-1]
+    steps = np.diff(np.concatenate([[0.0], recall]))
+    return float(np.sum(steps * envelope))
+
+
+def compare(
+    reference: Detector,
+    candidate: Detector,
+    images: Iterable[Any],
+    thresh: float = 0.25,
+    iou: float = 0.5,
+) -> dict:
+    """
+    Run ``reference`` and ``candidate`` on ``images`` and compare their boxes.
+
+    ``images`` holds file paths or any input ``Detector.detect_array``
+    accepts. A candidate box agrees with a reference box of the same class
+    overlapping it by at least ``iou``. Returns:
+
+    * ``images``, ``reference_boxes``, ``candidate_boxes`` and ``matched``;
+    * ``precision`` and ``recall`` of the candidate against the reference,
+      and ``f1``, their harmonic mean;
+    * ``map``: the mean over classes of the candidate's average precision
+      with the reference boxes as ground truth (1.0 for identical results);
+    * ``mean_iou`` and ``mean_score_drift``: the mean IoU and absolute score
+      difference of matched boxes;
+    * ``reference_ms`` and ``candidate_ms``: the mean detection time per
+      image.
+    """
+    n_images = n_ref = n_cand = 0
+    ious, drifts = [], []
+    ref_classes, cand_classes, cand_scores, cand_hits = [], [], [], []
+    elapsed = [0.0, 0.0]
+    for image in images:
+        data = _load(image)
+        results = []
+        for k, det in enumerate((reference, candidate)):
+            start = time.perf_counter()
+            results.append(det.detect_array(data, thresh, output="array"))
+            elapsed[k] += time.perf_counter() - start
+        ref, cand = results
+        matched = _match(ref, cand, iou)
+        hit = matched >= 0
+        if hit.any():
+            pairs = _iou(_corners(cand[hit]), _corners(ref[matched[hit]]))
+            ious.append(np.diagonal(pairs))
+            drifts.append(np.abs(cand["prob"][hit] - ref["prob"][matched[hit]]))
+        ref_classes.append(ref["obj_id"])
+        cand_classes.append(cand["obj_id"])
+        cand_scores.append(cand["prob"])
+        cand_hits.append(hit)
+        n_images += 1
+        n_ref += len(ref)
+        n_cand += len(cand)
+
+    if not n_images:
+        msg = "compare needs at least one image"
+        raise ValueError(msg)
+    ref_classes = np.concatenate(ref_classes)
+    cand_classes = np.concatenate(cand_classes)
+    cand_scores = np.concatenate(cand_scores)
+    cand_hits = np.concatenate(cand_hits)
+    n_matched = int(cand_hits.sum())
+    aps = [
+        _average_precision(
+            cand_scores[cand_classes == cls],
+            cand_hits[cand_classes == cls],
+            int((ref_classes == cls).sum()),
+        )
+        for cls in np.union1d(ref_classes, cand_classes)
+    ]
+    aps = [ap for ap in aps if not np.isnan(ap)]
+    precision = n_matched / n_cand if n_cand else 1.0
+    recall = n_matched / n_ref if n_ref else 1.0
+    return {
+        "images": n_images,
+        "reference_boxes": n_ref,
+        "candidate_boxes": n_cand,
+        "matched": n_matched,
+        "precision": precision,
+        "recall": recall,
+        "f1": 2 * precision * recall / (precision + recall)
+        if precision + recall
+        else 0.0,
+        "map": float(np.mean(aps)) if aps else 1.0,
+        "mean_iou": float(np.concatenate(ious).mean()) if ious else float("nan"),
+        "mean_score_drift": float(np.concatenate(drifts).mean())
+        if drifts
+        else float("nan"),
+        "reference_ms": elapsed[0] / n_images * 1e3,
+        "candidate_ms": elapsed[1] / n_images * 1e3,
+    }
+
+
+def calibrate(
+    cfg: str,
+    weights: str,
+    images: Iterable[Any],
+    mode: str = "int8",
+    thresh: float = 0.25,
+    iou: float = 0.5,
+) -> dict:
+    """
+    Measure the drift of ``Detector.quantize(mode)`` on sample ``images``.
+
+    Loads the model twice on the CPU, quantizes one copy and returns the
+    ``compare`` report of the quantized copy against the float one, plus the
+    ``quantize`` report under ``"weights"``.
+    """
+    from ._libdarknetpy import Detector
+
+    reference = Detector(cfg, weights, 0)
+    candidate = Detector(cfg, weights, 0)
+    report = candidate.quantize(mode)
+    return {
+        "mode": mode,
+        "weights": report,
+        **compare(reference, candidate, images, thresh, iou),
+    }
@@ -0,0 +1,268 @@
+#include <algorithm>
+#include <cmath>
+#include <cstdint>
+#include <cstdlib>
+#include <cstring>
+#include <new>
+#include <vector>
+
+// darknet.h and yolo_v2_class.hpp don't mix, so this file only uses the C API
+#include "darknet.h"
+#include "quantize.hpp"
+
+// Layout of a quantized layer's weights allocation: the header, `n` per-channel
+// scales (INT8 only), then the values.
+struct quant_header
+{
+    uint32_t magic;
+    int32_t mode;
+};
+
+static const uint32_t QUANT_MAGIC = 0x51444e50; // "PNDQ"
+
+static uint16_t float_to_half(float f)
+{
+    uint32_t x;
+    std::memcpy(&x, &f, 4);
+    const uint32_t sign = (x >> 16) & 0x8000;
+    const int32_t exp = (int32_t)((x >> 23) & 0xff) - 127 + 15;
+    uint32_t mant = x & 0x7fffff;
+    if (exp >= 31)
+        return (uint16_t)(sign | 0x7c00); // overflow to infinity (weights never are)
+    if (exp <= 0)
+    {
+        if (exp < -10)
+            return (uint16_t)sign;
+        // subnormal, round to nearest
+        mant |= 0x800000;
+        const int shift = 14 - exp;
+        return (uint16_t)(sign | ((mant + (1u << (shift - 1))) >> shift));
+    }
+    // round to nearest; a carry into the exponent is still correct
+    return (uint16_t)((sign | ((uint32_t)exp << 10) | (mant >> 13)) + ((mant >> 12) & 1));
+}
+
+static float half_to_float(uint16_t h)
+{
+    const uint32_t sign = (uint32_t)(h & 0x8000) << 16;
+    uint32_t exp = (h >> 10) & 0x1f, mant = h & 0x3ff, x;
+    if (exp == 0)
+    {
+        if (mant == 0)
+            x = sign;
+        else
+        {
+            // subnormal: normalize
+            exp = 127 - 15 + 1;
+            while (!(mant & 0x400))
+            {
+                mant <<= 1;
+                --exp;
+            }
+            x = sign | (exp << 23) | ((mant & 0x3ff) << 13);
+        }
+    }
+    else if (exp == 31)
+        x = sign | 0x7f800000 | (mant << 13);
+    else
+        x = sign | ((exp - 15 + 127) << 23) | (mant << 13);
+    float f;
+    std::memcpy(&f, &x, 4);
+    return f;
+}
+
+static bool supported_activation(ACTIVATION a)
+{
+    return a == LINEAR || a == LEAKY || a == RELU || a == LOGISTIC || a == MISH || a == SWISH;
+}
+
+// The activations of darknet's activations.h.
+static inline float activate(float x, ACTIVATION a)
+{
+    switch (a)
+    {
+    case LEAKY:
+        return x > 0 ? x : .1f * x;
+    case RELU:
+        return x * (x > 0);
+    case LOGISTIC:
+        return 1.f / (1.f + std::exp(-x));
+    case SWISH:
+        return x / (1.f + std::exp(-x));
+    case MISH:
+    {
+        const float sp = x > 20 ? x : (x < -20 ? std::exp(x) : std::log1p(std::exp(x)));
+        return x * std::tanh(sp);
+    }
+    default:
+        return x;
+    }
+}
+
+static bool quantizable(const layer &l)
+{
+    return l.type == CONVOLUTIONAL && l.weights && l.n > 0 && l.nweights > 0 && !l.share_layer && !l.binary && !l.xnor && !l.antialiasing &&
+           !l.assisted_excitation && !l.batch_normalize && l.groups >= 1 && l.c % l.groups == 0 &&
+           l.n % l.groups == 0 && supported_activation(l.activation);
+}
+
+// darknet's im2col_cpu_ext: one row per (channel, ky, kx), one column per output pixel.
+static void im2col(const float *im, const layer &l, int channels, float *col)
+{
+    const int out_size = l.out_h * l.out_w, pad = l.pad * l.dilation;
+    for (int ch = 0; ch < channels; ++ch)
+        for (int ky = 0; ky < l.size; ++ky)
+            for (int kx = 0; kx < l.size; ++kx)
+            {
+                float *row = col + (size_t)((ch * l.size + ky) * l.size + kx) * out_size;
+                const float *plane = im + (size_t)ch * l.h * l.w;
+                for (int oy = 0; oy < l.out_h; ++oy)
+                {
+                    const int y = oy * l.stride_y - pad + ky * l.dilation;
+                    float *dst = row + oy * l.out_w;
+                    if (y < 0 || y >= l.h)
+                    {
+                        std::fill(dst, dst + l.out_w, 0.f);
+                        continue;
+                    }
+                    for (int ox = 0; ox < l.out_w; ++ox)
+                    {
+                        const int x = ox * l.stride_x - pad + kx * l.dilation;
+                        dst[ox] = x >= 0 && x < l.w ? plane[y * l.w + x] : 0.f;
+                    }
+                }
+            }
+}
+
+static void forward_quantized_convolutional(layer l, network_state state)
+{
+    const quant_header *header = (const quant_header *)l.weights;
+    const int8_t *q8 = nullptr;
+    const uint16_t *q16 = nullptr;
+    const float *scales = nullptr;
+    if (header->mode == (int)quant_mode::int8)
+    {
+        scales = (const float *)(header + 1);
+        q8 = (const int8_t *)(scales + l.n);
+    }
+    else
+        q16 = (const uint16_t *)(header + 1);
+
+    const int groups = l.groups, channels = l.c / groups, filters = l.n / groups;
+    const int k = channels * l.size * l.size, out_size = l.out_h * l.out_w;
+    const bool direct = l.size == 1 && l.stride_x == 1 && l.stride_y == 1 && l.pad == 0;
+    for (int b = 0; b < l.batch; ++b)
+        for (int g = 0; g < groups; ++g)
+        {
+            const float *im = state.input + (size_t)(b * groups + g) * channels * l.h * l.w;
+            const float *col = im;
+            if (!direct)
+            {
+                im2col(im, l, channels, state.workspace);
+                col = state.workspace;
+            }
+            float *out = l.output + (size_t)(b * groups + g) * filters * out_size;
+#pragma omp parallel
+            {
+                std::vector<float> w(k);
+#pragma omp for schedule(static)
+                for (int f = 0; f < filters; ++f)
+                {
+                    const int filter = g * filters + f;
+                    const size_t at = (size_t)filter * k;
+                    if (q8)
+                    {
+                        const float s = scales[filter];
+                        for (int i = 0; i < k; ++i)
+                            w[i] = s * q8[at + i];
+                    }
+                    else
+                        for (int i = 0; i < k; ++i)
+                            w[i] = half_to_float(q16[at + i]);
+                    float *__restrict dst = out + (size_t)f * out_size;
+                    std::fill(dst, dst + out_size, 0.f);
+                    for (int i = 0; i < k; ++i)
+                    {
+                        const float wi = w[i];
+                        if (wi == 0.f)
+                            continue;
+                        const float *__restrict src = col + (size_t)i * out_size;
+#pragma omp simd
+                        for (int p = 0; p < out_size; ++p)
+                            dst[p] += wi * src[p];
+                    }
+                    const float bias = l.biases[filter];
+                    for (int p = 0; p < out_size; ++p)
+                        dst[p] = activate(dst[p] + bias, l.activation);
+                }
+            }
+        }
+}
+
+quantize_report quantize_network(void *net_ptr, quant_mode mode)
+{
+    network &net = *static_cast<network *>(net_ptr);
+    quantize_report report;
+    if (mode != quant_mode::float32)
+        fuse_conv_batchnorm(net);
+    for (int i = 0; i < net.n; ++i)
+    {
+        layer &l = net.layers[i];
+        if (l.type != CONVOLUTIONAL || l.share_layer)
+            continue;
+        if (l.forward == forward_quantized_convolutional)
+        {
+            const quant_header *header = (const quant_header *)l.weights;
+            const size_t values = (size_t)l.nweights * (header->mode == (int)quant_mode::int8 ? 1 : 2);
+            report.bytes_before += (size_t)l.nweights * sizeof(float);
+            report.bytes_after += sizeof(quant_header) + values + (header->mode == (int)quant_mode::int8 ? l.n * sizeof(float) : 0);
+            ++report.quantized;
+            continue;
+        }
+        const size_t before = (size_t)l.nweights * sizeof(float);
+        report.bytes_before += before;
+        if (mode == quant_mode::float32 || !quantizable(l))
+        {
+            report.bytes_after += before;
+            ++report.skipped;
+            continue;
+        }
+
+        const int k = l.nweights / l.n;
+        const size_t size = sizeof(quant_header) +
+                            (mode == quant_mode::int8 ? l.n * sizeof(float) + (size_t)l.nweights : (size_t)l.nweights * 2);
+        quant_header *header = (quant_header *)malloc(size);
+        if (!header)
+            throw std::bad_alloc();
+        header->magic = QUANT_MAGIC;
+        header->mode = (int)mode;
+        if (mode == quant_mode::int8)
+        {
+            float *scales = (float *)(header + 1);
+            int8_t *q = (int8_t *)(scales + l.n);
+            for (int f = 0; f < l.n; ++f)
+            {
+                const float *w = l.weights + (size_t)f * k;
+                float max = 0.f;
+                for (int j = 0; j < k; ++j)
+                    max = std::max(max, std::fabs(w[j]));
+                const float scale = max > 0.f ? max / 127.f : 1.f;
+                scales[f] = scale;
+                for (int j = 0; j < k; ++j)
+                    q[(size_t)f * k + j] = (int8_t)std::lround(w[j] / scale);
+            }
+        }
+        else
+        {
+            uint16_t *q = (uint16_t *)(header + 1);
+            for (size_t j = 0; j < (size_t)l.nweights; ++j)
+                q[j] = float_to_half(l.weights[j]);
+        }
+        free(l.weights);
+        l.weights = (float *)header;
+        l.forward = forward_quantized_convolutional;
+        report.bytes_after += size;
+        ++report.quantized;
+    }
+    return report;
+}
@@ -0,0 +1,34 @@
+#pragma once
+#include <cstddef>
+
+// Reduced-precision storage of convolution weights for CPU inference.
+//
+// Quantizing a network folds its batch norm into the convolutions, then replaces the
+// float weights of every supported convolutional layer with per-output-channel INT8
+// values and scales, or with FP16 values, and installs a forward pass that expands one
+// channel's weights at a time to float and accumulates in float. Weights take 4x (INT8)
+// or 2x (FP16) less memory; the arithmetic stays FP32, so results drift only by the
+// rounding of the weights. The quantized weights live in the layer's own weights
+// allocation, which darknet frees with the network.
+//
+// Layers the replacement forward pass doesn't cover (grouped input other than
+// channel groups, binary/XNOR, anti-aliased, shared or with an unusual activation) keep
+// their float weights. Only valid for networks running on the CPU.
+
+enum class quant_mode
+{
+    float32,
+    int8,
+    fp16
+};
+
+struct quantize_report
+{
+    int quantized = 0, skipped = 0;
+    // weight storage of the convolutional layers before and after
+    size_t bytes_before = 0, bytes_after = 0;
+};
+
+// Quantizes the darknet network `net` in place. Layers quantized by an earlier call
+// are counted as quantized again, whatever their mode.
+quantize_report quantize_network(void *net, quant_mode mode);
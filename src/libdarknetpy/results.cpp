@@ -0,0 +1,209 @@
+#include <pybind11/numpy.h>
+#include <pybind11/stl.h>
+
+#include <cstring>
+
+#include "results.hpp"
+#include "serialize.hpp"
+
+box_format parse_box_format(const std::string &output)
+{
+    if (output == "list")
+        return box_format::list;
+    if (output == "array")
+        return box_format::array;
+    if (output == "dict")
+        return box_format::dict;
+    if (output == "json")
+        return box_format::json;
+    if (output == "msgpack")
+        return box_format::msgpack;
+    if (output == "binary")
+        return box_format::binary;
+    throw std::invalid_argument("output must be 'list', 'array', 'dict', 'json', 'msgpack' or 'binary', got '" + output + "'");
+}
+
+// Registering a dtype imports NumPy, which is only needed once an array format is
+// asked for; callers hold the GIL, which serializes the first registration.
+static void register_result_dtypes()
+{
+    static bool registered = false;
+    if (registered)
+        return;
+    PYBIND11_NUMPY_DTYPE(bbox_t, x, y, w, h, prob, obj_id, track_id, frames_counter, x_3d, y_3d, z_3d);
+    PYBIND11_NUMPY_DTYPE(frame_bbox_t, frame, x, y, w, h, prob, obj_id, track_id, frames_counter, x_3d, y_3d, z_3d);
+    registered = true;
+}
+
+template <typename R, typename T>
+static py::array_t<T> column(const R *records, size_t n, T R::*field)
+{
+    py::array_t<T> out(n);
+    T *dst = out.mutable_data();
+    for (size_t i = 0; i < n; ++i)
+        dst[i] = records[i].*field;
+    return out;
+}
+
+template <typename R>
+static void add_bbox_columns(py::dict &d, const R *records, size_t n)
+{
+    d["x"] = column(records, n, &R::x);
+    d["y"] = column(records, n, &R::y);
+    d["w"] = column(records, n, &R::w);
+    d["h"] = column(records, n, &R::h);
+    d["prob"] = column(records, n, &R::prob);
+    d["obj_id"] = column(records, n, &R::obj_id);
+    d["track_id"] = column(records, n, &R::track_id);
+    d["frames_counter"] = column(records, n, &R::frames_counter);
+    d["x_3d"] = column(records, n, &R::x_3d);
+    d["y_3d"] = column(records, n, &R::y_3d);
+    d["z_3d"] = column(records, n, &R::z_3d);
+}
+
+py::object pack_boxes(std::vector<bbox_t> &&boxes, box_format fmt)
+{
+    if (is_serialized(fmt))
+    {
+        std::string out;
+        append_message(out, fmt, boxes.data(), boxes.size(), -1);
+        return py::bytes(out);
+    }
+    if (fmt != box_format::list)
+        register_result_dtypes();
+    switch (fmt)
+    {
+    case box_format::array:
+    {
+        // bbox_t is the record layout of the dtype, so this is a single copy
+        py::array_t<bbox_t> out(boxes.size());
+        if (!boxes.empty())
+            std::memcpy(out.mutable_data(), boxes.data(), boxes.size() * sizeof(bbox_t));
+        return std::move(out);
+    }
+    case box_format::dict:
+    {
+        py::dict out;
+        add_bbox_columns(out, boxes.data(), boxes.size());
+        return std::move(out);
+    }
+    default:
+        return py::cast(std::move(boxes));
+    }
+}
+
+py::object pack_boxes(std::vector<std::vector<bbox_t>> &&boxes, box_format fmt)
+{
+    if (fmt == box_format::list)
+        return py::cast(std::move(boxes));
+    if (is_serialized(fmt))
+    {
+        std::string out;
+        append_messages(out, fmt, boxes);
+        return py::bytes(out);
+    }
+    register_result_dtypes();
+
+    size_t n = 0;
+    for (const auto &frame : boxes)
+        n += frame.size();
+    py::array_t<frame_bbox_t> records(n);
+    frame_bbox_t *dst = records.mutable_data();
+    for (size_t f = 0; f < boxes.size(); ++f)
+    {
+        for (const auto &b : boxes[f])
+            *dst++ = {(unsigned int)f, b.x, b.y, b.w, b.h, b.prob, b.obj_id, b.track_id, b.frames_counter, b.x_3d, b.y_3d, b.z_3d};
+    }
+    if (fmt == box_format::array)
+        return std::move(records);
+
+    py::dict out;
+    out["frame"] = column(records.data(), n, &frame_bbox_t::frame);
+    add_bbox_columns(out, records.data(), n);
+    return std::move(out);
+}
+
+
+static bool has_field(const py::handle &boxes, const char *name)
+{
+    if (py::isinstance<py::dict>(boxes))
+        return boxes.cast<py::dict>().contains(name);
+    py::object names = py::getattr(py::getattr(boxes, "dtype", py::none()), "names", py::none());
+    return !names.is_none() && names.contains(name);
+}
+
+template <typename T>
+static void read_column(const py::handle &boxes, const char *name, std::vector<bbox_t> &out, T bbox_t::*field)
+{
+    auto values = py::array_t<T, py::array::c_style | py::array::forcecast>::ensure(boxes[name]);
+    if (!values || values.ndim() != 1)
+        throw std::invalid_argument(std::string("Box field '") + name + "' must be one-dimensional");
+    if (out.empty())
+        out.resize(values.shape(0));
+    else if ((size_t)values.shape(0) != out.size())
+        throw std::invalid_argument(std::string("Box field '") + name + "' has a different length");
+    const T *src = values.data();
+    for (size_t i = 0; i < out.size(); ++i)
+        out[i].*field = src[i];
+}
+
+std::vector<bbox_t> unpack_boxes(const py::handle &boxes)
+{
+    std::vector<bbox_t> out;
+    if (py::isinstance<py::list>(boxes) || py::isinstance<py::tuple>(boxes))
+    {
+        out.reserve(py::len(boxes));
+        for (auto b : boxes)
+            out.push_back(b.cast<bbox_t>());
+        return out;
+    }
+    if (!has_field(boxes, "x"))
+        throw py::type_error("Expected a list of bbox_t, a result array or a dict of result columns");
+    read_column(boxes, "x", out, &bbox_t::x);
+    if (out.empty())
+        return out;
+    read_column(boxes, "y", out, &bbox_t::y);
+    read_column(boxes, "w", out, &bbox_t::w);
+    read_column(boxes, "h", out, &bbox_t::h);
+    read_column(boxes, "prob", out, &bbox_t::prob);
+    read_column(boxes, "obj_id", out, &bbox_t::obj_id);
+    if (has_field(boxes, "track_id"))
+        read_column(boxes, "track_id", out, &bbox_t::track_id);
+    if (has_field(boxes, "frames_counter"))
+        read_column(boxes, "frames_counter", out, &bbox_t::frames_counter);
+    return out;
+}
+
+py::object decode_binary(const py::buffer &data, int64_t &frame)
+{
+    // The records view the memory of a memoryview rather than of `data` itself: the
+    // memoryview holds a buffer export, which stops e.g. a bytearray from being
+    // resized under the array.
+    py::object view = py::reinterpret_steal<py::object>(PyMemoryView_FromObject(data.ptr()));
+    if (!view)
+        throw py::error_already_set();
+    const Py_buffer *buf = PyMemoryView_GET_BUFFER(view.ptr());
+    if (!PyBuffer_IsContiguous(buf, 'C'))
+        throw std::invalid_argument("Binary message must be a contiguous buffer");
+    const char *ptr = (const char *)buf->buf;
+    const size_t size = (size_t)buf->len;
+    binary_header header;
+    if (size < sizeof(header))
+        throw std::invalid_argument("Binary message too short for its header");
+    std::memcpy(&header, ptr, sizeof(header));
+    if (std::memcmp(header.magic, BINARY_MAGIC, sizeof(header.magic)))
+        throw std::invalid_argument("Not a binary detection message");
+    if (header.version != BINARY_VERSION)
+        throw std::invalid_argument("Unsupported binary message version " + std::to_string(header.version));
+    if (header.record_size != sizeof(bbox_t) && header.record_size != sizeof(frame_bbox_t))
+        throw std::invalid_argument("Unexpected record size " + std::to_string(header.record_size));
+    if (size != sizeof(header) + (size_t)header.count * header.record_size)
+        throw std::invalid_argument("Binary message size doesn't match its record count");
+    frame = header.frame;
+
+    register_result_dtypes();
+    py::dtype dtype = header.record_size == sizeof(bbox_t) ? py::dtype::of<bbox_t>() : py::dtype::of<frame_bbox_t>();
+    py::array out(dtype, {(ssize_t)header.count}, {(ssize_t)header.record_size}, ptr + sizeof(header), view);
+    out.attr("flags").attr("writeable") = false;
+    return std::move(out);
+}
@@ -0,0 +1,92 @@
+#pragma once
+#include <string>
+#include <utility>
+#include <vector>
+
+#include "common.hpp"
+#include "profiling.hpp"
+
+// Output formats for detection results: a list of bbox_t objects (the default), a
+// single NumPy structured array, a dict of NumPy column arrays, or bytes serialized
+// as JSON, MessagePack or binary records (see serialize.hpp). All but the list are
+// built straight from the C++ vectors, so no per-box Python object is created.
+enum class box_format
+{
+    list,
+    array,
+    dict,
+    json,
+    msgpack,
+    binary
+};
+
+// A box of a batched result, tagged with the index of the frame it belongs to.
+struct frame_bbox_t
+{
+    unsigned int frame;
+    unsigned int x, y, w, h;
+    float prob;
+    unsigned int obj_id, track_id, frames_counter;
+    float x_3d, y_3d, z_3d;
+};
+
+box_format parse_box_format(const std::string &output);
+
+py::object pack_boxes(std::vector<bbox_t> &&boxes, box_format fmt);
+py::object pack_boxes(std::vector<std::vector<bbox_t>> &&boxes, box_format fmt);
+// The reverse of pack_boxes for one image: accepts a list of bbox_t, or a structured
+// array or dict of columns with at least the x, y, w, h, prob and obj_id fields.
+std::vector<bbox_t> unpack_boxes(const py::handle &boxes);
+// Views the records of a binary message, in any contiguous buffer, as a read-only
+// structured array sharing the memory of `data`.
+py::object decode_binary(const py::buffer &data, int64_t &frame);
+
+// Adds a detection result to the image and box counters.
+inline void count_boxes(const std::vector<bbox_t> &boxes)
+{
+    metrics.add(metrics.images, 1);
+    metrics.add(metrics.boxes, boxes.size());
+}
+
+inline void count_boxes(const std::vector<std::vector<bbox_t>> &boxes)
+{
+    size_t n = 0;
+    for (const auto &b : boxes)
+        n += b.size();
+    metrics.add(metrics.images, boxes.size());
+    metrics.add(metrics.boxes, n);
+}
+
+// Runs `detect` without the GIL and packs its boxes in the format named by `output`.
+// The format is validated before any work is done. The call is counted in the metrics,
+// and recorded as `method` if the profiler is enabled.
+template <typename F>
+py::object run_detection(Profiler &profiler, const char *method, const std::string &output, F &&detect)
+{
+    box_format fmt = parse_box_format(output);
+    profile_scope scope(profiler, method);
+    profile_clock::time_point start = profile_clock::now();
+    decltype(detect()) boxes;
+    {
+        py::gil_scoped_release release;
+        try
+        {
+            boxes = detect();
+        }
+        catch (...)
+        {
+            metrics.add(metrics.failures, 1);
+            throw;
+        }
+    }
+    count_boxes(boxes);
+    py::object ret;
+    {
+        stage_timer timer(STAGE_PACK);
+        ret = pack_boxes(std::move(boxes), fmt);
+    }
+    metrics.add(metrics.inferences, 1);
+    metrics.inference_seconds.observe(seconds_since(start) - scope.overhead());
+    scope.commit();
+    return ret;
+}
@@ -0,0 +1,210 @@
+#include <cmath>
+#include <cstdio>
+#include <cstring>
+#include <stdexcept>
+
+#include "serialize.hpp"
+
+// The writers below format straight into the output string, without snprintf, locale
+// lookups or intermediate objects; the string only grows a few times per message.
+
+static void put_uint(std::string &out, uint64_t v)
+{
+    char buf[20];
+    char *p = buf + sizeof(buf);
+    do
+    {
+        *--p = char('0' + v % 10);
+        v /= 10;
+    } while (v);
+    out.append(p, buf + sizeof(buf) - p);
+}
+
+static void put_int(std::string &out, int64_t v)
+{
+    if (v < 0)
+    {
+        out += '-';
+        put_uint(out, 0 - (uint64_t)v);
+    }
+    else
+        put_uint(out, (uint64_t)v);
+}
+
+// A score with 4 decimals, enough for any threshold.
+static void put_prob(std::string &out, float prob)
+{
+    if (!(prob >= 0.f && prob < 1e9f))
+    {
+        char buf[32];
+        int n = std::isfinite(prob) ? std::snprintf(buf, sizeof(buf), "%.9g", prob) : std::snprintf(buf, sizeof(buf), "null");
+        out.append(buf, n);
+        return;
+    }
+    uint64_t fixed = (uint64_t)std::llround((double)prob * 10000);
+    put_uint(out, fixed / 10000);
+    char frac[5] = {'.', 0, 0, 0, 0};
+    uint64_t f = fixed % 10000;
+    for (int i = 4; i > 0; --i, f /= 10)
+        frac[i] = char('0' + f % 10);
+    out.append(frac, 5);
+}
+
+void append_json(std::string &out, const bbox_t *boxes, size_t n, int64_t frame)
+{
+    out.reserve(out.size() + 32 + n * 100);
+    out += "{\"frame\":";
+    if (frame < 0)
+        out += "null";
+    else
+        put_int(out, frame);
+    out += ",\"boxes\":[";
+    for (size_t i = 0; i < n; ++i)
+    {
+        const bbox_t &b = boxes[i];
+        out += i ? ",{\"x\":" : "{\"x\":";
+        put_uint(out, b.x);
+        out += ",\"y\":";
+        put_uint(out, b.y);
+        out += ",\"w\":";
+        put_uint(out, b.w);
+        out += ",\"h\":";
+        put_uint(out, b.h);
+        out += ",\"prob\":";
+        put_prob(out, b.prob);
+        out += ",\"obj_id\":";
+        put_uint(out, b.obj_id);
+        out += ",\"track_id\":";
+        put_uint(out, b.track_id);
+        out += '}';
+    }
+    out += "]}\n";
+}
+
+// MessagePack stores multi-byte values big-endian.
+template <typename T>
+static void put_be(std::string &out, uint8_t tag, T v)
+{
+    char buf[1 + sizeof(T)];
+    buf[0] = (char)tag;
+    for (size_t i = 0; i < sizeof(T); ++i)
+        buf[sizeof(T) - i] = char((uint64_t)v >> (8 * i));
+    out.append(buf, sizeof(buf));
+}
+
+// The shortest encoding of an unsigned integer.
+static void pack_uint(std::string &out, uint64_t v)
+{
+    if (v < 0x80)
+        out += (char)v;
+    else if (v <= 0xff)
+        put_be(out, 0xcc, (uint8_t)v);
+    else if (v <= 0xffff)
+        put_be(out, 0xcd, (uint16_t)v);
+    else if (v <= 0xffffffff)
+        put_be(out, 0xce, (uint32_t)v);
+    else
+        put_be(out, 0xcf, v);
+}
+
+// A string literal key as a fixstr, which holds up to 31 bytes.
+template <size_t N>
+static void pack_key(std::string &out, const char (&key)[N])
+{
+    static_assert(N - 1 < 32, "key too long for a fixstr");
+    out += char(0xa0 | (N - 1));
+    out.append(key, N - 1);
+}
+
+void append_msgpack(std::string &out, const bbox_t *boxes, size_t n, int64_t frame)
+{
+    out.reserve(out.size() + 24 + n * 56);
+    out += char(0x82);
+    pack_key(out, "frame");
+    if (frame < 0)
+        out += char(0xc0);
+    else
+        pack_uint(out, (uint64_t)frame);
+    pack_key(out, "boxes");
+    if (n < 16)
+        out += char(0x90 | n);
+    else if (n <= 0xffff)
+        put_be(out, 0xdc, (uint16_t)n);
+    else
+        put_be(out, 0xdd, (uint32_t)n);
+    for (size_t i = 0; i < n; ++i)
+    {
+        const bbox_t &b = boxes[i];
+        uint32_t prob;
+        std::memcpy(&prob, &b.prob, sizeof(prob));
+        out += char(0x87);
+        pack_key(out, "x");
+        pack_uint(out, b.x);
+        pack_key(out, "y");
+        pack_uint(out, b.y);
+        pack_key(out, "w");
+        pack_uint(out, b.w);
+        pack_key(out, "h");
+        pack_uint(out, b.h);
+        pack_key(out, "prob");
+        put_be(out, 0xca, prob);
+        pack_key(out, "obj_id");
+        pack_uint(out, b.obj_id);
+        pack_key(out, "track_id");
+        pack_uint(out, b.track_id);
+    }
+}
+
+template <typename R>
+static void append_records(std::string &out, const R *records, size_t n, int64_t frame)
+{
+    binary_header header = {};
+    std::memcpy(header.magic, BINARY_MAGIC, sizeof(header.magic));
+    header.version = BINARY_VERSION;
+    header.record_size = sizeof(R);
+    header.count = (uint32_t)n;
+    header.frame = frame < 0 ? -1 : frame;
+    // the records are the in-memory structs, which needs a little-endian host
+    out.append((const char *)&header, sizeof(header));
+    out.append((const char *)records, n * sizeof(R));
+}
+
+void append_binary(std::string &out, const bbox_t *boxes, size_t n, int64_t frame)
+{
+    append_records(out, boxes, n, frame);
+}
+
+void append_message(std::string &out, box_format fmt, const bbox_t *boxes, size_t n, int64_t frame)
+{
+    switch (fmt)
+    {
+    case box_format::json:
+        append_json(out, boxes, n, frame);
+        break;
+    case box_format::msgpack:
+        append_msgpack(out, boxes, n, frame);
+        break;
+    case box_format::binary:
+        append_binary(out, boxes, n, frame);
+        break;
+    default:
+        throw std::invalid_argument("Not a serialized format");
+    }
+}
+
+void append_messages(std::string &out, box_format fmt, const std::vector<std::vector<bbox_t>> &boxes)
+{
+    if (fmt != box_format::binary)
+    {
+        for (size_t f = 0; f < boxes.size(); ++f)
+            append_message(out, fmt, boxes[f].data(), boxes[f].size(), (int64_t)f);
+        return;
+    }
+    std::vector<frame_bbox_t> records;
+    for (size_t f = 0; f < boxes.size(); ++f)
+    {
+        for (const auto &b : boxes[f])
+            records.push_back({(unsigned int)f, b.x, b.y, b.w, b.h, b.prob, b.obj_id, b.track_id, b.frames_counter, b.x_3d, b.y_3d, b.z_3d});
+    }
+    append_records(out, records.data(), records.size(), -1);
+}
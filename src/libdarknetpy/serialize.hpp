@@ -0,0 +1,48 @@
+#pragma once
+#include <cstdint>
+#include <string>
+#include <vector>
+
+#include "common.hpp"
+#include "results.hpp"
+
+// Serialization of detection results for consumers outside the process. Every format
+// is a stream of self-delimiting messages, one per image; `frame` numbers a message,
+// or is negative when there is nothing to number it with.
+//
+// JSON messages are one object per line:
+//   {"frame":12,"boxes":[{"x":10,"y":20,"w":30,"h":40,"prob":0.9123,"obj_id":0,"track_id":0},...]}
+// The keys are the bbox_t field names, as in the "array" and "dict" outputs; "frame" is
+// null when negative. MessagePack messages are the same map, with prob as a float32.
+//
+// A binary message is a header and the raw records of the "array" output, all
+// little-endian, so a decoder only has to validate the header to view the records as a
+// structured array. Batched results are a single message with frame_bbox_t records.
+struct binary_header
+{
+    char magic[4];
+    uint16_t version;
+    uint16_t record_size;
+    uint32_t count;
+    uint32_t reserved;
+    int64_t frame;
+};
+
+constexpr char BINARY_MAGIC[4] = {'D', 'K', 'N', 'B'};
+constexpr uint16_t BINARY_VERSION = 1;
+
+// Whether `fmt` is one of the serialized formats.
+inline bool is_serialized(box_format fmt)
+{
+    return fmt == box_format::json || fmt == box_format::msgpack || fmt == box_format::binary;
+}
+
+void append_json(std::string &out, const bbox_t *boxes, size_t n, int64_t frame);
+void append_msgpack(std::string &out, const bbox_t *boxes, size_t n, int64_t frame);
+void append_binary(std::string &out, const bbox_t *boxes, size_t n, int64_t frame);
+
+// Appends the message of one image in the serialized format `fmt`.
+void append_message(std::string &out, box_format fmt, const bbox_t *boxes, size_t n, int64_t frame);
+// Appends a batched result: a message per image numbered with its index, or a single
+// binary message.
+void append_messages(std::string &out, box_format fmt, const std::vector<std::vector<bbox_t>> &boxes);
@@ -0,0 +1,134 @@
+#include <stdexcept>
+#include <utility>
+
+#include "stream.hpp"
+
+// A stalled network source would otherwise block read(), and with it close(), for good.
+static const int URL_OPEN_TIMEOUT_MS = 10000, URL_READ_TIMEOUT_MS = 5000;
+
+FrameStream::FrameStream(const std::string &source, size_t capacity, bool latest)
+    : capacity(capacity ? capacity : 1), latest(latest)
+{
+    bool opened;
+#if CV_VERSION_MAJOR > 4 || (CV_VERSION_MAJOR == 4 && (CV_VERSION_MINOR > 5 || (CV_VERSION_MINOR == 5 && CV_VERSION_REVISION >= 2)))
+    if (source.find("://") != std::string::npos)
+        opened = cap.open(source, cv::CAP_ANY, {cv::CAP_PROP_OPEN_TIMEOUT_MSEC, URL_OPEN_TIMEOUT_MS, cv::CAP_PROP_READ_TIMEOUT_MSEC, URL_READ_TIMEOUT_MS});
+    else
+#endif
+        opened = cap.open(source);
+    if (!opened)
+        throw std::runtime_error("Can't open video source: " + source);
+    start();
+}
+
+FrameStream::FrameStream(int camera, size_t capacity, bool latest)
+    : capacity(capacity ? capacity : 1), latest(latest)
+{
+    if (!cap.open(camera))
+        throw std::runtime_error("Can't open camera " + std::to_string(camera));
+    start();
+}
+
+void FrameStream::start()
+{
+    stream_fps = cap.get(cv::CAP_PROP_FPS);
+    // the ring is the only buffering wanted, a backend queue would only add latency
+    if (latest)
+        cap.set(cv::CAP_PROP_BUFFERSIZE, 1);
+    reader = std::thread(&FrameStream::run, this);
+}
+
+void FrameStream::run()
+{
+    for (uint64_t index = 0;; ++index)
+    {
+        cv::Mat mat;
+        bool ok = cap.read(mat) && !mat.empty();
+        std::unique_lock<std::mutex> lock(mutex);
+        if (!ok || stopping)
+        {
+            eof = true;
+            cond.notify_all();
+            return;
+        }
+        if (latest)
+        {
+            if (ring.size() == capacity)
+            {
+                ring.pop_front();
+                ++n_dropped;
+            }
+        }
+        else
+        {
+            cond.wait(lock, [this]()
+                      { return ring.size() < capacity || stopping; });
+            if (stopping)
+                return;
+        }
+        ring.push_back({std::move(mat), index});
+        ++n_decoded;
+        cond.notify_all();
+    }
+}
+
+bool FrameStream::next(stream_frame &out)
+{
+    std::unique_lock<std::mutex> lock(mutex);
+    cond.wait(lock, [this]()
+              { return !ring.empty() || eof || stopping; });
+    if (ring.empty() || stopping)
+        return false;
+    if (latest)
+    {
+        n_dropped += ring.size() - 1;
+        out = std::move(ring.back());
+        ring.clear();
+    }
+    else
+    {
+        out = std::move(ring.front());
+        ring.pop_front();
+    }
+    cond.notify_all();
+    return true;
+}
+
+void FrameStream::close()
+{
+    {
+        std::lock_guard<std::mutex> lock(mutex);
+        stopping = true;
+        ring.clear();
+    }
+    cond.notify_all();
+    // a blocking read of a live source returns with its next frame, or for a URL at
+    // the latest when the read times out
+    if (reader.joinable())
+        reader.join();
+    cap.release();
+}
+
+uint64_t FrameStream::decoded() const
+{
+    std::lock_guard<std::mutex> lock(mutex);
+    return n_decoded;
+}
+
+uint64_t FrameStream::dropped() const
+{
+    std::lock_guard<std::mutex> lock(mutex);
+    return n_dropped;
+}
+
+size_t FrameStream::buffered() const
+{
+    std::lock_guard<std::mutex> lock(mutex);
+    return ring.size();
+}
+
+bool FrameStream::ended() const
+{
+    std::lock_guard<std::mutex> lock(mutex);
+    return eof && ring.empty();
+}
@@ -0,0 +1,63 @@
+#pragma once
+#include <condition_variable>
+#include <cstdint>
+#include <deque>
+#include <mutex>
+#include <string>
+#include <thread>
+
+#include "common.hpp"
+
+// A decoded video frame and its position in the stream.
+struct stream_frame
+{
+    cv::Mat mat;
+    uint64_t index;
+};
+
+// Decodes a video file, URL or camera with cv::VideoCapture on a background thread
+// into a ring of at most `capacity` frames, so decoding overlaps with inference. URLs
+// are opened with open and read timeouts (OpenCV 4.5.2+), so a stalled source ends
+// the stream instead of blocking close().
+//
+// With `latest` set the consumer always gets the freshest frame: a full ring drops
+// its oldest frame, and next() skips everything older than the frame it returns.
+// Otherwise the decoder waits for room and every frame is delivered, which is what
+// offline processing of a file wants.
+class FrameStream
+{
+public:
+    const size_t capacity;
+    const bool latest;
+
+    FrameStream(const std::string &source, size_t capacity, bool latest);
+    FrameStream(int camera, size_t capacity, bool latest);
+    ~FrameStream() { close(); }
+    FrameStream(const FrameStream &) = delete;
+    FrameStream &operator=(const FrameStream &) = delete;
+
+    // Waits for the next frame; returns false once the stream has ended and the ring
+    // is drained, or after close().
+    bool next(stream_frame &out);
+    // Stops the decoder thread and releases the capture.
+    void close();
+
+    double fps() const { return stream_fps; }
+    uint64_t decoded() const;
+    uint64_t dropped() const;
+    size_t buffered() const;
+    bool ended() const;
+
+private:
+    void start();
+    void run();
+
+    cv::VideoCapture cap;
+    double stream_fps = 0;
+    std::thread reader;
+    mutable std::mutex mutex;
+    std::condition_variable cond;
+    std::deque<stream_frame> ring;
+    bool stopping = false, eof = false;
+    uint64_t n_decoded = 0, n_dropped = 0;
+};
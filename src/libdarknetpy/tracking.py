@@ -0,0 +1,180 @@
+"""
+Per-stream object tracking over columnar detections.
+
+``Detector.tracking_id`` keeps a single tracking history inside the detector,
+so one network can only track one stream. A ``Tracker`` holds the history of
+one stream on its own: create one per camera and feed it the detections of
+each frame (``output="dict"`` or ``output="array"``) from any detector.
+``Tracker.from_detector`` makes one that matches like ``Detector.tracking_id``.
+
+Association is done on whole frames at once: the cost of every (track,
+detection) pair is computed as one NumPy matrix and matched greedily,
+cheapest pair first. Requires NumPy.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+import numpy as np
+
+__all__ = ["Tracker"]
+
+_STATE = ("boxes", "obj_id", "track_id", "hits", "last_seen")
+
+
+class Tracker:
+    """
+    Assign stable track ids to the detections of one stream.
+
+    ``update`` takes a frame's detections as a dict of columns or a
+    structured array (anything indexable by ``"x"``, ``"y"``, ``"w"``,
+    ``"h"`` and ``"obj_id"``), writes the track ids into its ``track_id``
+    column and the number of frames each track has been matched in into
+    ``frames_counter`` (when those columns exist), and returns the ids.
+
+    With ``metric="iou"`` a detection can continue a track if their boxes
+    overlap by at least ``min_iou``; with ``metric="center"`` if their centers
+    are at most ``max_dist`` pixels apart, like ``Detector.tracking_id``. Only
+    boxes of the same class are matched unless ``class_aware`` is false.
+    Tracks not matched for ``max_age`` frames are forgotten.
+
+    The state is a few small arrays: ``snapshot`` copies it and ``restore``
+    puts it back, e.g. to fork or checkpoint a stream.
+    """
+
+    def __init__(
+        self,
+        metric: str = "iou",
+        min_iou: float = 0.3,
+        max_dist: float = 40.0,
+        max_age: int = 5,
+        class_aware: bool = True,
+    ) -> None:
+        if metric not in ("iou", "center"):
+            msg = f"metric must be 'iou' or 'center', got {metric!r}"
+            raise ValueError(msg)
+        self.metric = metric
+        self.min_iou = min_iou
+        self.max_dist = max_dist
+        self.max_age = max_age
+        self.class_aware = class_aware
+        self.reset()
+
+    @classmethod
+    def from_detector(cls, detector: Any, **kwargs: Any) -> Tracker:
+        """
+        Create a tracker for one stream of ``detector``.
+
+        The defaults follow ``Detector.tracking_id`` (``metric="center"``,
+        ``max_dist=40``, ``max_age=5``); ``kwargs`` override them. The tracker
+        keeps no reference to the detector, so any number of them can share it.
+        """
+        if not callable(getattr(detector, "tracking_id", None)):
+            msg = f"expected a Detector, got {type(detector).__name__}"
+            raise TypeError(msg)
+        options: dict[str, Any] = {"metric": "center", "max_dist": 40.0, "max_age": 5}
+        options.update(kwargs)
+        return cls(**options)
+
+    def reset(self) -> None:
+        """Forget all tracks."""
+        self.frame = 0
+        self.next_id = 1
+        self.boxes = np.empty((0, 4), np.float32)
+        self.obj_id = np.empty(0, np.uint32)
+        self.track_id = np.empty(0, np.uint32)
+        self.hits = np.empty(0, np.uint32)
+        self.last_seen = np.empty(0, np.int64)
+
+    def __len__(self) -> int:
+        return len(self.track_id)
+
+    def update(self, detections: Any) -> np.ndarray:
+        """Match one frame's detections to the tracks; return their track ids."""
+        boxes = np.stack(
+            [np.asarray(detections[k], np.float32) for k in ("x", "y", "w", "h")],
+            axis=1,
+        ).reshape(-1, 4)
+        obj_id = np.asarray(detections["obj_id"], np.uint32)
+        n = len(boxes)
+
+        track_of = np.full(n, -1, np.int64)
+        cost = self._cost(self.boxes, boxes)
+        if self.class_aware:
+            cost[self.obj_id[:, None] != obj_id[None, :]] = np.inf
+        # greedy assignment, cheapest pair first; gating leaves few candidate
+        # pairs, so only those are sorted and walked
+        cand_t, cand_d = np.nonzero(np.isfinite(cost))
+        order = np.argsort(cost[cand_t, cand_d], kind="stable")
+        used = set()
+        for t, d in zip(cand_t[order].tolist(), cand_d[order].tolist()):
+            if t not in used and track_of[d] < 0:
+                used.add(t)
+                track_of[d] = t
+
+        matched = track_of >= 0
+        t = track_of[matched]
+        self.boxes[t] = boxes[matched]
+        self.hits[t] += 1
+        self.last_seen[t] = self.frame
+
+        new = ~matched
+        n_new = int(new.sum())
+        new_ids = np.arange(self.next_id, self.next_id + n_new, dtype=np.uint32)
+        self.next_id += n_new
+        ids = np.empty(n, np.uint32)
+        ids[matched] = self.track_id[t]
+        ids[new] = new_ids
+        counts = np.ones(n, np.uint32)
+        counts[matched] = self.hits[t]
+
+        keep = self.frame - self.last_seen < self.max_age
+        self.boxes = np.concatenate([self.boxes[keep], boxes[new]])
+        self.obj_id = np.concatenate([self.obj_id[keep], obj_id[new]])
+        self.track_id = np.concatenate([self.track_id[keep], new_ids])
+        self.hits = np.concatenate([self.hits[keep], np.ones(n_new, np.uint32)])
+        self.last_seen = np.concatenate(
+            [self.last_seen[keep], np.full(n_new, self.frame, np.int64)]
+        )
+        self.frame += 1
+
+        for name, values in (("track_id", ids), ("frames_counter", counts)):
+            try:
+                detections[name][...] = values
+            except (KeyError, ValueError, TypeError):
+                pass
+        return ids
+
+    def snapshot(self) -> dict[str, Any]:
+        """Return a copy of the tracker state."""
+        state: dict[str, Any] = {k: getattr(self, k).copy() for k in _STATE}
+        state["frame"] = self.frame
+        state["next_id"] = self.next_id
+        return state
+
+    def restore(self, state: dict[str, Any]) -> None:
+        """Replace the tracker state with a ``snapshot``."""
+        for k in _STATE:
+            setattr(self, k, np.array(state[k], copy=True))
+        self.frame = state["frame"]
+        self.next_id = state["next_id"]
+
+    def _cost(self, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        """Pairwise cost of tracks ``a`` and detections ``b``; inf where gated out."""
+        ax, ay, aw, ah = (col[:, None] for col in a.T)
+        bx, by, bw, bh = b.T
+        if self.metric == "center":
+            dx = (ax + aw / 2) - (bx + bw / 2)
+            dy = (ay + ah / 2) - (by + bh / 2)
+            cost = np.sqrt(dx * dx + dy * dy)
+            cost[cost > self.max_dist] = np.inf
+            return cost
+        iw = np.minimum(ax + aw, bx + bw) - np.maximum(ax, bx)
+        ih = np.minimum(ay + ah, by + bh) - np.maximum(ay, by)
+        inter = np.clip(iw, 0, None) * np.clip(ih, 0, None)
+        union = aw * ah + bw * bh - inter
+        iou = np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+        cost = 1 - iou
+        cost[iou < self.min_iou] = np.inf
+        return cost
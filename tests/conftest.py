@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import struct
+
+import pytest
+
+ANCHORS = "10,14, 23,27, 37,58"
+
+# (section, options) of the default test network, before its detection head
+LAYERS = (
+    ("convolutional", {"batch_normalize": 1, "filters": 8, "size": 3}),
+    ("maxpool", {"size": 2, "stride": 2}),
+    ("convolutional", {"batch_normalize": 1, "filters": 16, "size": 3}),
+    ("maxpool", {"size": 2, "stride": 2}),
+    ("convolutional", {"batch_normalize": 1, "filters": 16, "size": 3}),
+)
+
+
+def write_model(path, layers=LAYERS, size=64, classes=2, seed=0):
+    """
+    Write a darknet .cfg with random .weights under ``path``.
+
+    ``layers`` are ``(section, options)`` pairs: convolutional (with
+    ``batch_normalize``, ``groups`` and ``stride``), maxpool and shortcut
+    (with ``weights_type``) layers; a 1x1 convolution and a [yolo] layer for
+    ``classes`` are appended. Returns the paths of the .cfg and .weights.
+    """
+    np = pytest.importorskip("numpy")
+
+    rng = np.random.default_rng(seed)
+    sections = [
+        f"[net]\nbatch=1\nsubdivisions=1\nwidth={size}\nheight={size}\nchannels=3\n"
+    ]
+    params = []
+    channels = 3
+    head = (
+        "convolutional",
+        {"filters": 3 * (classes + 5), "size": 1, "activation": "linear"},
+    )
+    for section, options in (*layers, head):
+        if section == "convolutional":
+            options = {"stride": 1, "pad": 1, "activation": "leaky", **options}
+            filters = options["filters"]
+            fan_in = channels // options.get("groups", 1) * options["size"] ** 2
+            # darknet order: biases, [scales, rolling mean, rolling variance],
+            # weights
+            params.append(rng.normal(0, 0.1, filters))
+            if options.get("batch_normalize"):
+                params += [
+                    rng.uniform(0.5, 1.5, filters),
+                    rng.normal(0, 0.1, filters),
+                    rng.uniform(0.5, 1.5, filters),
+                ]
+            params.append(rng.normal(0, (2 / fan_in) ** 0.5, filters * fan_in))
+            channels = filters
+        elif section == "shortcut":
+            weights_type = options.get("weights_type")
+            if weights_type == "per_feature":
+                params.append(rng.uniform(0.5, 1.5, 2))
+            elif weights_type == "per_channel":
+                params.append(rng.uniform(0.5, 1.5, 2 * channels))
+        lines = "".join(f"{k}={v}\n" for k, v in options.items())
+        sections.append(f"[{section}]\n{lines}")
+    sections.append(
+        f"[yolo]\nmask=0,1,2\nanchors={ANCHORS}\nclasses={classes}\nnum=3\n"
+        "jitter=.3\nignore_thresh=.7\ntruth_thresh=1\nrandom=0\n"
+    )
+
+    cfg = path / "model.cfg"
+    weights = path / "model.weights"
+    cfg.write_text("\n".join(sections))
+    with open(weights, "wb") as f:
+        # major, minor, revision, images seen
+        f.write(struct.pack("<iiiQ", 0, 2, 5, 0))
+        f.write(np.concatenate(params).astype(np.float32).tobytes())
+    return str(cfg), str(weights)
+
+
+@pytest.fixture
+def model(tmp_path):
+    """The .cfg and .weights of a small synthetic network with 64x64 input."""
+    return write_model(tmp_path)
+
+
+@pytest.fixture
+def make_model(tmp_path):
+    """``write_model`` into the test's temporary directory."""
+
+    def make(layers=LAYERS, **kwargs):
+        return write_model(tmp_path, layers, **kwargs)
+
+    return make
+
+
+@pytest.fixture
+def frame():
+    """A reproducible 48x80 RGB uint8 frame."""
+    np = pytest.importorskip("numpy")
+    return np.random.default_rng(1).integers(0, 256, (48, 80, 3), np.uint8)
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+m = pytest.importorskip("libdarknetpy")
+
+
+class SlowDetector:
+    """Stands in for ``Detector``: echoes its argument after a delay."""
+
+    def __init__(self, delay: float = 0.0) -> None:
+        self.delay = delay
+        self.calls = 0
+        self.release = threading.Event()
+
+    def detect(self, value, block=False):
+        if block:
+            self.release.wait()
+        time.sleep(self.delay)
+        self.calls += 1
+        if value is None:
+            raise ValueError("no image")
+        return value
+
+
+def test_results_fan_out():
+    async def main():
+        async with m.AsyncDetector([SlowDetector(), SlowDetector()]) as det:
+            return await asyncio.gather(*(det.detect(i) for i in range(10)))
+
+    assert asyncio.run(main()) == list(range(10))
+
+
+def test_errors_propagate():
+    async def main():
+        async with m.AsyncDetector([SlowDetector()]) as det:
+            await det.detect(None)
+
+    with pytest.raises(ValueError):
+        asyncio.run(main())
+
+
+def test_queue_bound_and_timeout():
+    inner = SlowDetector()
+
+    async def main():
+        async with m.AsyncDetector([inner], max_queue=2) as det:
+            first = asyncio.ensure_future(det.detect(1, block=True))
+            queued = asyncio.ensure_future(det.detect(2))
+            await asyncio.sleep(0.05)
+            assert (det.pending, det.queue_depth) == (2, 1)
+            # no free slot: times out waiting for one
+            with pytest.raises(asyncio.TimeoutError):
+                await det.detect(3, timeout=0.05)
+            queued.cancel()
+            inner.release.set()
+            assert await first == 1
+            await det.detect(4)
+            assert det.pending == 0
+
+    asyncio.run(main())
+    # the cancelled request never ran
+    assert inner.calls == 2
+
+
+def test_close_resolves_every_accepted_request():
+    inner = SlowDetector()
+
+    async def main():
+        det = m.AsyncDetector([inner], max_queue=1)
+        running = asyncio.ensure_future(det.detect(1, block=True))
+        await asyncio.sleep(0.05)
+        # waits for the only slot while the detector is closed
+        waiting = asyncio.ensure_future(det.detect(2))
+        await asyncio.sleep(0.05)
+        closing = asyncio.ensure_future(det.aclose())
+        await asyncio.sleep(0.05)
+        inner.release.set()
+        await closing
+        assert await running == 1
+        with pytest.raises(RuntimeError, match="closed"):
+            await asyncio.wait_for(waiting, 5)
+        assert det.pending == det.queue_depth == 0
+
+    asyncio.run(main())
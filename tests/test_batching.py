@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+
+m = pytest.importorskip("libdarknetpy")
+
+
+class EchoDetector:
+    """Stands in for ``Detector``: each image's boxes are the image itself."""
+
+    batch_size = 4
+
+    def __init__(self) -> None:
+        self.batches: list[list] = []
+
+    def detect_many(self, images, **kwargs):
+        self.batches.append(list(images))
+        if None in images:
+            raise ValueError("no image")
+        return [[image] for image in images]
+
+
+def test_requests_are_batched():
+    det = EchoDetector()
+    with m.BatchScheduler(det, max_latency=1.0) as sched:
+        futures = [sched.submit(i) for i in range(8)]
+        assert [f.result(5) for f in futures] == [[i] for i in range(8)]
+    assert det.batches == [[0, 1, 2, 3], [4, 5, 6, 7]]
+    stats = sched.stats()
+    assert stats["batch_sizes"] == {4: 2}
+    assert stats["queue_wait"]["count"] == 8
+    assert stats["queue_wait"]["buckets"][-1] == (float("inf"), 8)
+
+
+def test_partial_batch_after_max_latency():
+    det = EchoDetector()
+    with m.BatchScheduler(det, max_latency=0.01) as sched:
+        assert sched.detect("a", timeout=5) == ["a"]
+    assert sched.stats()["batch_sizes"] == {1: 1}
+
+
+def test_errors_reach_only_their_caller():
+    det = EchoDetector()
+    with m.BatchScheduler(det, max_batch=2, max_latency=1.0) as sched:
+        bad, good = sched.submit(None), sched.submit(1)
+        with pytest.raises(ValueError):
+            bad.result(5)
+        assert good.result(5) == [1]
+    # the failed batch is rerun one request at a time
+    assert det.batches == [[None, 1], [None], [1]]
+    assert sched.stats()["batch_sizes"] == {2: 1}
+
+
+def test_close_resolves_every_accepted_request():
+    sched = m.BatchScheduler(EchoDetector(), max_latency=0.001)
+    accepted = []
+
+    def submit_until_closed():
+        while True:
+            try:
+                accepted.append(sched.submit(0))
+            except RuntimeError:
+                return
+
+    threads = [threading.Thread(target=submit_until_closed) for _ in range(4)]
+    for t in threads:
+        t.start()
+    time.sleep(0.05)
+    sched.close()
+    for t in threads:
+        t.join()
+    assert all(f.result(5) == [0] for f in accepted)
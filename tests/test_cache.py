@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import pickle
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("libdarknetpy")
+
+from libdarknetpy.cache import ResultCache  # noqa: E402
+
+
+class CountingDetector:
+    """Stands in for a Detector: one box per byte of the image."""
+
+    def __init__(self, delay: float = 0.0) -> None:
+        self.calls = 0
+        self.delay = delay
+        self.nms = 0.45
+
+    def detect_raw(self, data, thresh, use_mean, letterbox, output):
+        self.calls += 1
+        time.sleep(self.delay)
+        return [thresh] * len(bytes(data))
+
+
+def test_hits_and_parameters():
+    det = CountingDetector()
+    cache = ResultCache(det)
+    first = cache.detect_raw(b"abc")
+    assert cache.detect_raw(bytearray(b"abc")) is first
+    assert cache.detect_raw(list(b"abc")) is first
+    assert cache.detect_raw(b"abc", thresh=0.5) == [0.5] * 3
+    det.nms = 0.3
+    cache.detect_raw(b"abc")
+    assert det.calls == 3
+    # quantize() changes the results too
+    det.precision = "int8"
+    cache.detect_raw(b"abc")
+    assert det.calls == 4
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (2, 4, 4)
+
+
+def test_lru_size_bound_and_ttl():
+    det = CountingDetector()
+    cache = ResultCache(det, max_bytes=2000)
+    for i in range(20):
+        cache.detect_raw(bytes([i]) * 10)
+    stats = cache.stats()
+    assert stats["bytes"] <= 2000
+    assert stats["evictions"] == 20 - stats["entries"] > 0
+
+    cache = ResultCache(det, ttl=0.05)
+    cache.detect_raw(b"x")
+    time.sleep(0.1)
+    cache.detect_raw(b"x")
+    assert cache.stats()["expired"] == 1
+
+
+def test_concurrent_requests_collapse():
+    det = CountingDetector(delay=0.2)
+    cache = ResultCache(det)
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.detect_raw(b"same")))
+        for _ in range(4)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert det.calls == 1
+    assert all(r is results[0] for r in results)
+    assert cache.stats()["collapsed"] == 3
+
+
+def test_disk_tier(tmp_path):
+    with pytest.raises(ValueError):
+        ResultCache(CountingDetector(), directory=tmp_path)
+    det = CountingDetector()
+    ResultCache(det, directory=tmp_path, model_id="m1").detect_raw(b"abc")
+    cache = ResultCache(det, directory=tmp_path, model_id="m1")
+    assert cache.detect_raw(b"abc") == [0.2] * 3
+    assert det.calls == 1
+    assert cache.stats()["disk_hits"] == 1
+    ResultCache(det, directory=tmp_path, model_id="m2").detect_raw(b"abc")
+    assert det.calls == 2
+
+
+def test_bbox_pickle():
+    m = pytest.importorskip("libdarknetpy._libdarknetpy")
+    b = m.bbox_t()
+    b.x, b.prob, b.obj_id, b.z_3d = 3, 0.25, 7, 1.5
+    c = pickle.loads(pickle.dumps(b))
+    assert (c.x, c.prob, c.obj_id, c.z_3d) == (3, 0.25, 7, 1.5)
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import struct
+
+import pytest
+
+m = pytest.importorskip("libdarknetpy._libdarknetpy")
+np = pytest.importorskip("numpy")
+
+# batch-normalized convolutions and weighted shortcuts, which compile_model
+# folds into the weights
+LAYERS = (
+    ("convolutional", {"batch_normalize": 1, "filters": 8, "size": 3}),
+    ("convolutional", {"batch_normalize": 1, "filters": 8, "size": 3}),
+    (
+        "shortcut",
+        {
+            "from": -2,
+            "weights_type": "per_channel",
+            "weights_normalization": "relu",
+            "activation": "linear",
+        },
+    ),
+    ("maxpool", {"size": 2, "stride": 2}),
+    ("convolutional", {"batch_normalize": 1, "filters": 8, "size": 3}),
+    (
+        "shortcut",
+        {
+            "from": -2,
+            "weights_type": "per_feature",
+            "weights_normalization": "softmax",
+            "activation": "linear",
+        },
+    ),
+)
+
+
+def stored_cfg(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, offset, size = struct.unpack("<8sQQ", data[-24:])
+    assert magic == b"DNPYMODL"
+    return data[offset : offset + size].decode()
+
+
+def test_compiled_model_matches_original(tmp_path, make_model, frame):
+    cfg, weights = make_model(LAYERS)
+    compiled = str(tmp_path / "model.dnm")
+    m.compile_model(cfg, weights, compiled)
+    text = stored_cfg(compiled)
+    assert "batch_normalize" not in text
+    assert "weights_normalization" not in text
+    assert "weights_type=per_channel" in text
+
+    original = m.Detector(cfg, weights)
+    loaded = m.Detector.from_compiled(compiled)
+    assert loaded.describe_layers() == original.describe_layers()
+    every = list(range(len(original.describe_layers())))
+    expected = original.forward(frame, every, copy=True)
+    actual = loaded.forward(frame, every, copy=True)
+    for i in every:
+        np.testing.assert_allclose(actual[i], expected[i], rtol=1e-4, atol=1e-5)
+    assert loaded.detect_array(frame, output="array").tolist() == (
+        original.detect_array(frame, output="array").tolist()
+    )
+
+
+def test_from_compiled_rejects_other_files(model):
+    with pytest.raises(ValueError, match="not a compiled model"):
+        m.Detector.from_compiled(model[0])
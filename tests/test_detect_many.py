@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+import pytest
+
+m = pytest.importorskip("libdarknetpy._libdarknetpy")
+np = pytest.importorskip("numpy")
+
+
+def key(boxes):
+    return sorted((b.x, b.y, b.w, b.h, b.obj_id, round(b.prob, 4)) for b in boxes)
+
+
+def test_detect_many_matches_detect_array(model, frame):
+    det = m.Detector(*model, batch_size=2)
+    single = m.Detector(*model)
+    other = np.random.default_rng(5).integers(0, 256, (64, 64, 3), np.uint8)
+    images = [frame, other, frame[:, ::-1]]
+    batched = det.detect_many(images, thresh=0.1)
+    assert len(batched) == 3
+    for boxes, image in zip(batched, images):
+        assert key(boxes) == key(single.detect_array(image, 0.1))
+
+
+def test_detect_many_fails_as_a_whole(model, frame):
+    det = m.Detector(*model, batch_size=2)
+    with pytest.raises(ValueError, match="decode"):
+        det.detect_many([frame, b"not an image"])
+    with pytest.raises(ValueError):
+        det.detect_many([frame, np.zeros((2, 2, 2, 2), np.uint8)])
+    assert len(det.detect_many([frame, frame])) == 2
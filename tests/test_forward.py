@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import pytest
+
+m = pytest.importorskip("libdarknetpy._libdarknetpy")
+np = pytest.importorskip("numpy")
+
+pytestmark = pytest.mark.skipif(
+    m.built_with_cuda(), reason="forward() is only available in CPU builds"
+)
+
+
+def test_describe_layers(model):
+    layers = m.Detector(*model).describe_layers()
+    assert [kind for kind, _ in layers] == [
+        "convolutional",
+        "maxpool",
+        "convolutional",
+        "maxpool",
+        "convolutional",
+        "convolutional",
+        "yolo",
+    ]
+    assert layers[0][1] == (8, 64, 64)
+    assert layers[1][1] == (8, 32, 32)
+    # 3 anchors x (4 coordinates, objectness, 2 classes)
+    assert layers[-1][1] == (21, 16, 16)
+
+
+def test_forward_outputs(model, frame):
+    det = m.Detector(*model)
+    out = det.forward(frame)
+    assert list(out) == [6]
+    assert out[6].shape == (21, 16, 16)
+    assert out[6].dtype == np.float32
+    assert not out[6].flags.writeable
+    with pytest.raises(ValueError):
+        out[6][0, 0, 0] = 1
+
+    picked = det.forward(frame, [0, -1, -3])
+    assert sorted(picked) == [0, 4, 6]
+    np.testing.assert_array_equal(picked[6], out[6])
+    assert picked[0].shape == (8, 64, 64)
+
+
+def test_forward_copy_survives_the_next_call(model, frame):
+    det = m.Detector(*model)
+    view = det.forward(frame)[6]
+    kept = det.forward(frame, copy=True)[6]
+    assert kept.flags.writeable
+    before = kept.copy()
+    det.forward(255 - frame)
+    np.testing.assert_array_equal(kept, before)
+    # views share the network's buffer and see the new output
+    assert not np.array_equal(view, before)
+
+
+def test_forward_batch_axis(model, frame):
+    det = m.Detector(*model, batch_size=2)
+    out = det.forward([frame, 255 - frame], copy=True)[6]
+    assert out.shape == (2, 21, 16, 16)
+    single = m.Detector(*model)
+    np.testing.assert_allclose(out[0], single.forward(frame)[6], rtol=1e-4, atol=1e-5)
+    np.testing.assert_allclose(
+        out[1], single.forward(255 - frame)[6], rtol=1e-4, atol=1e-5
+    )
+
+
+def test_forward_rejects_out_of_range_layers(model, frame):
+    det = m.Detector(*model)
+    with pytest.raises(IndexError):
+        det.forward(frame, [7])
+    with pytest.raises(IndexError):
+        det.forward(frame, [-8])
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import pytest
+
+m = pytest.importorskip("libdarknetpy._libdarknetpy")
+np = pytest.importorskip("numpy")
+
+
+def test_gates_static_frames_and_forces_every_n():
+    gate = m.FrameGate(force_every=3)
+    frame = np.full((480, 640, 3), 100, np.uint8)
+    assert [gate.check(frame) for _ in range(7)] == [
+        True,
+        False,
+        False,
+        True,
+        False,
+        False,
+        True,
+    ]
+    assert (gate.inferred, gate.gated, gate.forced) == (3, 4, 2)
+    assert gate.check(frame, force=True)
+
+
+def test_motion_score():
+    gate = m.FrameGate(threshold=0.05, force_every=0)
+    frame = np.full((480, 640, 3), 100, np.uint8)
+    assert gate.score(frame) == 1.0
+    assert gate.check(frame)
+
+    moved = frame.copy()
+    moved[:120, :160] = 200
+    assert gate.score(moved) == pytest.approx(1 / 16, abs=0.01)
+    assert gate.check(moved)
+    assert gate.last_score == pytest.approx(1 / 16, abs=0.01)
+    # compared against the last inferred frame, not the previous one
+    assert gate.score(frame) == pytest.approx(1 / 16, abs=0.01)
+    assert gate.score(moved[:, :, 0]) == 0.0
+    assert gate.score(moved[::2, ::2]) == 0.0
+    assert gate.score(moved[:, :320]) == 1.0
+
+    gate.reset()
+    assert (gate.inferred, gate.gated) == (0, 0)
+    with pytest.raises(ValueError):
+        gate.check(np.zeros((3, 4, 4), np.float32))
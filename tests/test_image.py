@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import pytest
+
+m = pytest.importorskip("libdarknetpy._libdarknetpy")
+
+
+def test_image_from_hwc_buffer():
+    buf = memoryview(bytes(range(60))).cast("B", (4, 5, 3))
+    im = m.image_t(buf)
+    assert (im.h, im.w, im.c) == (4, 5, 3)
+
+
+def test_image_from_gray_buffer():
+    im = m.image_t(memoryview(bytes(20)).cast("B", (4, 5)))
+    assert (im.h, im.w, im.c) == (4, 5, 3)
+
+
+def test_image_rejects_bad_buffers():
+    with pytest.raises(ValueError):
+        m.image_t(memoryview(bytes(40)).cast("B", (4, 5, 2)))
+    with pytest.raises(ValueError):
+        m.image_t(b"not an image")
+
+
+def test_image_close():
+    with m.image_t(memoryview(bytes(20)).cast("B", (4, 5))) as im:
+        assert not im.closed
+    assert im.closed
+    im.close()
+
+
+def test_image_pool_recycles_buffers():
+    pool = m.ImagePool(8, 6, capacity=2)
+    assert pool.buffer_bytes == 8 * 6 * 3 * 4
+    with pool.acquire() as im:
+        assert (im.w, im.h, im.c) == (8, 6, 3)
+    assert (pool.misses, pool.idle) == (1, 1)
+    im = pool.load(memoryview(bytes(240)).cast("B", (10, 8, 3)))
+    assert (pool.hits, pool.in_use, pool.idle) == (1, 1, 0)
+    del im
+    assert pool.bytes_resident == pool.buffer_bytes
+    pool.clear()
+    assert pool.bytes_resident == 0
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import ast
+import os
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip("libdarknetpy._libdarknetpy")
+
+# generous upper bound on `import libdarknetpy`, which should only load the
+# package's own __init__
+IMPORT_BUDGET_US = 50_000
+
+# must not be loaded until they are first used
+HEAVY_MODULES = (
+    "libdarknetpy._libdarknetpy",
+    "libdarknetpy.aio",
+    "libdarknetpy.pool",
+    "asyncio",
+    "multiprocessing",
+    "numpy",
+)
+
+
+def run_importtime(code: str) -> tuple[dict[str, int], list[str]]:
+    """
+    Run ``code`` under ``-X importtime``.
+
+    Returns the cumulative import time in us per module and the heavy modules
+    loaded by the end of ``code``.
+    """
+    code += f"; import sys; print([m for m in {HEAVY_MODULES!r} if m in sys.modules])"
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[12:].split("|"))
+        times[name] = int(cumulative)
+    return times, ast.literal_eval(proc.stdout.strip().splitlines()[-1])
+
+
+def test_import_is_lazy():
+    times, loaded = run_importtime("import libdarknetpy")
+    assert times["libdarknetpy"] < IMPORT_BUDGET_US
+    assert loaded == []
+
+
+def test_extension_loads_on_first_use():
+    _, loaded = run_importtime("import libdarknetpy; libdarknetpy.built_with_opencv()")
+    assert loaded == ["libdarknetpy._libdarknetpy"]
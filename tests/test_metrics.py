@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import urllib.request
+
+import pytest
+
+metrics = pytest.importorskip("libdarknetpy.metrics")
+
+
+def histogram(count, total):
+    return {
+        "count": count,
+        "sum": total,
+        "buckets": [(0.01, count), (float("inf"), count)],
+    }
+
+
+def snap(inferences=3):
+    return {
+        "inferences": inferences,
+        "images": 5,
+        "boxes": 7,
+        "failures": 1,
+        "decoded_bytes": 1024,
+        "image_buffers": 2,
+        "image_buffer_bytes": 4096,
+        "inference_seconds": histogram(3, 0.015),
+        "stage_seconds": {"decode": histogram(2, 0.002)},
+    }
+
+
+def test_prometheus_text():
+    lines = metrics.prometheus_text(snap()).splitlines()
+    assert "# TYPE libdarknetpy_boxes_total counter" in lines
+    assert "libdarknetpy_boxes_total 7" in lines
+    assert "libdarknetpy_image_buffer_bytes 4096" in lines
+    assert 'libdarknetpy_inference_seconds_bucket{le="+Inf"} 3' in lines
+    assert "libdarknetpy_inference_seconds_count 3" in lines
+    assert 'libdarknetpy_stage_seconds_bucket{stage="decode",le="0.01"} 2' in lines
+    assert 'libdarknetpy_stage_seconds_sum{stage="decode"} 0.002' in lines
+
+
+def test_merge_sums_processes():
+    a = snap(inferences=3)
+    b = snap(inferences=4)
+    merged = metrics.merge([a, b])
+    assert merged["inferences"] == 7
+    assert merged["images"] == 10
+    assert merged["inference_seconds"]["count"] == 6
+    assert merged["inference_seconds"]["buckets"] == [(0.01, 6), (float("inf"), 6)]
+    assert merged["stage_seconds"]["decode"]["sum"] == pytest.approx(0.004)
+    with pytest.raises(ValueError):
+        metrics.merge([])
+
+
+def test_prometheus_text_from_source():
+    class Pool:
+        def metrics_snapshot(self):
+            return snap(inferences=9)
+
+    assert "libdarknetpy_inferences_total 9" in metrics.prometheus_text(Pool())
+
+
+def test_image_buffers_gauge():
+    m = pytest.importorskip("libdarknetpy._libdarknetpy")
+    before = metrics.snapshot()
+    im = m.image_t(memoryview(bytes(20)).cast("B", (4, 5)))
+    during = metrics.snapshot()
+    im.close()
+    after = metrics.snapshot()
+    assert during["image_buffers"] == before["image_buffers"] + 1
+    assert during["image_buffer_bytes"] == before["image_buffer_bytes"] + 4 * 5 * 3 * 4
+    assert after["image_buffers"] == before["image_buffers"]
+
+
+def test_serve():
+    pytest.importorskip("libdarknetpy._libdarknetpy")
+    server = metrics.serve(port=0)
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        with urllib.request.urlopen(url, timeout=5) as resp:
+            text = resp.read().decode()
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert "libdarknetpy_inferences_total" in text
+
+
+def test_serve_source():
+    class Pool:
+        def metrics_snapshot(self):
+            return snap(inferences=11)
+
+    server = metrics.serve(port=0, source=Pool())
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        with urllib.request.urlopen(url, timeout=5) as resp:
+            text = resp.read().decode()
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert "libdarknetpy_inferences_total 11" in text
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import pytest
+
+m = pytest.importorskip("libdarknetpy._libdarknetpy")
+
+
+def box(x, y, w, h, prob, obj_id=0):
+    b = m.bbox_t()
+    b.x, b.y, b.w, b.h, b.prob, b.obj_id = x, y, w, h, prob, obj_id
+    return b
+
+
+BOXES = [
+    box(0, 0, 10, 10, 0.9),
+    box(1, 1, 10, 10, 0.8),
+    box(1, 1, 10, 10, 0.7, obj_id=1),
+    box(50, 50, 5, 5, 0.6),
+]
+
+
+def summary(boxes):
+    return [(b.x, b.obj_id, round(b.prob, 3)) for b in boxes]
+
+
+def test_greedy_is_class_aware():
+    assert summary(m.nms(BOXES)) == [(0, 0, 0.9), (1, 1, 0.7), (50, 0, 0.6)]
+    assert summary(m.nms(BOXES, class_aware=False)) == [(0, 0, 0.9), (50, 0, 0.6)]
+
+
+def test_soft_nms_decays_scores():
+    kept = summary(m.nms(BOXES, method="soft", score_threshold=0.1))
+    assert kept[:3] == [(0, 0, 0.9), (1, 1, 0.7), (50, 0, 0.6)]
+    assert kept[3][:2] == (1, 0)
+    assert kept[3][2] < 0.8
+    assert len(m.nms(BOXES, method="soft", score_threshold=0.5)) == 3
+
+
+def test_diou_keeps_distant_centers():
+    # the second box is centered on the first one, the third is shifted by half
+    boxes = [box(0, 0, 10, 10, 0.9), box(1, 1, 8, 8, 0.8), box(5, 0, 10, 10, 0.7)]
+    assert len(m.nms(boxes, threshold=0.3)) == 1
+    assert summary(m.nms(boxes, threshold=0.3, method="diou")) == [
+        (0, 0, 0.9),
+        (5, 0, 0.7),
+    ]
+
+
+def test_limits():
+    assert summary(m.nms(BOXES, top_k=2)) == [(0, 0, 0.9)]
+    assert len(m.nms(BOXES, max_detections=2)) == 2
+    assert summary(m.nms(BOXES, method="none", max_detections=2)) == [
+        (0, 0, 0.9),
+        (1, 0, 0.8),
+    ]
+    with pytest.raises(ValueError):
+        m.nms(BOXES, top_k=-1)
+    with pytest.raises(ValueError):
+        m.nms(BOXES, method="darknet")
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import time
+
+import pytest
+
+m = pytest.importorskip("libdarknetpy._libdarknetpy")
+np = pytest.importorskip("numpy")
+shared_memory = pytest.importorskip("multiprocessing.shared_memory")
+
+from libdarknetpy.pool import DetectorPool  # noqa: E402
+
+
+def frames(n):
+    rng = np.random.default_rng(4)
+    return [rng.integers(0, 256, (48, 80, 3), np.uint8) for _ in range(n)]
+
+
+def wait_for(condition, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_results_match_a_detector(model):
+    det = m.Detector(*model)
+    batch = frames(8)
+    expected = [det.detect_array(f, output="array").tolist() for f in batch]
+    with DetectorPool(*model, workers=2, slots=2, slot_bytes=48 * 80 * 3) as pool:
+        # more frames than slots: submit waits for the rings to free up
+        futures = [pool.submit(f) for f in batch]
+        assert [fut.result(30).tolist() for fut in futures] == expected
+        assert pool.detect(batch[0], timeout=30).tolist() == expected[0]
+        assert pool.in_flight == 0
+        with pytest.raises(ValueError, match="slot"):
+            pool.submit(np.zeros((49, 80, 3), np.uint8))
+
+
+def test_worker_restart(model):
+    frame = frames(1)[0]
+    with DetectorPool(*model, workers=2) as pool:
+        expected = pool.detect(frame, timeout=30).tolist()
+        pool._workers[0].process.kill()
+        wait_for(lambda: pool.restarts == 1)
+        wait_for(lambda: pool._workers[0].ready.is_set())
+        results = [pool.submit(frame) for _ in range(6)]
+        assert [fut.result(30).tolist() for fut in results] == [expected] * 6
+
+
+def test_metrics_snapshot_sums_workers(model):
+    frame = frames(1)[0]
+    with DetectorPool(*model, workers=2) as pool:
+        for fut in [pool.submit(frame) for _ in range(5)]:
+            fut.result(30)
+        snapshot = pool.metrics_snapshot(timeout=30)
+    assert snapshot["inferences"] == snapshot["images"] == 5
+    assert snapshot["inference_seconds"]["count"] == 5
+
+
+def test_close_releases_shared_memory(model):
+    pool = DetectorPool(*model, workers=2)
+    names = [shm.name for shm in pool._shm]
+    pool.close()
+    for name in names:
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=name)
+    with pytest.raises(RuntimeError, match="closed"):
+        pool.submit(frames(1)[0])
+    pool.close()
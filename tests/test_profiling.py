@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import pytest
+
+m = pytest.importorskip("libdarknetpy._libdarknetpy")
+
+
+def test_profiling(model, frame):
+    det = m.Detector(*model)
+    assert not det.profiling
+    det.detect_array(frame)
+    assert det.last_profile is None
+
+    det.profiling = True
+    det.detect_array(frame)
+    profile = det.last_profile
+    assert profile["method"] == "detect_array"
+    assert {"preprocess", "network", "pack"} <= set(profile["stages"])
+    assert 0 < sum(profile["stages"].values()) <= profile["total"]
+    assert profile["layers"] == []
+
+    det.profile_layers = True
+    det.detect_array(frame)
+    layers = det.last_profile["layers"]
+    assert [layer["index"] for layer in layers] == list(range(len(layers)))
+    assert [layer["type"] for layer in layers] == [
+        kind for kind, _ in det.describe_layers()
+    ]
+    assert all(layer["time"] >= 0 for layer in layers)
+
+    stats = det.profile_stats()
+    assert stats["calls"] == {"detect_array": 2}
+    assert stats["total"]["count"] == 2
+    assert stats["total"]["buckets"][-1] == (float("inf"), 2)
+    assert stats["stages"]["network"]["count"] == 2
+    assert stats["layers"][0]["count"] == 1
+    det.reset_profile()
+    assert det.profile_stats()["calls"] == {}
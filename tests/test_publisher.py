@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import json
+import socket
+import time
+
+import pytest
+
+m = pytest.importorskip("libdarknetpy._libdarknetpy")
+
+
+def _box(x, obj_id=0, prob=0.5):
+    b = m.bbox_t()
+    b.x, b.y, b.w, b.h = x, 2 * x, 10, 20
+    b.prob = prob
+    b.obj_id = obj_id
+    return b
+
+
+def _wait(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            msg = "timed out"
+            raise AssertionError(msg)
+        time.sleep(0.005)
+
+
+def _connect(publisher, n=1):
+    clients = [
+        socket.create_connection(("127.0.0.1", publisher.port), timeout=5)
+        for _ in range(n)
+    ]
+    _wait(lambda: publisher.subscribers == n)
+    return clients
+
+
+def test_publishes_json_lines_to_every_subscriber():
+    with m.ResultPublisher(port=0) as pub:
+        assert pub.port > 0
+        clients = _connect(pub, 2)
+        pub.publish([_box(1, obj_id=3, prob=0.75), _box(5)])
+        pub.publish([], frame=42)
+        pub.publish_raw(b'{"event":"end"}\n')
+        for client in clients:
+            lines = client.makefile("rb")
+            first = json.loads(lines.readline())
+            assert first["frame"] == 0
+            assert first["boxes"][0] == {
+                "x": 1,
+                "y": 2,
+                "w": 10,
+                "h": 20,
+                "prob": 0.75,
+                "obj_id": 3,
+                "track_id": 0,
+            }
+            assert [b["x"] for b in first["boxes"]] == [1, 5]
+            assert json.loads(lines.readline()) == {"frame": 42, "boxes": []}
+            assert json.loads(lines.readline()) == {"event": "end"}
+            lines.close()
+            client.close()
+        _wait(lambda: pub.sent == 6)
+        assert (pub.published, pub.dropped) == (3, 0)
+        _wait(lambda: pub.subscribers == 0)
+
+
+def test_publishes_array_and_dict_results():
+    np = pytest.importorskip("numpy")
+    with m.ResultPublisher(port=0) as pub:
+        (client,) = _connect(pub)
+        fields = ("x", "y", "w", "h", "obj_id", "track_id")
+        columns = {k: np.array([1, 2], np.uint32) for k in fields}
+        columns["prob"] = np.array([0.5, 0.25], np.float32)
+        records = np.zeros(2, [(k, np.uint32) for k in fields] + [("prob", "f4")])
+        for k, v in columns.items():
+            records[k] = v
+        pub.publish(columns)
+        pub.publish(records)
+        lines = client.makefile("rb")
+        for _ in range(2):
+            boxes = json.loads(lines.readline())["boxes"]
+            assert [b["track_id"] for b in boxes] == [1, 2]
+            assert [b["prob"] for b in boxes] == [0.5, 0.25]
+        with pytest.raises(TypeError):
+            pub.publish(5)
+        lines.close()
+        client.close()
+
+
+def test_slow_subscriber_drops_oldest_without_blocking():
+    pub = m.ResultPublisher(port=0, capacity=2)
+    (client,) = _connect(pub)
+    boxes = [_box(i) for i in range(1000)]
+    start = time.perf_counter()
+    for _ in range(500):
+        pub.publish(boxes)
+    pub.publish([], frame=10**9)
+    # far more than the socket buffers hold, yet publishing never waited
+    assert time.perf_counter() - start < 5
+    _wait(lambda: pub.dropped > 0)
+
+    # the newest result still arrives, after at most the buffered ones
+    received = 0
+    lines = client.makefile("rb")
+    while True:
+        message = json.loads(lines.readline())
+        received += 1
+        if message["frame"] == 10**9:
+            break
+    assert received < 500
+    lines.close()
+    client.close()
+    pub.close()
+    assert pub.closed
+    with pytest.raises(RuntimeError):
+        pub.publish([])
+
+
+def test_rejects_bad_port():
+    with pytest.raises(ValueError):
+        m.ResultPublisher(port=70000)
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import pytest
+
+pytest.importorskip("libdarknetpy")
+np = pytest.importorskip("numpy")
+
+from libdarknetpy.quantization import compare  # noqa: E402
+
+DTYPE = np.dtype(
+    [
+        ("x", "u4"),
+        ("y", "u4"),
+        ("w", "u4"),
+        ("h", "u4"),
+        ("prob", "f4"),
+        ("obj_id", "u4"),
+    ]
+)
+
+
+class FixedDetector:
+    """Stands in for ``Detector``: returns the same boxes for every image."""
+
+    def __init__(self, *boxes) -> None:
+        self.boxes = np.array(list(boxes), DTYPE)
+
+    def detect_array(self, image, thresh, output):
+        return self.boxes
+
+
+REFERENCE = FixedDetector(
+    (0, 0, 10, 10, 0.9, 0), (50, 50, 10, 10, 0.8, 1), (80, 0, 10, 10, 0.6, 0)
+)
+
+
+def test_identical_detectors_agree():
+    report = compare(REFERENCE, REFERENCE, [b"a", b"b"])
+    assert report["images"] == 2
+    assert report["matched"] == report["reference_boxes"] == 6
+    assert report["precision"] == report["recall"] == report["map"] == 1.0
+    assert report["mean_iou"] == 1.0
+    assert report["mean_score_drift"] == 0.0
+
+
+def test_drift():
+    candidate = FixedDetector(
+        (1, 0, 10, 10, 0.85, 0),  # shifted, still matches
+        (50, 50, 10, 10, 0.8, 0),  # wrong class
+        (200, 200, 10, 10, 0.7, 0),  # spurious
+    )
+    report = compare(REFERENCE, candidate, [b"a"])
+    assert report["matched"] == 1
+    assert report["precision"] == pytest.approx(1 / 3)
+    assert report["recall"] == pytest.approx(1 / 3)
+    assert report["mean_iou"] == pytest.approx(90 / 110)
+    assert report["mean_score_drift"] == pytest.approx(0.05)
+    # class 0: one hit of two boxes at rank 1, class 1: nothing found
+    assert report["map"] == pytest.approx((0.5 + 0.0) / 2)
+    with pytest.raises(ValueError):
+        compare(REFERENCE, candidate, [])
+
+
+# a plain, a grouped and a strided convolution ahead of the detection head
+LAYERS = (
+    ("convolutional", {"batch_normalize": 1, "filters": 8, "size": 3}),
+    ("convolutional", {"batch_normalize": 1, "filters": 8, "size": 3, "groups": 2}),
+    ("convolutional", {"batch_normalize": 1, "filters": 16, "size": 3, "stride": 2}),
+    ("maxpool", {"size": 2, "stride": 2}),
+)
+
+
+@pytest.mark.parametrize("mode, tolerance", [("fp16", 2e-3), ("int8", 3e-2)])
+def test_quantized_outputs_agree(make_model, frame, mode, tolerance):
+    m = pytest.importorskip("libdarknetpy._libdarknetpy")
+    if m.built_with_cuda():
+        pytest.skip("quantization is only available in CPU builds")
+    model = make_model(LAYERS)
+    reference = m.Detector(*model)
+    quantized = m.Detector(*model)
+    report = quantized.quantize(mode)
+    assert report == {**report, "quantized": 4, "skipped": 0}
+    assert report["bytes_after"] < report["bytes_before"]
+    assert quantized.precision == mode
+
+    every = list(range(len(reference.describe_layers())))
+    expected = reference.forward(frame, every, copy=True)
+    actual = quantized.forward(frame, every, copy=True)
+    for i in every:
+        scale = np.abs(expected[i]).max()
+        np.testing.assert_allclose(actual[i], expected[i], atol=tolerance * scale)
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import pytest
+
+m = pytest.importorskip("libdarknetpy._libdarknetpy")
+np = pytest.importorskip("numpy")
+
+THRESH = 0.1
+
+SHAPES = [(48, 80), (80, 48), (48, 1), (1, 80), (1, 1)]
+
+
+def smooth(h, w):
+    """An RGB frame without sharp edges, on which resize methods agree."""
+    y, x = np.mgrid[0:h, 0:w] / max(h, w, 2)
+    rgb = [np.sin(3 * x + 1), np.cos(2 * y), np.sin(2 * (x + y))]
+    return np.stack([(c + 1) * 127.5 for c in rgb], -1).round().astype(np.uint8)
+
+
+def place(image, net_w, net_h, letterbox):
+    """The network input for ``image``: half-pixel bilinear, then padded."""
+    h, w = image.shape[:2]
+    bw, bh, dx, dy = net_w, net_h, 0, 0
+    if letterbox:
+        f32 = np.float32
+        scale = min(f32(net_w) / f32(w), f32(net_h) / f32(h))
+        bw = max(1, min(net_w, int(np.floor(f32(w) * scale + 0.5))))
+        bh = max(1, min(net_h, int(np.floor(f32(h) * scale + 0.5))))
+        dx, dy = (net_w - bw) // 2, (net_h - bh) // 2
+
+    def taps(n, size):
+        pos = np.maximum(0, (np.arange(n) + 0.5) * (size / n) - 0.5)
+        i0 = np.minimum(pos.astype(int), size - 1)
+        frac = np.where(i0 == size - 1, 0, pos - i0)
+        return i0, np.minimum(i0 + 1, size - 1), frac[:, None]
+
+    x0, x1, fx = taps(bw, w)
+    y0, y1, fy = taps(bh, h)
+    src = image.astype(np.float64).transpose(2, 0, 1)
+    top = src[:, y0][:, :, x0] + (src[:, y0][:, :, x1] - src[:, y0][:, :, x0]) * fx.T
+    bottom = src[:, y1][:, :, x0] + (src[:, y1][:, :, x1] - src[:, y1][:, :, x0]) * fx.T
+    out = np.full((3, net_h, net_w), 0.5, np.float32)
+    out[:, dy : dy + bh, dx : dx + bw] = (top + (bottom - top) * fy) / 255
+    return out
+
+
+def assert_same_boxes(ours, theirs, tol=3):
+    """Every box clear of the threshold has a close match in the other list."""
+    strong = [b for b in ours if b.prob >= THRESH + 0.05]
+    assert strong
+    for a, b in ((ours, theirs), (theirs, ours)):
+        for box in a:
+            if box.prob < THRESH + 0.05:
+                continue
+            assert any(
+                o.obj_id == box.obj_id
+                and abs(o.prob - box.prob) < 0.02
+                and max(
+                    abs(int(o.x) - int(box.x)),
+                    abs(int(o.y) - int(box.y)),
+                    abs(int(o.w) - int(box.w)),
+                    abs(int(o.h) - int(box.h)),
+                )
+                <= tol
+                for o in b
+            ), box
+
+
+@pytest.mark.skipif(
+    m.built_with_cuda(), reason="forward() is only available in CPU builds"
+)
+@pytest.mark.parametrize("letterbox", [False, True])
+@pytest.mark.parametrize("shape", SHAPES)
+def test_network_input_matches_reference(model, shape, letterbox):
+    det = m.Detector(*model)
+    image = np.random.default_rng(2).integers(0, 256, (*shape, 3), np.uint8)
+    got = det.forward(image, [0], copy=True, letterbox=letterbox)[0]
+    want = det.forward(
+        place(image, det.get_net_width(), det.get_net_height(), letterbox), [0]
+    )[0]
+    np.testing.assert_allclose(got, want, atol=1e-3)
+
+
+@pytest.mark.parametrize("shape", [(48, 80), (80, 48), (48, 1)])
+def test_stretch_matches_darknet_resize(model, shape):
+    det = m.Detector(*model)
+    # without NMS nearly tied boxes can't swap places between the two inputs
+    det.set_nms("none")
+    image = smooth(*shape)
+    ours = det.detect_array(image, THRESH)
+    # darknet resizes image_t input itself
+    assert_same_boxes(ours, det.detect(m.image_t(image), THRESH))
+
+
+def test_letterbox_matches_darknet_resize_of_padded_frame(model):
+    det = m.Detector(*model)
+    det.set_nms("none")
+    image = smooth(48, 80)
+    ours = det.detect_array(image, THRESH, letterbox=True)
+
+    # pad to the network's aspect ratio and let darknet stretch the result
+    height = round(80 * det.get_net_height() / det.get_net_width())
+    top = (height - 48) // 2
+    padded = np.full((3, height, 80), 0.5, np.float32)
+    padded[:, top : top + 48] = image.transpose(2, 0, 1) / 255
+    theirs = det.detect_array(padded, THRESH)
+    for b in theirs:
+        y0, y1 = np.clip([int(b.y) - top, int(b.y) + int(b.h) - top], 0, 48)
+        b.y, b.h = int(y0), int(y1 - y0)
+    assert_same_boxes(ours, theirs)
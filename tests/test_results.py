@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import pytest
+
+m = pytest.importorskip("libdarknetpy._libdarknetpy")
+np = pytest.importorskip("numpy")
+
+# the record layout of output="array", in bbox_t's field order
+FIELDS = [
+    ("x", "u4"),
+    ("y", "u4"),
+    ("w", "u4"),
+    ("h", "u4"),
+    ("prob", "f4"),
+    ("obj_id", "u4"),
+    ("track_id", "u4"),
+    ("frames_counter", "u4"),
+    ("x_3d", "f4"),
+    ("y_3d", "f4"),
+    ("z_3d", "f4"),
+]
+DTYPE = np.dtype(FIELDS)
+BATCH_DTYPE = np.dtype([("frame", "u4"), *FIELDS])
+
+# no box clears a threshold above 1
+EMPTY = 1.01
+
+
+def rows(boxes):
+    return [tuple(getattr(b, name) for name, _ in FIELDS) for b in boxes]
+
+
+def assert_columns(columns, dtype, n):
+    assert list(columns) == list(dtype.names)
+    for name, column in columns.items():
+        assert column.dtype == dtype[name]
+        assert column.shape == (n,)
+
+
+def test_array_output(model, frame):
+    det = m.Detector(*model)
+    boxes = det.detect_array(frame, 0.1)
+    records = det.detect_array(frame, 0.1, output="array")
+    assert records.dtype == DTYPE
+    assert records.shape == (len(boxes),)
+    assert records.tolist() == rows(boxes)
+
+
+def test_dict_output(model, frame):
+    det = m.Detector(*model)
+    records = det.detect_array(frame, 0.1, output="array")
+    columns = det.detect_array(frame, 0.1, output="dict")
+    assert_columns(columns, DTYPE, len(records))
+    for name, column in columns.items():
+        np.testing.assert_array_equal(column, records[name])
+
+
+def test_batched_output(model, frame):
+    det = m.Detector(*model, batch_size=2)
+    per_image = det.detect_many([frame, 255 - frame], 0.1)
+    records = det.detect_many([frame, 255 - frame], 0.1, output="array")
+    assert records.dtype == BATCH_DTYPE
+    assert records["frame"].tolist() == [
+        i for i, boxes in enumerate(per_image) for _ in boxes
+    ]
+    columns = det.detect_many([frame, 255 - frame], 0.1, output="dict")
+    assert_columns(columns, BATCH_DTYPE, len(records))
+    for name, column in columns.items():
+        np.testing.assert_array_equal(column, records[name])
+
+
+def test_empty_results_keep_their_dtype(model, frame):
+    det = m.Detector(*model, batch_size=2)
+    records = det.detect_array(frame, EMPTY, output="array")
+    assert records.dtype == DTYPE
+    assert records.shape == (0,)
+    assert_columns(det.detect_array(frame, EMPTY, output="dict"), DTYPE, 0)
+
+    records = det.detect_many([frame, frame], EMPTY, output="array")
+    assert records.dtype == BATCH_DTYPE
+    assert records.shape == (0,)
+    columns = det.detect_many([frame, frame], EMPTY, output="dict")
+    assert_columns(columns, BATCH_DTYPE, 0)
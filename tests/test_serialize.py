@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import json
+import socket
+import time
+
+import pytest
+
+m = pytest.importorskip("libdarknetpy._libdarknetpy")
+np = pytest.importorskip("numpy")
+
+from libdarknetpy.batching import BatchScheduler  # noqa: E402
+
+
+def _boxes(n):
+    boxes = []
+    for i in range(n):
+        b = m.bbox_t()
+        b.x, b.y, b.w, b.h = i, 70000 + i, 300, 4
+        b.prob = 0.125 * (i % 8)
+        b.obj_id, b.track_id = i % 3, i
+        boxes.append(b)
+    return boxes
+
+
+def test_json_matches_boxes():
+    boxes = _boxes(20)
+    data = m.serialize(boxes, frame=7)
+    assert data.endswith(b"\n") and data.count(b"\n") == 1
+    message = json.loads(data)
+    assert message["frame"] == 7
+    assert [
+        (b["x"], b["y"], b["w"], b["h"], b["prob"], b["obj_id"], b["track_id"])
+        for b in message["boxes"]
+    ] == [(b.x, b.y, b.w, b.h, b.prob, b.obj_id, b.track_id) for b in boxes]
+    assert json.loads(m.serialize([])) == {"frame": None, "boxes": []}
+
+
+def test_msgpack_matches_json():
+    boxes = _boxes(40)
+    data = m.serialize(boxes, "msgpack", frame=300)
+    assert data.startswith(b"\x82\xa5frame\xcd\x01\x2c\xa5boxes\xdc\x00\x28")
+    msgpack = pytest.importorskip("msgpack")
+    assert msgpack.unpackb(data) == json.loads(m.serialize(boxes, frame=300))
+
+
+def test_binary_round_trip():
+    boxes = _boxes(5)
+    data = m.serialize(boxes, "binary", frame=3)
+    assert data[:4] == b"DKNB"
+    assert len(data) == 24 + 5 * 44
+    records = m.decode_binary(data)
+    assert not records.flags.writeable
+    assert records["x"].tolist() == [b.x for b in boxes]
+    assert records["prob"].tolist() == [b.prob for b in boxes]
+    assert records.dtype.names[:6] == ("x", "y", "w", "h", "prob", "obj_id")
+    frame, again = m.decode_binary(data, return_frame=True)
+    assert frame == 3 and (again == records).all()
+    assert m.decode_binary(m.serialize([], "binary"), return_frame=True)[0] is None
+
+    # any contiguous buffer, e.g. filled by socket.recv_into
+    buf = bytearray(data)
+    view = m.decode_binary(buf)
+    assert view["x"].tolist() == [b.x for b in boxes]
+    with pytest.raises(BufferError):
+        buf.extend(b"more")
+    del view
+    buf.extend(b"more")
+    assert m.decode_binary(memoryview(buf)[:-4])["x"].tolist() == [b.x for b in boxes]
+    with pytest.raises(ValueError):
+        m.decode_binary(memoryview(data + data)[::2])
+
+    # arrays and dicts serialize the same as the list
+    columns = {k: records[k] for k in records.dtype.names}
+    assert m.serialize(records, "binary", frame=3) == data
+    assert m.serialize(columns, "binary", frame=3) == data
+
+    for bad in (data[:-1], b"XXXX" + data[4:], data[:10]):
+        with pytest.raises(ValueError):
+            m.decode_binary(bad)
+    with pytest.raises(ValueError):
+        m.serialize(boxes, "dict")
+
+
+def test_publisher_formats():
+    with m.ResultPublisher(port=0, format="binary") as pub:
+        assert pub.format == "binary"
+        client = socket.create_connection(("127.0.0.1", pub.port), timeout=5)
+        while pub.subscribers < 1:
+            time.sleep(0.005)
+        pub.publish(_boxes(3), frame=9)
+        data = b""
+        while len(data) < 24 + 3 * 44:
+            data += client.recv(4096)
+        frame, records = m.decode_binary(data, return_frame=True)
+        assert frame == 9 and records["track_id"].tolist() == [0, 1, 2]
+        client.close()
+    with pytest.raises(ValueError):
+        m.ResultPublisher(port=0, format="array")
+
+
+class ArrayDetector:
+    """Stands in for ``Detector``: each image is the list of its boxes' x."""
+
+    batch_size = 4
+
+    def detect_many(self, images, output="list", **kwargs):
+        assert output == "array"
+        fields = ("frame", "x", "y", "w", "h", "obj_id")
+        records = np.zeros(
+            sum(map(len, images)), [(k, "u4") for k in fields] + [("prob", "f4")]
+        )
+        records["frame"] = [f for f, xs in enumerate(images) for _ in xs]
+        records["x"] = [x for xs in images for x in xs]
+        return records
+
+
+def test_batch_scheduler_serializes_per_caller():
+    with BatchScheduler(ArrayDetector(), max_latency=1.0, output="json") as sched:
+        futures = [sched.submit(xs) for xs in ([1, 2], [], [3], [4])]
+        results = [json.loads(f.result(5)) for f in futures]
+    assert [[b["x"] for b in r["boxes"]] for r in results] == [[1, 2], [], [3], [4]]
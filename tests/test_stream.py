@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import time
+
+import pytest
+
+m = pytest.importorskip("libdarknetpy._libdarknetpy")
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+
+pytestmark = pytest.mark.skipif(
+    not m.built_with_opencv(), reason="StreamDetector needs an OpenCV build"
+)
+
+FRAMES = 12
+
+
+@pytest.fixture
+def video(tmp_path):
+    path = str(tmp_path / "clip.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 10, (80, 48))
+    if not writer.isOpened():
+        pytest.skip("OpenCV can't write MJPG videos")
+    rng = np.random.default_rng(3)
+    for _ in range(FRAMES):
+        writer.write(rng.integers(0, 256, (48, 80, 3), np.uint8))
+    writer.release()
+    return path
+
+
+def test_every_frame_in_order(model, video):
+    det = m.Detector(*model)
+    with m.StreamDetector(det, video, latest=False, return_frames=True) as stream:
+        frames = list(stream)
+        assert [f[0] for f in frames] == list(range(FRAMES))
+        assert all(f[2].shape == (48, 80, 3) for f in frames)
+        assert stream.processed == stream.decoded == FRAMES
+        assert stream.dropped == 0
+
+
+def test_latest_drops_stale_frames(model, video):
+    det = m.Detector(*model)
+    indices = []
+    with m.StreamDetector(det, video, capacity=2) as stream:
+        for index, _ in stream:
+            indices.append(index)
+            # a slow consumer: the decoder runs ahead
+            time.sleep(0.05)
+        assert stream.dropped > 0
+        assert len(indices) + stream.dropped == stream.decoded == FRAMES
+    assert indices == sorted(set(indices))
+    assert indices[-1] == FRAMES - 1
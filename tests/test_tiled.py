@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import pytest
+
+m = pytest.importorskip("libdarknetpy._libdarknetpy")
+np = pytest.importorskip("numpy")
+
+THRESH = 0.1
+
+
+def key(b):
+    return (b.x, b.y, b.w, b.h, b.obj_id, round(b.prob, 4))
+
+
+def shifted(boxes, x, y=0):
+    for b in boxes:
+        b.x += x
+        b.y += y
+    return boxes
+
+
+def image(w, h=64):
+    return np.random.default_rng(2).integers(0, 256, (h, w, 3), np.uint8)
+
+
+def tiles(det, img, starts):
+    """Boxes of ``detect_array`` on the 64-pixel tiles at ``starts``, shifted."""
+    return [
+        shifted(det.detect_array(np.ascontiguousarray(img[:, x : x + 64]), THRESH), x)
+        for x in starts
+    ]
+
+
+def test_tile_grid_and_offsets(model):
+    det = m.Detector(*model)
+    det.set_nms("none")
+    img = image(150)
+    # steps of 64 * (1 - 0.25) = 48 pixels; the last tile is aligned with the edge
+    expected = [b for boxes in tiles(det, img, [0, 48, 86]) for b in boxes]
+    assert expected
+    actual = det.detect_tiled(img, tile=64, overlap=0.25, thresh=THRESH)
+    assert sorted(map(key, actual)) == sorted(map(key, expected))
+
+    # the whole image, downscaled, is one more tile
+    whole = det.detect_array(img, THRESH)
+    actual = det.detect_tiled(img, tile=64, overlap=0.25, thresh=THRESH, full_pass=True)
+    assert sorted(map(key, actual)) == sorted(map(key, expected + whole))
+
+
+def test_merge_across_tiles(model):
+    det = m.Detector(*model)
+    img = image(72)
+    per_tile = tiles(det, img, [0, 8])
+
+    # reference: drop boxes inside a better box of the other tile, then greedy NMS
+    candidates = sorted(
+        ((b, i) for i, boxes in enumerate(per_tile) for b in boxes),
+        key=lambda item: -item[0].prob,
+    )
+    kept = []
+    for b, i in candidates:
+        inside = False
+        for a, j in kept:
+            iw = min(a.x + a.w, b.x + b.w) - max(a.x, b.x)
+            ih = min(a.y + a.h, b.y + b.h) - max(a.y, b.y)
+            smaller = min(a.w * a.h, b.w * b.h)
+            if i != j and a.obj_id == b.obj_id and iw > 0 and ih > 0:
+                inside = inside or iw * ih > det.nms * smaller
+        if not inside:
+            kept.append((b, i))
+    expected = m.nms([b for b, _ in kept], det.nms, "greedy")
+
+    actual = det.detect_tiled(img, tile=64, overlap=0.5, thresh=THRESH)
+    assert sum(map(len, per_tile)) > len(actual)
+    assert sorted(map(key, actual)) == sorted(map(key, expected))
+
+
+def test_detect_tiled_rejects_bad_input(model):
+    det = m.Detector(*model)
+    with pytest.raises(ValueError, match="uint8"):
+        det.detect_tiled(np.zeros((3, 64, 64), np.float32))
+    for overlap in (-0.1, 1.0):
+        with pytest.raises(ValueError, match="overlap"):
+            det.detect_tiled(image(72), overlap=overlap)
+    with pytest.raises(ValueError, match="tile"):
+        det.detect_tiled(image(72), tile=-1)
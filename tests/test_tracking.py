@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import pytest
+
+pytest.importorskip("libdarknetpy")
+np = pytest.importorskip("numpy")
+
+from libdarknetpy.tracking import Tracker  # noqa: E402
+
+
+def frame(*boxes):
+    cols = np.array(boxes, np.uint32).reshape(-1, 5).T
+    out = dict(zip(("x", "y", "w", "h", "obj_id"), cols))
+    out["track_id"] = np.zeros(len(boxes), np.uint32)
+    return out
+
+
+def test_tracks_follow_moving_boxes():
+    tracker = Tracker()
+    first = tracker.update(frame((0, 0, 10, 10, 0), (50, 50, 10, 10, 0)))
+    dets = frame((52, 51, 10, 10, 0), (1, 1, 10, 10, 0), (200, 200, 5, 5, 0))
+    ids = tracker.update(dets)
+    assert list(ids) == [first[1], first[0], 3]
+    assert list(dets["track_id"]) == list(ids)
+
+
+def test_classes_are_not_mixed():
+    tracker = Tracker()
+    tracker.update(frame((0, 0, 10, 10, 0)))
+    assert list(tracker.update(frame((0, 0, 10, 10, 1)))) == [2]
+
+
+def test_tracks_expire_and_snapshot_restores():
+    tracker = Tracker(max_age=2)
+    tracker.update(frame((0, 0, 10, 10, 0)))
+    state = tracker.snapshot()
+    tracker.update(frame())
+    tracker.update(frame())
+    assert len(tracker) == 0
+    tracker.restore(state)
+    assert list(tracker.update(frame((1, 0, 10, 10, 0)))) == [1]
+
+
+def test_center_metric():
+    tracker = Tracker(metric="center", max_dist=40)
+    tracker.update(frame((0, 0, 4, 4, 0)))
+    assert list(tracker.update(frame((30, 0, 4, 4, 0)))) == [1]
+    assert list(tracker.update(frame((100, 0, 4, 4, 0)))) == [2]
+
+
+def test_from_detector_defaults_to_tracking_id():
+    class FakeDetector:
+        def tracking_id(self, boxes):
+            return boxes
+
+    a = Tracker.from_detector(FakeDetector())
+    b = Tracker.from_detector(FakeDetector(), max_dist=10)
+    assert (a.metric, a.max_dist, a.max_age) == ("center", 40.0, 5)
+    assert b.max_dist == 10
+    a.update(frame((0, 0, 4, 4, 0)))
+    assert len(a) == 1
+    assert len(b) == 0
+    with pytest.raises(TypeError):
+        Tracker.from_detector(object())